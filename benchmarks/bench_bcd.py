@@ -0,0 +1,117 @@
+# coding=utf-8
+"""
+BCD against ASCII: the purchase profile built and parsed with the default spec(ASCII),
+and with a CUP style spec where the numeric fields and the length prefixes are BCD.
+
+    python benchmarks/bench_bcd.py [--quick] [-o result.json]
+
+Reports messages per second, bytes on the wire, and nanoseconds of pack / unpack of
+the fields that differ.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from py8583.codec import compile
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec, load_spec
+
+from bench_codec import meta, nanoseconds, throughput
+from profiles import PURCHASE_0200, fill
+
+
+BCD_FIELDS = ('MTI', 2, 3, 4, 7, 11, 12, 13, 14, 18, 22, 25, 32, 35)
+BCD_VARIABLE_FIELDS = (2, 32, 35)  # LLVAR, their length prefix is BCD too
+
+
+def cup_spec():
+    fields = dict((str(bit), {'data_type': 'BCD'}) for bit in BCD_FIELDS)
+    for bit in BCD_VARIABLE_FIELDS:
+        fields[str(bit)]['data_len_encode_type'] = 'BCD'
+
+    return load_spec({'base': 'default', 'fields': fields})
+
+
+def bench_spec(codec, options):
+    message = fill(Py8583(codec), PURCHASE_0200)
+    msg = message.build()
+
+    def build():
+        return message.build()
+
+    def parse():
+        parsed = Py8583(codec)
+        parsed.parse(msg)
+        return parsed
+
+    fields = {}
+    for bit in BCD_FIELDS:
+        field_codec = codec[bit]
+        value = PURCHASE_0200[bit]
+        packed = field_codec.pack(value)
+        fields[str(bit)] = {
+            'len': len(packed),
+            'pack_ns': nanoseconds(lambda: field_codec.pack(value), options),
+            'unpack_ns': nanoseconds(lambda: field_codec.unpack(packed, 0), options),
+        }
+
+    return {
+        'size': len(msg),
+        'build': throughput(build, options),
+        'parse': throughput(parse, options),
+        'fields': fields,
+    }
+
+
+def run(options):
+    return {
+        'meta': meta(),
+        'results': {
+            'ascii': bench_spec(compile(Py8583Spec()), options),
+            'bcd': bench_spec(compile(cup_spec()), options),
+        },
+    }
+
+
+def report(result, out):
+    ascii_result, bcd_result = result['results']['ascii'], result['results']['bcd']
+
+    out.write('%-6s %6s %12s %12s\n' % ('spec', 'bytes', 'build/s', 'parse/s'))
+    for name, spec_result in (('ascii', ascii_result), ('bcd', bcd_result)):
+        out.write('%-6s %6s %12.0f %12.0f\n' % (
+            name, spec_result['size'], spec_result['build']['per_sec'], spec_result['parse']['per_sec']
+        ))
+    out.write('bcd is %.1f%% of the ascii bytes\n' % (bcd_result['size'] * 100.0 / ascii_result['size']))
+
+    out.write('\nfields (ns)        ascii pack/unpack           bcd pack/unpack\n')
+    for bit in BCD_FIELDS:
+        a, b = ascii_result['fields'][str(bit)], bcd_result['fields'][str(bit)]
+        out.write('  %3s len(%2s/%2s) %10.1f %10.1f     %10.1f %10.1f\n' % (
+            bit, a['len'], b['len'], a['pack_ns'], a['unpack_ns'], b['pack_ns'], b['unpack_ns']
+        ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmark BCD against ASCII encoding')
+    parser.add_argument('-o', '--output', help='save the result as JSON')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds of a timing round')
+    parser.add_argument('--quick', action='store_true', help='short rounds, a smoke run')
+    options = parser.parse_args(argv)
+
+    if options.quick:
+        options.repeat, options.min_time = 1, 0.01
+
+    result = run(options)
+    report(result, sys.stdout)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+# coding=utf-8
+"""
+Throughput, per-field cost and allocations of build / parse over the message profiles.
+
+    python benchmarks/bench_codec.py [--quick] [-o result.json] [--compare baseline.json]
+
+Every profile of profiles.PROFILES reports:
+    build / parse / parse_lazy   messages per second and microseconds per message
+    build_validated              build with the content types checked(Validation.BUILD)
+    parse_only                   parse decoding only ONLY_BITS, what a routing / fraud filter reads
+    alloc                        peak(transient) and retained bytes per message, by tracemalloc
+    bitmap                       nanoseconds of pack / unpack / bits() / rank()
+    fields                       nanoseconds of pack / unpack of every field on its own
+field55 parse / build, Py8583TLV indexing, get(), encode() and template builds are measured on the ICC data of the purchase profile.
+
+Save the result of a release with -o, then --compare it with the next one.
+"""
+import argparse
+import binascii
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from py8583.codec import compile
+from py8583.constant import Validation
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec
+
+from profiles import PROFILES, PURCHASE_0200, fill
+
+
+ONLY_BITS = frozenset([2, 3, 4, 11])
+
+
+#### measure ####
+def seconds_per_call(func, repeat, min_time):
+    """
+    Best of <repeat> rounds, a round runs <func> for at least <min_time> seconds.
+    """
+
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed * 2 >= min_time else 10
+
+    best = elapsed
+    for _ in range(repeat - 1):
+        best = min(best, timer.timeit(number))
+
+    return best / number
+
+
+def throughput(func, options):
+    seconds = seconds_per_call(func, options.repeat, options.min_time)
+    return {
+        'per_sec': round(1.0 / seconds, 1),
+        'us': round(seconds * 1e6, 3),
+    }
+
+
+def nanoseconds(func, options):
+    return round(seconds_per_call(func, options.repeat, options.min_time) * 1e9, 1)
+
+
+def allocation(func, count):
+    """
+    peak_bytes: high water mark above the start while running <func> once
+    retained_bytes: what every call keeps alive, averaged over <count> calls
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        kept = func()
+        peak = tracemalloc.get_traced_memory()[1] - before
+        del kept
+
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [func() for _ in range(count)]
+        retained = (tracemalloc.get_traced_memory()[0] - before) / float(count)
+        del kept
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'peak_bytes': peak,
+        'retained_bytes': round(retained, 1),
+    }
+
+
+#### benchmark ####
+def bench_profile(codec, profile, options):
+    message = fill(Py8583(codec), profile)
+    msg = message.build()
+
+    def build():
+        return message.build()
+
+    def parse():
+        parsed = Py8583(codec)
+        parsed.parse(msg)
+        return parsed
+
+    def parse_lazy():
+        parsed = Py8583(codec)
+        parsed.parse(msg, lazy=True)
+        return parsed
+
+    def parse_only():
+        parsed = Py8583(codec)
+        parsed.parse(msg, only=ONLY_BITS)
+        return parsed
+
+    validated = fill(Py8583(Py8583Spec(validation=Validation.BUILD)), profile)
+
+    return {
+        'size': len(msg),
+        'field_count': len(profile) - 1,
+        'build': throughput(build, options),
+        'build_validated': throughput(validated.build, options),
+        'parse': throughput(parse, options),
+        'parse_lazy': throughput(parse_lazy, options),
+        'parse_only': throughput(parse_only, options),
+        'alloc': {
+            'build': allocation(build, options.alloc_count),
+            'parse': allocation(parse, options.alloc_count),
+            'parse_lazy': allocation(parse_lazy, options.alloc_count),
+        },
+        'bitmap': bench_bitmap(codec, message, options),
+        'fields': bench_fields(codec, profile, options),
+    }
+
+
+def bench_bitmap(codec, message, options):
+    bitmap = message.bitmap
+    primary, secondary = bitmap.primary, bitmap.secondary or None
+    packed = codec.pack_bitmap(primary, secondary)
+    last_bit = max(bitmap.bits())
+
+    return {
+        'pack_ns': nanoseconds(lambda: codec.pack_bitmap(primary, secondary), options),
+        'unpack_ns': nanoseconds(lambda: codec.unpack_bitmap(packed, 0), options),
+        'bits_ns': nanoseconds(lambda: list(bitmap.bits()), options),
+        'rank_ns': nanoseconds(lambda: bitmap.rank(last_bit), options),
+    }
+
+
+def bench_fields(codec, profile, options):
+    fields = {}
+    for bit, value in profile.items():
+        if bit == 'MTI':
+            continue
+
+        field_codec = codec[bit]
+        packed = field_codec.pack(value)
+        fields[str(bit)] = {
+            'len': len(packed),
+            'pack_ns': nanoseconds(lambda: field_codec.pack(value), options),
+            'unpack_ns': nanoseconds(lambda: field_codec.unpack(packed, 0), options),
+        }
+
+    return fields
+
+
+def bench_field55(options):
+    data = binascii.unhexlify(PURCHASE_0200[55])
+
+    try:
+        from py8583 import field55
+
+        parsed = field55.parse(data)
+        field55.build(parsed)
+    except Exception as e:  # field55 doesn't run on this interpreter
+        return {'skipped': '%s: %s' % (type(e).__name__, e)}
+
+    result = {
+        'len': len(data),
+        'parse_ns': nanoseconds(lambda: field55.parse(data), options),
+        'build_ns': nanoseconds(lambda: field55.build(parsed), options),
+    }
+
+    if hasattr(field55, 'Py8583TLV'):
+        tlv = field55.Py8583TLV(data)
+        get = tlv.get
+
+        def arqc_tags():  # what an ARQC verification reads
+            return get(0x9F26), get(0x9F27), get(0x9F10), get(0x95)
+
+        result['index_ns'] = nanoseconds(lambda: field55.Py8583TLV(data), options)
+        result['get_4_tags_ns'] = nanoseconds(arqc_tags, options)
+
+    if hasattr(field55, 'encode'):
+        items = list(field55.Py8583TLV(data).items()) + [(0x9F37, b'\x00' * 4), (0x9A, b'\x00' * 3), (0x9F02, b'\x00' * 6)]
+        template = field55.Py8583TLVTemplate(items)
+        dynamic = {0x9F37: b'\x1a\x2b\x3c\x4d', 0x9A: b'\x26\x10\x18', 0x9F02: b'\x00\x00\x00\x01\x25\x00'}
+
+        result['encode_ns'] = nanoseconds(lambda: field55.encode(items), options)
+        result['template_build_ns'] = nanoseconds(lambda: template.build(dynamic), options)
+
+    return result
+
+
+def run(options):
+    codec = compile(Py8583Spec())
+
+    results = {}
+    for name, profile in PROFILES:
+        if options.profile and name not in options.profile:
+            continue
+        results[name] = bench_profile(codec, profile, options)
+    results['field55'] = bench_field55(options)
+
+    return {
+        'meta': meta(),
+        'results': results,
+    }
+
+
+def meta():
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+    }
+
+
+#### report ####
+def flatten(result, prefix=''):
+    """
+    {'a': {'b': 1}} -> {'a.b': 1}, numbers only
+    """
+
+    flat = {}
+    for key, value in result.items():
+        name = prefix + str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+
+    return flat
+
+
+def report(result, out):
+    results = result['results']
+
+    out.write('%-14s %6s %12s %12s %12s %10s %10s\n' % (
+        'profile', 'bytes', 'build/s', 'parse/s', 'lazy/s', 'peak B', 'kept B'
+    ))
+    for name, _ in PROFILES:
+        if name not in results:
+            continue
+        profile = results[name]
+        out.write('%-14s %6s %12.0f %12.0f %12.0f %10s %10.0f\n' % (
+            name, profile['size'],
+            profile['build']['per_sec'], profile['parse']['per_sec'], profile['parse_lazy']['per_sec'],
+            profile['alloc']['parse']['peak_bytes'], profile['alloc']['parse']['retained_bytes'],
+        ))
+
+    for name, _ in PROFILES:
+        if name not in results:
+            continue
+        out.write('\n%s fields (ns)\n' % name)
+        for bit, field in sorted(results[name]['fields'].items(), key=lambda item: int(item[0])):
+            out.write('  %3s len(%4s) pack %8.1f  unpack %8.1f\n' % (bit, field['len'], field['pack_ns'], field['unpack_ns']))
+        out.write('  bitmap %s\n' % ', '.join('%s %.1f' % item for item in sorted(results[name]['bitmap'].items())))
+
+    field55 = results['field55']
+    if 'skipped' in field55:
+        out.write('\nfield55 skipped, %s\n' % field55['skipped'])
+    else:
+        out.write('\nfield55 len(%s) %s\n' % (
+            field55['len'], ', '.join('%s %.1f' % item for item in sorted(field55.items()) if item[0] != 'len')
+        ))
+
+
+def compare(result, baseline, out):
+    """
+    Print the change of every metric against <baseline>.
+    For per_sec higher is better, for the others lower is better.
+    """
+
+    old = flatten(baseline['results'])
+    new = flatten(result['results'])
+
+    out.write('\ncompared with %s (%s)\n' % (baseline['meta'].get('commit'), baseline['meta'].get('created')))
+    for name in sorted(set(old) & set(new)):
+        if name.endswith('.len') or name.endswith('.size') or name.endswith('field_count') or not old[name]:
+            continue
+        change = (new[name] - old[name]) / float(old[name]) * 100
+        worse = change < 0 if name.endswith('per_sec') else change > 0
+        out.write('  %-44s %14.1f -> %14.1f %+7.1f%%%s\n' % (
+            name, old[name], new[name], change, ' !' if worse and abs(change) >= 5 else ''
+        ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmark build / parse of py8583')
+    parser.add_argument('-o', '--output', help='save the result as JSON')
+    parser.add_argument('--compare', help='JSON result of a previous run')
+    parser.add_argument('--profile', action='append', choices=[name for name, _ in PROFILES], help='default all')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds of a timing round')
+    parser.add_argument('--alloc-count', type=int, default=1000)
+    parser.add_argument('--quick', action='store_true', help='short rounds, a smoke run')
+    options = parser.parse_args(argv)
+
+    if options.quick:
+        options.repeat, options.min_time, options.alloc_count = 1, 0.01, 10
+
+    result = run(options)
+    report(result, sys.stdout)
+
+    if options.compare:
+        with open(options.compare) as f:
+            compare(result, json.load(f), sys.stdout)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
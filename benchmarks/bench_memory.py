@@ -0,0 +1,61 @@
+# coding=utf-8
+"""
+Bytes held in memory per parsed message.
+
+    python benchmarks/bench_memory.py [count]
+
+The received buffers are allocated before measuring, so only what the parsed
+Py8583 objects add on top of them is reported. Run it on two versions of the
+package to compare them.
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec
+
+from profiles import PURCHASE_0200, fill
+
+
+def build_msgs(spec, count):
+    msg = fill(Py8583(spec), PURCHASE_0200).build()
+
+    return [bytes(bytearray(msg)) for _ in range(count)]
+
+
+def measure(spec, msgs, lazy):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    parsed = []
+    for msg in msgs:
+        message = Py8583(spec)
+        if lazy:
+            message.parse(msg, lazy=True)
+        else:
+            message.parse(msg)
+        parsed.append(message)
+
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return (after - before) / float(len(msgs))
+
+
+def main(count=10000):
+    spec = Py8583Spec()
+    msgs = build_msgs(spec, count)
+
+    print('messages: %s, %s bytes each' % (count, len(msgs[0])))
+    print('eager parse: %8.1f bytes/message' % measure(spec, msgs, lazy=False))
+    print('lazy parse:  %8.1f bytes/message' % measure(spec, msgs, lazy=True))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,94 @@
+# coding=utf-8
+"""
+Representative messages used by the benchmarks, MTI -> field values by bit.
+"""
+
+
+# network management echo
+ECHO_0800 = {
+    'MTI': '0800',
+    7: '1018093015',
+    11: '000123',
+    70: '301',
+}
+
+# card present purchase, track 2 and ICC data
+PURCHASE_0200 = {
+    'MTI': '0200',
+    2: '4761739001010119',
+    3: '000000',
+    4: '000000012500',
+    7: '1018093015',
+    11: '000123',
+    12: '093015',
+    13: '1018',
+    14: '2512',
+    18: '5411',
+    22: '051',
+    25: '00',
+    32: '12345678901',
+    35: '4761739001010119=2512201114380440000',
+    37: '000000000123',
+    41: 'TERM0001',
+    42: 'MERCHANT0000001',
+    43: 'SHOP NAME                CITY         US',
+    49: '840',
+    52: b'\x12\x34\x56\x78\x9a\xbc\xde\xf0',
+    55: '9F2608C2C12B098F3DA6E39F2701809F10120110A0000F040000000000000000000000FF',
+}
+
+# primary and secondary bitmap, most of the variable fields are LLLVAR
+LLLVAR_128 = {
+    'MTI': '0200',
+    2: '4761739001010119',
+    3: '000000',
+    4: '000000012500',
+    7: '1018093015',
+    11: '000123',
+    12: '093015',
+    13: '1018',
+    36: '1' * 104,
+    37: '000000000123',
+    41: 'TERM0001',
+    42: 'MERCHANT0000001',
+    46: 'F' * 120,
+    47: 'N' * 200,
+    48: 'P' * 300,
+    49: '840',
+    54: '1002840C000000012500',
+    55: '9F2608C2C12B098F3DA6E39F2701809F10120110A0000F040000000000000000000000FF' * 4,
+    56: '0200000123101809301500000000000000000000000',
+    60: 'R' * 60,
+    61: 'S' * 120,
+    62: 'T' * 250,
+    63: 'U' * 500,
+    70: '301',
+    104: 'GOODS AND SERVICES',
+    105: 'I' * 80,
+    111: 'V' * 150,
+    120: 'W' * 400,
+    123: 'X' * 100,
+    124: 'INFO TEXT' * 10,
+    127: 'Y' * 600,
+    128: b'\x5a' * 16,
+}
+
+PROFILES = (
+    ('echo_0800', ECHO_0800),
+    ('purchase_0200', PURCHASE_0200),
+    ('lllvar_128', LLLVAR_128),
+)
+
+
+def fill(message, profile):
+    """
+    Set MTI and every field of <profile> on <message>.
+    """
+
+    for bit, value in profile.items():
+        if bit == 'MTI':
+            message.MTI = value
+        else:
+            message.set_bit(bit, value)
+
+    return message
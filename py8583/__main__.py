@@ -0,0 +1,84 @@
+# coding=utf-8
+"""
+python -m py8583 bulk-decode FILE [options]
+"""
+import argparse
+import importlib
+import sys
+
+from . import bulk
+from . import constant
+
+
+_FRAMINGS = {
+    'bin2': constant.FrameLengthType.BIN2,
+    'ascii4': constant.FrameLengthType.ASCII4,
+}
+
+
+def _load_spec_factory(name):
+    """
+    'package.module:ClassName' -> the class
+    """
+
+    module_name, _, attr = name.partition(':')
+    if not attr:
+        raise argparse.ArgumentTypeError('spec must be like package.module:ClassName, got %r' % name)
+
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _parse_bits(bits):
+    return [int(bit) for bit in bits.split(',') if bit]
+
+
+def bulk_decode_main(args):
+    kwargs = {
+        'length_type': _FRAMINGS[args.framing],
+        'header_len': args.header_len,
+        'workers': args.workers,
+        'chunk_frames': args.chunk_frames,
+    }
+    if args.spec:
+        kwargs['spec_factory'] = args.spec
+
+    results = bulk.bulk_decode(args.file, **kwargs)
+
+    out = open(args.output, 'w', newline='') if args.output != '-' else sys.stdout
+    try:
+        if args.format == 'csv':
+            if not args.bits:
+                raise SystemExit('--bits is required by csv format')
+            count = bulk.write_csv(results, out, args.bits)
+        else:
+            count = bulk.write_jsonl(results, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    sys.stderr.write('decoded %s messages\n' % count)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m py8583')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    bulk_parser = subparsers.add_parser('bulk-decode', help='decode a file of framed messages on all cores')
+    bulk_parser.add_argument('file')
+    bulk_parser.add_argument('--framing', choices=sorted(_FRAMINGS), default='bin2')
+    bulk_parser.add_argument('--header-len', type=int, default=0, help='bytes of the header(e.g. TPDU) before the MTI')
+    bulk_parser.add_argument('--spec', type=_load_spec_factory, help='package.module:ClassName, default Py8583Spec')
+    bulk_parser.add_argument('--workers', type=int, default=None)
+    bulk_parser.add_argument('--chunk-frames', type=int, default=10000)
+    bulk_parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    bulk_parser.add_argument('--bits', type=_parse_bits, help='comma separated bits written by csv format')
+    bulk_parser.add_argument('-o', '--output', default='-')
+    bulk_parser.set_defaults(func=bulk_decode_main)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+# coding=utf-8
+"""
+asyncio client keeping many requests in flight on one connection.
+
+Responses are matched to requests by the encoded content of <key_bits>
+(default STAN(11) + terminal id(41)), so responses may come back in any order.
+"""
+import asyncio
+import logging
+
+from . import constant
+from . import err
+from . import frame
+from .codec import compile
+from .py8583 import Py8583
+
+log = logging.getLogger(constant.LOGGER_NAME)
+
+
+class Py8583AsyncClient(object):
+
+    def __init__(self, reader, writer, spec, length_type=constant.FrameLengthType.BIN2, header=b'',
+                 key_bits=(11, 41), timeout=30.0, unsolicited=None):
+        """
+
+        :param reader:
+        :type reader: asyncio.StreamReader
+        :param writer:
+        :type writer: asyncio.StreamWriter
+        :param spec:
+        :type spec: py8583.spec.Py8583Spec | py8583.codec.Py8583Codec
+        :param length_type: frame length type
+        :type length_type: constant.FrameLengthType
+        :param header: frame header(e.g. TPDU) sent before the MTI, responses carry a header of the same length
+        :type header: bytes
+        :param key_bits: bits matching a response to its request
+        :type key_bits: tuple[int]
+        :param timeout: default timeout of a request, in seconds
+        :type timeout: float
+        :param unsolicited: called with every received message that matches no request
+        :type unsolicited: (Py8583) -> None
+        """
+
+        self.reader = reader
+        self.writer = writer
+        self.codec = compile(spec)
+        self.length_type = length_type
+        self.header = header
+        self.key_bits = tuple(key_bits)
+        self.timeout = timeout
+        self.unsolicited = unsolicited
+
+        self._length_len = frame.length_field_len(length_type)
+        self._pending = {}  # key -> future of the response
+        self._reader_task = None
+        self._closed = False
+
+    @classmethod
+    async def connect(cls, host, port, spec, **kwargs):
+        """
+        Open a connection to host:port and start the client.
+
+        :return:
+        :rtype: Py8583AsyncClient
+        """
+
+        reader, writer = await asyncio.open_connection(host, port)
+        client = cls(reader, writer, spec, **kwargs)
+        client.start()
+
+        return client
+
+    #### property ####
+    @property
+    def outstanding(self):
+        """
+        Number of requests waiting for their response.
+        """
+
+        return len(self._pending)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    #### meta ####
+    def start(self):
+        if self._reader_task is None:
+            self._reader_task = asyncio.ensure_future(self._read_loop())
+
+    async def wait_closed(self):
+        """
+        Wait until the connection is lost or the client is closed.
+        """
+
+        if self._reader_task is not None:
+            await asyncio.wait([self._reader_task])
+
+    async def close(self):
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+        self._fail_all(err.Py8583Error('client closed'))
+
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+    #### request ####
+    async def request(self, message, timeout=None):
+        """
+        Send <message>, wait for and return its response.
+
+        :param message:
+        :type message: Py8583
+        :param timeout: seconds, default self.timeout
+        :type timeout: float | None
+        :return:
+        :rtype: Py8583
+        """
+
+        if self._closed:
+            raise err.Py8583Error('client closed')
+
+        key = self.key_of(message)
+        if key in self._pending:
+            raise err.Py8583Error('request with key(%s) already in flight' % (key,))
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            await self.send(message)
+            return await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    async def send(self, message):
+        """
+        Send <message> without waiting for a response.
+
+        :param message:
+        :type message: Py8583
+        :return:
+        """
+
+        self.writer.write(frame.pack_frame(message.build(), self.length_type, self.header))
+        await self.writer.drain()
+
+    def key_of(self, message):
+        """
+
+        :param message:
+        :type message: Py8583
+        :return:
+        :rtype: tuple
+        """
+
+        return tuple(
+            bytes(message.get_raw(bit)) if message.bitmap.test(bit) else None
+            for bit in self.key_bits
+        )
+
+    #### reader ####
+    async def _read_loop(self):
+        reader = self.reader
+        length_len = self._length_len
+        header_len = len(self.header)
+
+        try:
+            while True:
+                length_data = await reader.readexactly(length_len)
+                body = await reader.readexactly(frame.unpack_length(length_data, 0, self.length_type))
+
+                # a bad message is dropped, only a broken stream(the framing lost) ends the link
+                message = Py8583(self.codec)
+                try:
+                    message.parse(memoryview(body)[header_len:])
+                except Exception:
+                    log.exception('drop unparsable message(%r)', body[:64])
+                    continue
+                self._dispatch(message)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.IncompleteReadError:
+            self._fail_all(err.Py8583Error('connection closed by peer'))
+        except Exception as e:
+            log.exception('py8583 async client reader failed')
+            self._fail_all(e)
+        finally:
+            self._closed = True
+            self.writer.close()
+
+    def _dispatch(self, message):
+        future = self._pending.pop(self.key_of(message), None)
+
+        if future is None:
+            if self.unsolicited is not None:
+                try:
+                    self.unsolicited(message)
+                except Exception:
+                    log.exception('unsolicited callback failed, MTI(%s)', message.MTI)
+            else:
+                log.warning('drop unmatched message, MTI(%s)', message.MTI)
+        elif not future.done():
+            future.set_result(message)
+
+    def _fail_all(self, exc):
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
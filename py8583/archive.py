@@ -0,0 +1,309 @@
+# coding=utf-8
+"""
+Random access to big capture files of framed messages.
+
+The capture is mmapped, a sidecar index(<capture>.idx) holding the offset of every frame
+and the decoded values of a few key fields (MTI, 11, 37, 41) is built on first open,
+lookups then parse only the messages they return.
+"""
+import mmap
+import os
+import struct
+
+from . import constant
+from . import err
+from . import frame
+from .codec import compile
+from .py8583 import Py8583
+from .spec import Py8583Spec
+
+
+_INDEX_MAGIC = b'P8583IDX'
+_INDEX_VERSION = 2
+# magic, version, capture size, capture mtime_ns, frame count, length_type, header_len, width of the 4 key fields
+_INDEX_HEADER = struct.Struct('!8sHQQQBH4H')
+
+# length of an absent key field in a record
+_ABSENT = 0xffff
+
+# name of the key field -> bit
+KEY_FIELDS = (
+    ('mti', 'MTI'),
+    ('stan', 11),
+    ('rrn', 37),
+    ('tid', 41),
+)
+
+
+class Py8583CaptureArchive(object):
+
+    def __init__(self, path, spec=None, length_type=constant.FrameLengthType.BIN2, header_len=0, index_path=None):
+        """
+
+        :param path: capture file, frames written back to back
+        :type path: str
+        :param spec:
+        :type spec: py8583.spec.Py8583Spec | py8583.codec.Py8583Codec | None
+        :param length_type:
+        :type length_type: constant.FrameLengthType
+        :param header_len: bytes of the header(e.g. TPDU) between the length and the MTI
+        :type header_len: int
+        :param index_path: default <path>.idx
+        :type index_path: str | None
+        """
+
+        self.path = path
+        self.codec = compile(spec if spec is not None else Py8583Spec())
+        self.length_type = length_type
+        self.header_len = header_len
+        self.index_path = index_path or path + '.idx'
+
+        self._widths = tuple(
+            self.codec[bit].field_spec.data_len_max
+            for _, bit in KEY_FIELDS
+        )
+        # offset, length of the message(header excluded), then length and value of every key field
+        self._record = struct.Struct('!QI' + ''.join('H%ds' % width for width in self._widths))
+        self._lookup = {}  # name of key field -> {value: [n, ...]}
+
+        self._index = None
+        self._data = b''
+        self._file = open(path, 'rb')
+        try:
+            try:
+                self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                pass
+
+            self._index = self._load_index()
+            if self._index is None:
+                self._build_index()
+                self._index = self._load_index()
+
+            self._count = _INDEX_HEADER.unpack_from(self._index, 0)[4]
+        except BaseException:
+            self.close()  # e.g. a truncated capture, don't leak the file and the mmaps
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Close the capture, views returned by raw() must be released before.
+        """
+
+        for data in (self._index, self._data):
+            if isinstance(data, mmap.mmap):
+                data.close()
+        self._file.close()
+
+    #### access ####
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, n):
+        """
+        Parse message #n, a copy of it: the message doesn't hold the capture open.
+
+        :param n:
+        :type n: int
+        :return:
+        :rtype: Py8583
+        """
+
+        offset, length = self._record_of(n)[:2]
+        message = Py8583(self.codec)
+        message.parse(self._data[offset:offset + length])  # mmap slice, bytes
+
+        return message
+
+    def __iter__(self):
+        for n in range(self._count):
+            yield self[n]
+
+    def raw(self, n):
+        """
+        Message #n as a view into the capture, header excluded.
+        Release it(or drop it) before close().
+
+        :param n:
+        :type n: int
+        :return:
+        :rtype: memoryview
+        """
+
+        offset, length = self._record_of(n)[:2]
+        return memoryview(self._data)[offset:offset + length]
+
+    def keys(self, n):
+        """
+        Key fields of message #n from the index, without parsing it.
+
+        :param n:
+        :type n: int
+        :return: {'mti': '0200', 'stan': '000123', 'rrn': ..., 'tid': ...}, None if the field is absent
+        :rtype: dict
+        """
+
+        return dict(zip((name for name, _ in KEY_FIELDS), self._key_values(self._record_of(n))))
+
+    def find(self, **conditions):
+        """
+        Numbers of the messages whose key fields equal <conditions>.
+
+            archive.find(rrn='123456789012')
+            archive.find(stan='000123', tid='TERM0001')
+
+        :return:
+        :rtype: list[int]
+        """
+
+        result = None
+        for name, value in conditions.items():
+            numbers = self._lookup_table(name).get(value, [])
+            if result is None:
+                result = list(numbers)
+            else:
+                numbers = set(numbers)
+                result = [n for n in result if n in numbers]
+
+        return result or []
+
+    def find_messages(self, **conditions):
+        """
+        Same as find, but return the parsed messages.
+
+        :rtype: list[Py8583]
+        """
+
+        return [self[n] for n in self.find(**conditions)]
+
+    #### index ####
+    def _record_of(self, n):
+        if n < 0:
+            n += self._count
+        if n < 0 or n >= self._count:
+            raise IndexError('message #%s out of range(%s)' % (n, self._count))
+
+        return self._record.unpack_from(self._index, _INDEX_HEADER.size + n * self._record.size)
+
+    def _lookup_table(self, name):
+        table = self._lookup.get(name)
+        if table is None:
+            names = [key_name for key_name, _ in KEY_FIELDS]
+            if name not in names:
+                raise err.Py8583ProgramError('unknown key field(%s), should be one of %s' % (name, names))
+
+            position = names.index(name)
+            table = {}
+            for n in range(self._count):
+                value = self._key_values(self._record_of(n))[position]
+                table.setdefault(value, []).append(n)
+            self._lookup[name] = table
+
+        return table
+
+    def _key_values(self, record):
+        """
+        Decoded key fields of a record, None if absent.
+        """
+
+        values = record[2:]
+        return [
+            None if length == _ABSENT else value[:length].decode('latin')
+            for length, value in zip(values[::2], values[1::2])
+        ]
+
+    def _capture_stat(self):
+        stat = os.fstat(self._file.fileno())
+        return stat.st_size, stat.st_mtime_ns
+
+    def _load_index(self):
+        """
+        mmap the index, None if it's missing or stale.
+        """
+
+        try:
+            f = open(self.index_path, 'rb')
+        except (IOError, OSError):
+            return None
+
+        with f:
+            try:
+                index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                return None
+
+        if len(index) < _INDEX_HEADER.size:
+            index.close()
+            return None
+
+        header = _INDEX_HEADER.unpack_from(index, 0)
+        magic, version, size, mtime_ns, count, length_type, header_len = header[:7]
+        expected = (_INDEX_MAGIC, _INDEX_VERSION) + self._capture_stat()
+        if (
+            (magic, version, size, mtime_ns) != expected
+            or (length_type, header_len) != (self.length_type, self.header_len)
+            or tuple(header[7:]) != self._widths
+            or len(index) != _INDEX_HEADER.size + count * self._record.size
+        ):
+            index.close()
+            return None
+
+        return index
+
+    def _build_index(self):
+        """
+        Index every frame into <index_path>.tmp, the records written as the capture is walked,
+        then move it into place.
+        """
+
+        data = self._data
+        header_len = self.header_len
+        record = self._record
+        message = Py8583(self.codec)
+        view = memoryview(data)
+        tmp_path = self.index_path + '.tmp'
+
+        count = 0
+        end = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(b'\x00' * _INDEX_HEADER.size)  # the header is written once the frames are counted
+
+                for start, end in frame.iter_frames(data, self.length_type):
+                    msg_start = start + header_len
+                    message.reset()
+                    message.parse(view[msg_start:end], lazy=True)
+
+                    keys = []
+                    for _, bit in KEY_FIELDS:
+                        if bit != 'MTI' and not message.bitmap.test(bit):
+                            keys += (_ABSENT, b'')
+                            continue
+                        value = message.MTI if bit == 'MTI' else message.get_bit(bit)
+                        value = value.encode('latin') if isinstance(value, str) else bytes(value)
+                        keys += (len(value), value)
+                    f.write(record.pack(msg_start, end - msg_start, *keys))
+                    count += 1
+
+                if end < len(data):
+                    raise err.Py8583Error('truncated frame at offset(%s) of %s' % (end, self.path))
+
+                f.seek(0)
+                f.write(_INDEX_HEADER.pack(
+                    _INDEX_MAGIC, _INDEX_VERSION,
+                    *(self._capture_stat() + (count, self.length_type, self.header_len) + self._widths)
+                ))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        finally:
+            message.reset()  # drop the views into data, or the mmap can't be closed
+            view.release()
+
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,63 @@
+# coding=utf-8
+"""
+Parse or build many messages with one compiled spec and one recycled Py8583.
+"""
+from .codec import compile
+from .py8583 import Py8583
+
+
+def parse_many(spec, msgs, lazy=False, trace_hook=None, only=None):
+    """
+    Parse every msg of <msgs>, yield the parsed message.
+
+    The same Py8583 object is reset and yielded for every msg, take what you need
+    from it before pulling the next one.
+
+    :param spec:
+    :type spec: py8583.spec.Py8583Spec | py8583.codec.Py8583Codec
+    :param msgs:
+    :type msgs: collections.Iterable[bytes | bytearray | memoryview]
+    :param lazy: see Py8583.parse
+    :type lazy: bool
+    :param trace_hook: see Py8583
+    :type trace_hook: py8583.trace.Py8583TraceHook | None
+    :param only: see Py8583.parse
+    :type only: collections.Collection[int] | None
+    :return:
+    :rtype: collections.Iterator[Py8583]
+    """
+
+    message = Py8583(compile(spec), trace_hook=trace_hook)
+
+    for msg in msgs:
+        message.reset()
+        message.parse(msg, lazy=lazy, only=only)
+
+        yield message
+
+
+def build_many(spec, all_fields, trace_hook=None):
+    """
+    Build a message from every dict of <all_fields>, yield the built bytes.
+
+    :param spec:
+    :type spec: py8583.spec.Py8583Spec | py8583.codec.Py8583Codec
+    :param all_fields: {'MTI': '0200', 2: '4111111111111111', 3: '000000', ...}
+    :type all_fields: collections.Iterable[dict]
+    :param trace_hook: see Py8583
+    :type trace_hook: py8583.trace.Py8583TraceHook | None
+    :return:
+    :rtype: collections.Iterator[bytes]
+    """
+
+    message = Py8583(compile(spec), trace_hook=trace_hook)
+
+    for fields in all_fields:
+        message.reset()
+        for bit, value in fields.items():
+            if bit == 'MTI':
+                message.MTI = value
+            else:
+                message.set_bit(bit, value)
+
+        yield message.build()
@@ -0,0 +1,164 @@
+# coding=utf-8
+"""
+BCD(packed decimal): two digits per byte, '0123' <-> b'\\x01\\x23'.
+
+Packing and unpacking the nibbles is left to binascii / bytes.hex, both in C.
+What is decided per byte or per length is precomputed: the value of every BCD byte,
+and the encoded length prefixes(ASCII, BCD or binary) of every length a field can have.
+"""
+import binascii
+
+from . import constant
+from . import err
+
+
+# BCD byte -> 0-99, None if one of its nibbles is not a decimal digit
+_BYTE_VALUES = tuple(
+    (byte >> 4) * 10 + (byte & 0x0f) if byte >> 4 < 10 and byte & 0x0f < 10 else None
+    for byte in range(256)
+)
+
+# digits of a length prefix
+_LEN_PREFIX_DIGITS = {
+    constant.LengthType.FIXED: 0,
+    constant.LengthType.LVAR: 1,
+    constant.LengthType.LLVAR: 2,
+    constant.LengthType.LLLVAR: 3,
+}
+
+# (encode type, length type) -> tuple of encoded length prefixes, shared by every field
+_LEN_PREFIX_CACHE = {}
+
+
+def bcd2str(bcd):
+    """
+    b'\\x01\\x23' -> '0123'
+
+    :param bcd:
+    :type bcd: bytes | bytearray | memoryview
+    :return:
+    :rtype: str
+    """
+
+    return bcd.hex().upper()
+
+
+def str2bcd(string, pad='0', left=True):
+    """
+    '123' -> b'\\x01\\x23', an odd number of digits is padded with <pad>, on the left by default.
+
+    :param string: digits, A-F are packed as they are(e.g. 'D' and 'F' of track 2)
+    :type string: str
+    :param pad:
+    :type pad: str
+    :param left:
+    :type left: bool
+    :return:
+    :rtype: bytes
+    """
+
+    if len(string) % 2 == 1:
+        string = pad + string if left else string + pad
+    return binascii.unhexlify(string)
+
+
+def len_prefix_width(length_type, encode_type):
+    """
+    Bytes of the length prefix.
+
+        ASCII   LVAR 1, LLVAR 2, LLLVAR 3
+        BCD     LVAR 1, LLVAR 1, LLLVAR 2
+        BIN     LVAR 1, LLVAR 1, LLLVAR 2 (big-endian)
+
+    :param length_type:
+    :type length_type: constant.LengthType
+    :param encode_type:
+    :type encode_type: constant.DataType
+    :return: 0 if fixed
+    :rtype: int
+    """
+
+    digits = _LEN_PREFIX_DIGITS[length_type]
+    if encode_type == constant.DataType.ASCII:
+        return digits
+    elif encode_type in (constant.DataType.BCD, constant.DataType.BIN):
+        return (digits + 1) // 2
+    else:
+        raise err.Py8583InvalidDataTypeError('data_len_encode_type(%s) is invalid.' % encode_type)
+
+
+def len_prefixes(length_type, encode_type, count):
+    """
+    Encoded length prefixes of 0 to <count> - 1, prefixes[n] is the prefix of length n.
+
+    :param length_type:
+    :type length_type: constant.LengthType
+    :param encode_type:
+    :type encode_type: constant.DataType
+    :param count:
+    :type count: int
+    :return:
+    :rtype: tuple[bytes]
+    """
+
+    key = (length_type, encode_type)
+    prefixes = _LEN_PREFIX_CACHE.get(key)
+    if prefixes is None or len(prefixes) < count:
+        digits = _LEN_PREFIX_DIGITS[length_type]
+        width = len_prefix_width(length_type, encode_type)
+
+        if encode_type == constant.DataType.BIN:
+            count = min(max(count, 256), 256 ** width)
+            prefixes = tuple(n.to_bytes(width, 'big') for n in range(count))
+        else:
+            fmt = '%0{0}d'.format(digits)
+            if encode_type == constant.DataType.ASCII:
+                prefixes = tuple((fmt % n).encode('ascii') for n in range(10 ** digits))
+            else:
+                prefixes = tuple(str2bcd(fmt % n) for n in range(10 ** digits))
+
+        _LEN_PREFIX_CACHE[key] = prefixes
+
+    return prefixes
+
+
+def len_prefix_decoder(length_type, encode_type):
+    """
+    Encoded length prefix(bytes-like) -> length.
+
+    :param length_type:
+    :type length_type: constant.LengthType
+    :param encode_type:
+    :type encode_type: constant.DataType
+    :return:
+    :rtype: (bytes | bytearray | memoryview) -> int
+    """
+
+    width = len_prefix_width(length_type, encode_type)
+
+    if encode_type == constant.DataType.ASCII:
+        def decode_len(data):
+            return int(str(data, 'ascii'))
+    elif encode_type == constant.DataType.BIN:
+        if width == 1:
+            def decode_len(data):
+                return data[0]
+        else:
+            def decode_len(data):
+                return data[0] << 8 | data[1]
+    else:  # BCD
+        values = _BYTE_VALUES
+        if width == 1:
+            def decode_len(data):
+                length = values[data[0]]
+                if length is None:
+                    raise ValueError('invalid BCD length prefix %r' % bytes(data))
+                return length
+        else:
+            def decode_len(data):
+                high, low = values[data[0]], values[data[1]]
+                if high is None or low is None:
+                    raise ValueError('invalid BCD length prefix %r' % bytes(data))
+                return high * 100 + low
+
+    return decode_len
@@ -0,0 +1,184 @@
+# coding=utf-8
+"""
+Bitmap of an ISO 8583 message, backed by two 64-bit integers.
+"""
+
+
+_SECONDARY_FLAG = 1 << 63  # bit 1 in the primary bitmap
+
+
+class Py8583Bitmap(object):
+    """
+    bit 1-64 live in <primary>, bit 65-128 in <secondary>, the lowest numbered
+    bit is the most significant one, so both ints pack directly with struct('!Q').
+
+    Bit 1 (use the secondary bitmap) is never stored, it is derived from
+    whether any of bit 65-128 is set.
+
+    Indexing (bitmap[n] -> 0 | 1, slicing, len() == 129) behaves like the
+    129-element list the message used to carry. The view is read only,
+    bits are set with Py8583.set_bit / clear_bit which keep the field values in step.
+    """
+
+    __slots__ = ('_primary', '_secondary')
+
+    def __init__(self, primary=0, secondary=0):
+        """
+
+        :param primary: bit 1-64
+        :type primary: int
+        :param secondary: bit 65-128
+        :type secondary: int
+        """
+
+        self._primary = primary & ~_SECONDARY_FLAG
+        self._secondary = secondary
+
+    def __repr__(self):
+        return '<Py8583Bitmap %s>' % self.bits_str()
+
+    def __eq__(self, other):
+        if not isinstance(other, Py8583Bitmap):
+            return NotImplemented
+        return self._primary == other._primary and self._secondary == other._secondary
+
+    def __ne__(self, other):
+        ret = self.__eq__(other)
+        return ret if ret is NotImplemented else not ret
+
+    __hash__ = None
+
+    #### bit operation ####
+    def set(self, bit):
+        if bit > 64:
+            self._secondary |= 1 << (128 - bit)
+        elif bit > 1:
+            self._primary |= 1 << (64 - bit)
+
+    def clear(self, bit):
+        if bit > 64:
+            self._secondary &= ~(1 << (128 - bit))
+        elif bit > 1:
+            self._primary &= ~(1 << (64 - bit))
+
+    def test(self, bit):
+        """
+
+        :param bit:
+        :type bit: int
+        :return:
+        :rtype: bool
+        """
+
+        if bit > 64:
+            return bool((self._secondary >> (128 - bit)) & 0x1)
+        elif bit > 1:
+            return bool((self._primary >> (64 - bit)) & 0x1)
+        else:  # bit 1
+            return self._secondary != 0
+
+    def reset(self):
+        self._primary = 0
+        self._secondary = 0
+
+    def load(self, primary, secondary=0):
+        """
+        Replace the whole bitmap, as unpacked from a message.
+        """
+
+        self._primary = primary & ~_SECONDARY_FLAG
+        self._secondary = secondary
+
+    #### query ####
+    @property
+    def extended(self):
+        """
+        Whether or not the secondary bitmap is used.
+        """
+
+        return self._secondary != 0
+
+    @property
+    def primary(self):
+        if self._secondary:
+            return self._primary | _SECONDARY_FLAG
+        else:
+            return self._primary
+
+    @property
+    def secondary(self):
+        return self._secondary
+
+    def popcount(self):
+        """
+        Number of fields present, bit 1 not included.
+
+        :return:
+        :rtype: int
+        """
+
+        return bin(self._primary).count('1') + bin(self._secondary).count('1')
+
+    def rank(self, bit):
+        """
+        Number of set bits before <bit>, bit 1 not included.
+        It's the index of <bit> in a list holding the fields in bit order.
+
+        :param bit:
+        :type bit: int
+        :return:
+        :rtype: int
+        """
+
+        if bit > 64:
+            return bin(self._primary).count('1') + bin(self._secondary >> (129 - bit)).count('1')
+        else:
+            return bin(self._primary >> (65 - bit)).count('1')
+
+    def bits(self):
+        """
+        Iterate over the set bits in ascending order, bit 1 not included.
+
+        :return:
+        :rtype: collections.Iterator[int]
+        """
+
+        remain = (self._primary << 64) | self._secondary
+        while remain:
+            high = remain.bit_length()
+            yield 129 - high
+            remain ^= 1 << (high - 1)
+
+    def bits_str(self):
+        """
+        '0' / '1' string of the bitmap, starting with bit 1.
+
+        :return:
+        :rtype: str
+        """
+
+        if self._secondary:
+            return '{0:064b}{1:064b}'.format(self.primary, self._secondary)
+        else:
+            return '{0:064b}'.format(self._primary)
+
+    #### list compatible view ####
+    def __len__(self):
+        return 129  # index(0) is NOT used, but placehold
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[bit] for bit in range(*item.indices(129))]
+
+        if item < 0:
+            item += 129
+        if item < 0 or item > 128:
+            raise IndexError('bitmap index out of range')
+
+        if item == 0:
+            return 0
+        return 1 if self.test(item) else 0
+
+    def __iter__(self):
+        for index in range(129):
+            yield self[index]
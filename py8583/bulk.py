@@ -0,0 +1,175 @@
+# coding=utf-8
+"""
+Decode big files of framed messages (settlement, capture) on all cores.
+
+The file is split at frame boundaries into chunks, every chunk is decoded by a worker
+process holding its own compiled spec, results come back in file order.
+"""
+import binascii
+import collections
+import csv
+import json
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from . import constant
+from . import frame
+from .codec import compile
+from .py8583 import Py8583
+from .spec import Py8583Spec
+
+
+# per worker process, set by _init_worker
+_worker_codec = None
+
+
+def split_chunks(path, length_type=constant.FrameLengthType.BIN2, chunk_frames=10000):
+    """
+    Yield (start, end) file offsets of chunks holding <chunk_frames> complete frames each.
+
+    :param path:
+    :type path: str
+    :param length_type:
+    :type length_type: constant.FrameLengthType
+    :param chunk_frames:
+    :type chunk_frames: int
+    :return:
+    :rtype: collections.Iterator[(int, int)]
+    """
+
+    with open(path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return
+
+        try:
+            chunk_start = 0
+            count = 0
+            end = 0  # end of the last complete frame
+            for start, end in frame.iter_frames(data, length_type):
+                count += 1
+                if count == chunk_frames:
+                    yield chunk_start, end
+                    chunk_start = end
+                    count = 0
+
+            if count:
+                yield chunk_start, end
+            if end < len(data):
+                raise ValueError('truncated frame at offset(%s) of %s' % (end, path))
+        finally:
+            data.close()
+
+
+def bulk_decode(path, spec_factory=Py8583Spec, length_type=constant.FrameLengthType.BIN2, header_len=0,
+                workers=None, chunk_frames=10000):
+    """
+    Decode every framed message of <path>, yield their dicts (see Py8583.to_dict) in file order.
+
+    :param path:
+    :type path: str
+    :param spec_factory: picklable callable returning the spec, called once per worker
+    :type spec_factory: () -> Py8583Spec
+    :param length_type:
+    :type length_type: constant.FrameLengthType
+    :param header_len: bytes of the header(e.g. TPDU) between the length and the MTI
+    :type header_len: int
+    :param workers: number of worker processes, default cpu count
+    :type workers: int | None
+    :param chunk_frames: frames per task sent to a worker
+    :type chunk_frames: int
+    :return:
+    :rtype: collections.Iterator[dict]
+    """
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = 2 * workers  # chunks decoded ahead of the consumer, keep memory flat
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(spec_factory,)) as executor:
+        pending = collections.deque()
+
+        for start, end in split_chunks(path, length_type, chunk_frames):
+            pending.append(executor.submit(_decode_chunk, path, start, end, length_type, header_len))
+            if len(pending) >= max_pending:
+                for result in pending.popleft().result():
+                    yield result
+
+        while pending:
+            for result in pending.popleft().result():
+                yield result
+
+
+def _init_worker(spec_factory):
+    global _worker_codec
+    _worker_codec = compile(spec_factory())
+
+
+def _decode_chunk(path, start, end, length_type, header_len):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    message = Py8583(_worker_codec)
+    view = memoryview(data)
+    results = []
+    for body_start, body_end in frame.iter_frames(data, length_type):
+        message.reset()
+        message.parse(view[body_start + header_len:body_end])
+        results.append(message.to_dict())
+
+    return results
+
+
+#### writer ####
+def _jsonable(value):
+    if isinstance(value, bytes):
+        return binascii.hexlify(value).decode('ascii').upper()
+    return value
+
+
+def write_jsonl(results, f):
+    """
+    Write every dict of <results> as a JSON line, binary fields in hex.
+
+    :param results:
+    :type results: collections.Iterable[dict]
+    :param f: text file
+    :return: number of lines written
+    :rtype: int
+    """
+
+    count = 0
+    for result in results:
+        f.write(json.dumps(dict((str(k), _jsonable(v)) for k, v in result.items())))
+        f.write('\n')
+        count += 1
+
+    return count
+
+
+def write_csv(results, f, bits):
+    """
+    Write MTI and <bits> of every dict of <results> as a CSV row, binary fields in hex.
+
+    :param results:
+    :type results: collections.Iterable[dict]
+    :param f: text file opened with newline=''
+    :param bits:
+    :type bits: list[int]
+    :return: number of rows written
+    :rtype: int
+    """
+
+    writer = csv.writer(f)
+    writer.writerow(['MTI'] + [str(bit) for bit in bits])
+
+    count = 0
+    for result in results:
+        writer.writerow(
+            [result['MTI']] + [_jsonable(result.get(bit, '')) for bit in bits]
+        )
+        count += 1
+
+    return count
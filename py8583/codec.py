@@ -0,0 +1,573 @@
+# coding=utf-8
+"""
+Compile a Py8583Spec into per-field pack/unpack callables.
+
+Py8583Field describes a field; the codec resolves that description once
+(padding, length-prefix width, data type conversion, track data) so that
+building and parsing a message does no per-field dispatch.
+"""
+import binascii
+import collections
+import struct
+
+from . import bcd
+from . import constant
+from . import err
+from . import validate
+
+
+class Py8583FieldCodec(object):
+    """
+    Specialized codec of one field.
+
+    pack(value) -> data
+    encode(value) -> (length prefix, content data), prefix is b'' if fixed
+    unpack(msg, pos) -> (value, new_pos)
+    skip(msg, pos) -> new_pos, walk over the field without decoding it
+    check(data) -> invalid bytes of the content data, None if the field is not checked
+
+    msg may be bytes, bytearray or memoryview, binary fields are returned as
+    slices of msg, so a memoryview msg gives views into the buffer.
+    """
+
+    __slots__ = ('index', 'field_spec', 'prefix_len', 'pack', 'encode', 'unpack', 'skip', 'check')
+
+    def __init__(self, field_spec):
+        """
+
+        :param field_spec:
+        :type field_spec: py8583.field.Py8583Field
+        """
+
+        self.index = field_spec.index
+        self.field_spec = field_spec
+        self.prefix_len = _len_prefix_width(field_spec)  # bytes of the length prefix, 0 if fixed
+
+        self.pack = _make_pack(field_spec)
+        self.encode = _make_encode(field_spec)
+        self.unpack = _make_unpack(field_spec)
+        self.skip = _make_skip(field_spec)
+        self.check = validate.make_check(field_spec)
+
+    def __repr__(self):
+        return '<Py8583FieldCodec index(%s)>' % (self.index,)
+
+
+class Py8583Codec(object):
+    """
+    Compiled form of a Py8583Spec.
+
+    Index it like the spec: codec[bit] -> Py8583FieldCodec.
+    """
+
+    def __init__(self, spec):
+        """
+
+        :param spec:
+        :type spec: py8583.spec.Py8583Spec
+        """
+
+        self.spec = spec
+        self.validation = constant.Validation(getattr(spec, 'validation', constant.Validation.NONE))
+
+        self.mti = _field_codec(spec['MTI'])
+
+        # index(0) is NOT used, index(1) is the bitmap.
+        self._fields = [None] * 129
+        for bit in range(2, 129):
+            self._fields[bit] = _field_codec(spec[bit])
+
+        bitmap_spec = spec[1]
+        self._bitmap_binary = bitmap_spec.data_type == constant.DataType.BIN
+
+    def __getitem__(self, bit):
+        """
+
+        :param bit:
+        :type bit: int | str
+        :return:
+        :rtype: Py8583FieldCodec
+        """
+
+        if bit == 'MTI':
+            return self.mti
+
+        return self._fields[bit]
+
+    def pack_bitmap(self, primary, secondary=None):
+        """
+
+        :param primary: bit 1-64, bit 1 is the most significant bit
+        :type primary: int
+        :param secondary: bit 65-128, None if no secondary bitmap
+        :type secondary: int | None
+        :return:
+        :rtype: bytes
+        """
+
+        if secondary is None:
+            packed = struct.pack('!Q', primary)
+        else:
+            packed = struct.pack('!QQ', primary, secondary)
+
+        if self._bitmap_binary:
+            return packed
+        else:
+            return binascii.hexlify(packed).upper()
+
+    def unpack_bitmap(self, msg, pos):
+        """
+
+        :param msg:
+        :type msg: bytes | bytearray | memoryview
+        :param pos:
+        :type pos: int
+        :return: (primary, secondary, new_pos), secondary is 0 if no secondary bitmap
+        :rtype: (int, int, int)
+        """
+
+        if self._bitmap_binary:
+            primary = struct.unpack_from('!Q', msg, pos)[0]
+            pos += 8
+            if primary >> 63:  # 使用了扩展位图
+                secondary = struct.unpack_from('!Q', msg, pos)[0]
+                pos += 8
+            else:
+                secondary = 0
+        else:  # ASCII
+            primary = int(str(msg[pos:pos + 16], 'ascii'), 16)
+            pos += 16
+            if primary >> 63:
+                secondary = int(str(msg[pos:pos + 16], 'ascii'), 16)
+                pos += 16
+            else:
+                secondary = 0
+
+        return primary, secondary, pos
+
+
+def compile(spec):
+    """
+    Compile <spec> into a Py8583Codec.
+    The codec is cached on the spec, so compiling the same spec twice is free,
+    and shared by the specs made of the same fields, validated the same way.
+
+    :param spec:
+    :type spec: py8583.spec.Py8583Spec
+    :return:
+    :rtype: Py8583Codec
+    """
+
+    if isinstance(spec, Py8583Codec):
+        return spec
+
+    codec = getattr(spec, '_codec', None)
+    if codec is None:
+        # fields are immutable, specs made of the same fields (e.g. every Py8583Spec()) share a codec
+        key = (getattr(spec, 'validation', constant.Validation.NONE),) + tuple(spec[index] for index in _SPEC_INDEXES)
+        codec = _codecs.get(key)
+        if codec is None:
+            codec = _codecs[key] = Py8583Codec(spec)
+            if len(_codecs) > _CODECS_MAX:
+                _codecs.popitem(last=False)
+
+        # the codec is derived from the fields, caching it is fine on an immutable spec too
+        object.__setattr__(spec, '_codec', codec)
+
+    return codec
+
+
+_SPEC_INDEXES = ('MTI',) + tuple(range(1, 129))
+_codecs = collections.OrderedDict()  # validation and fields of a spec -> Py8583Codec
+_CODECS_MAX = 64
+
+# field -> Py8583FieldCodec, specs differing in a few fields(dialects) share the codecs of the others
+_field_codecs = collections.OrderedDict()
+_FIELD_CODECS_MAX = 129 * _CODECS_MAX
+
+
+def _field_codec(field_spec):
+    field_codec = _field_codecs.get(field_spec)
+    if field_codec is None:
+        field_codec = _field_codecs[field_spec] = Py8583FieldCodec(field_spec)
+        if len(_field_codecs) > _FIELD_CODECS_MAX:
+            _field_codecs.popitem(last=False)
+
+    return field_codec
+
+
+#### field compiler ####
+def _make_content_encoder(field_spec):
+    """
+    value -> content(str)
+    """
+
+    content_type = field_spec.content_type
+    data_len_max = field_spec.data_len_max
+
+    if field_spec.data_len_type == constant.LengthType.FIXED:
+        if content_type == 'n':
+            def encode_content(value):
+                return str(value).rjust(data_len_max, '0')
+        elif any(t in content_type for t in 'ans'):  # any of 'ans' in content_type
+            def encode_content(value):
+                return str(value).rjust(data_len_max, ' ')
+        else:
+            encode_content = str
+    else:
+        encode_content = str
+
+    if content_type == 'z':  # 处理磁道信息
+        pad_content = encode_content
+
+        def encode_content(value):
+            content = pad_content(value).replace('=', 'D')
+            if len(content) % 2 == 1:
+                content += 'F'
+            return content
+
+    return encode_content
+
+
+def _fixed_fill(field_spec):
+    """
+    Byte a fixed field is padded with on the left, None if it is not padded. Same as _make_content_encoder.
+    """
+
+    if field_spec.content_type == 'n':
+        return b'0'
+    elif any(t in field_spec.content_type for t in 'ans'):
+        return b' '
+    else:
+        return None
+
+
+def _make_data_encoder(field_spec):
+    """
+    value -> data(bytes), without the length prefix
+    BCD fields are encoded by _make_bcd_encoder, their length is counted in digits.
+    """
+
+    data_type = field_spec.data_type
+    encoding = field_spec.encoding
+    encode_content = _make_content_encoder(field_spec)
+
+    if data_type == constant.DataType.ASCII and field_spec.data_len_type != constant.LengthType.FIXED:
+        def encode_data(value):
+            if isinstance(value, (bytes, bytearray, memoryview)):  # already encoded, e.g. TLV of field 55
+                return bytes(value)
+            return encode_content(value).encode(encoding)
+    elif data_type == constant.DataType.ASCII:
+        fill = _fixed_fill(field_spec)
+        data_len_max = field_spec.data_len_max
+
+        def encode_data(value):
+            if isinstance(value, (bytes, bytearray, memoryview)):  # already encoded, padded as a str would be
+                return bytes(value).rjust(data_len_max, fill) if fill else bytes(value)
+            return encode_content(value).encode(encoding)
+    elif data_type == constant.DataType.BIN:
+        def encode_data(value):
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                return bytes(value)
+            return encode_content(value).encode(encoding)
+    else:
+        raise err.Py8583InvalidDataTypeError(
+            'field(%s) have invalid data_type(%s)' % (field_spec.index, data_type)
+        )
+
+    return encode_data
+
+
+def _make_data_decoder(field_spec):
+    """
+    data(bytes-like) -> value
+    """
+
+    data_type = field_spec.data_type
+    encoding = field_spec.encoding
+
+    if data_type == constant.DataType.ASCII:
+        def decode_data(data):
+            return str(data, encoding)
+    elif data_type == constant.DataType.BIN:
+        def decode_data(data):  # no copy, a view stays a view
+            return data
+    else:
+        raise err.Py8583InvalidDataTypeError(
+            'field(%s) have invalid data_type(%s)' % (field_spec.index, data_type)
+        )
+
+    if field_spec.content_type == 'z':  # 处理磁道信息
+        decode_raw = decode_data
+
+        def decode_data(data):
+            return decode_raw(data).replace('D', '=').rstrip('F')
+
+    return decode_data
+
+
+def _make_bcd_encoder(field_spec):
+    """
+    value -> (digits, data) of a BCD field.
+
+    A fixed 'n' field is zero filled to data_len_max digits, a fixed 'z' one is filled with 'F'.
+    An odd number of digits is then padded to whole bytes on the bcd_pad side,
+    with '0', or 'F' for track data.
+    """
+
+    data_len_max = field_spec.data_len_max
+    fixed = field_spec.data_len_type == constant.LengthType.FIXED
+    unhexlify = binascii.unhexlify
+
+    if field_spec.content_type == 'z':  # 处理磁道信息
+        pad = 'F'
+        if fixed:
+            def to_digits(value):
+                return str(value).replace('=', 'D').ljust(data_len_max, 'F')
+        else:
+            def to_digits(value):
+                return str(value).replace('=', 'D')
+    else:
+        pad = '0'
+        if fixed:
+            def to_digits(value):
+                return str(value).rjust(data_len_max, '0')
+        else:
+            to_digits = str
+
+    if field_spec.bcd_pad == 'left':
+        def encode_bcd(value):
+            digits = to_digits(value)
+            count = len(digits)
+            if count & 1:
+                digits = pad + digits
+            return count, unhexlify(digits)
+    else:
+        def encode_bcd(value):
+            digits = to_digits(value)
+            count = len(digits)
+            if count & 1:
+                digits += pad
+            return count, unhexlify(digits)
+
+    return encode_bcd
+
+
+def _make_bcd_decoder(field_spec):
+    """
+    (data, digits) -> value of a BCD field, the padding nibble of an odd <digits> removed.
+    """
+
+    if field_spec.bcd_pad == 'left':
+        def decode_digits(data, count):
+            digits = data.hex().upper()
+            return digits[1:] if count & 1 else digits
+    else:
+        def decode_digits(data, count):
+            digits = data.hex().upper()
+            return digits[:-1] if count & 1 else digits
+
+    if field_spec.content_type == 'z':  # 处理磁道信息
+        def decode_bcd(data, count):
+            return decode_digits(data, count).replace('D', '=').rstrip('F')
+    else:
+        decode_bcd = decode_digits
+
+    return decode_bcd
+
+
+def _make_pack(field_spec):
+    index = field_spec.index
+    data_len_max = field_spec.data_len_max
+    width = _len_prefix_width(field_spec)
+
+    if field_spec.data_type == constant.DataType.BCD:
+        encode = _make_encode(field_spec)
+
+        def pack(value):
+            prefix, data = encode(value)
+            return prefix + data
+
+        return pack
+
+    encode_data = _make_data_encoder(field_spec)
+
+    if width == 0:
+        def pack(value):
+            data = encode_data(value)
+            if len(data) > data_len_max:
+                raise err.Py8583DataTooLongError(
+                    'field(%s) Got content_len(%s) > max(%s), data(%r)'
+                    % (index, len(data), data_len_max, data)
+                )
+            return data
+    else:
+        prefixes = _len_prefixes(field_spec)
+
+        def pack(value):
+            data = encode_data(value)
+            data_len = len(data)
+            if data_len > data_len_max:
+                raise err.Py8583DataTooLongError(
+                    'field(%s) Got content_len(%s) > max(%s), data(%r)'
+                    % (index, data_len, data_len_max, data)
+                )
+            return prefixes[data_len] + data
+
+    return pack
+
+
+def _make_encode(field_spec):
+    index = field_spec.index
+    data_len_max = field_spec.data_len_max
+    width = _len_prefix_width(field_spec)
+
+    if field_spec.data_type == constant.DataType.BCD:  # the length is in digits
+        encode_bcd = _make_bcd_encoder(field_spec)
+        prefixes = _len_prefixes(field_spec) if width else (b'',) * (data_len_max + 1)
+
+        def encode(value):
+            data_len, data = encode_bcd(value)
+            if data_len > data_len_max:
+                raise err.Py8583DataTooLongError(
+                    'field(%s) Got content_len(%s) > max(%s), data(%r)'
+                    % (index, data_len, data_len_max, data)
+                )
+            return prefixes[data_len], data
+
+        return encode
+
+    encode_data = _make_data_encoder(field_spec)
+
+    if width == 0:
+        def encode(value):
+            data = encode_data(value)
+            if len(data) > data_len_max:
+                raise err.Py8583DataTooLongError(
+                    'field(%s) Got content_len(%s) > max(%s), data(%r)'
+                    % (index, len(data), data_len_max, data)
+                )
+            return b'', data
+    else:
+        prefixes = _len_prefixes(field_spec)
+
+        def encode(value):
+            data = encode_data(value)
+            data_len = len(data)
+            if data_len > data_len_max:
+                raise err.Py8583DataTooLongError(
+                    'field(%s) Got content_len(%s) > max(%s), data(%r)'
+                    % (index, data_len, data_len_max, data)
+                )
+            return prefixes[data_len], data
+
+    return encode
+
+
+def _make_unpack(field_spec):
+    index = field_spec.index
+    data_len_max = field_spec.data_len_max
+    width = _len_prefix_width(field_spec)
+
+    if field_spec.data_type == constant.DataType.BCD:  # data_len in digits, two per byte
+        decode_bcd = _make_bcd_decoder(field_spec)
+
+        if width == 0:
+            size = (data_len_max + 1) // 2
+
+            def unpack(msg, pos=0):
+                end = pos + size
+                return decode_bcd(msg[pos:end], data_len_max), end
+        else:
+            decode_len = _len_prefix_decoder(field_spec)
+
+            def unpack(msg, pos=0):
+                start = pos + width
+                data_len = decode_len(msg[pos:start])
+                if data_len > data_len_max:
+                    raise ValueError(
+                        'unpack field(%s) failed, data_len(%s) is too long > max(%s)' % (index, data_len, data_len_max)
+                    )
+                end = start + (data_len + 1) // 2
+                return decode_bcd(msg[start:end], data_len), end
+
+        return unpack
+
+    decode_data = _make_data_decoder(field_spec)
+
+    if width == 0:
+        def unpack(msg, pos=0):
+            end = pos + data_len_max
+            return decode_data(msg[pos:end]), end
+    else:
+        decode_len = _len_prefix_decoder(field_spec)
+
+        def unpack(msg, pos=0):
+            start = pos + width
+            data_len = decode_len(msg[pos:start])
+            if data_len > data_len_max:
+                raise ValueError(
+                    'unpack field(%s) failed, data_len(%s) is too long > max(%s)' % (index, data_len, data_len_max)
+                )
+            end = start + data_len
+            return decode_data(msg[start:end]), end
+
+    return unpack
+
+
+def _make_skip(field_spec):
+    index = field_spec.index
+    data_len_max = field_spec.data_len_max
+    width = _len_prefix_width(field_spec)
+    bcd_data = field_spec.data_type == constant.DataType.BCD
+
+    if width == 0:
+        size = (data_len_max + 1) // 2 if bcd_data else data_len_max
+
+        def skip(msg, pos=0):
+            return pos + size
+    elif bcd_data:
+        decode_len = _len_prefix_decoder(field_spec)
+
+        def skip(msg, pos=0):
+            start = pos + width
+            data_len = decode_len(msg[pos:start])
+            if data_len > data_len_max:
+                raise ValueError(
+                    'unpack field(%s) failed, data_len(%s) is too long > max(%s)' % (index, data_len, data_len_max)
+                )
+            return start + (data_len + 1) // 2
+    else:
+        decode_len = _len_prefix_decoder(field_spec)
+
+        def skip(msg, pos=0):
+            start = pos + width
+            data_len = decode_len(msg[pos:start])
+            if data_len > data_len_max:
+                raise ValueError(
+                    'unpack field(%s) failed, data_len(%s) is too long > max(%s)' % (index, data_len, data_len_max)
+                )
+            return start + data_len
+
+    return skip
+
+
+def _len_prefix_width(field_spec):
+    try:
+        return bcd.len_prefix_width(field_spec.data_len_type, field_spec.data_len_encode_type)
+    except KeyError:
+        raise err.Py8583ProgramError(
+            'field(%s) have invalid len_type(%s)' % (field_spec.index, field_spec.data_len_type)
+        )
+    except err.Py8583InvalidDataTypeError:
+        raise err.Py8583InvalidDataTypeError(
+            'field(%s) have invalid data_len_encode_type(%s)' % (field_spec.index, field_spec.data_len_encode_type)
+        )
+
+
+def _len_prefixes(field_spec):
+    return bcd.len_prefixes(field_spec.data_len_type, field_spec.data_len_encode_type, field_spec.data_len_max + 1)
+
+
+def _len_prefix_decoder(field_spec):
+    return bcd.len_prefix_decoder(field_spec.data_len_type, field_spec.data_len_encode_type)
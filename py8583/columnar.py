@@ -0,0 +1,274 @@
+# coding=utf-8
+"""
+Decode many messages into NumPy columns, one array per requested bit.
+
+    columns, present = decode_columns(spec, msgs, [4, 7, 19, 22, 26])
+    columns[4]      # int64 amounts, 0 where the message has no field 4
+    present[4]      # bool, taken from the bitmaps
+
+Column types:
+    fixed 'n' fields, ASCII or BCD      int64 (up to 18 digits)
+    other fixed text fields and MTI     fixed width bytes, numpy 'S<width>'
+    fixed 'b' fields                    uint8, shape (messages, width)
+    variable length fields              object, the values Py8583.get_bit returns, None if absent
+
+Messages are grouped by bitmap, the fields of a group are walked for all its messages
+at once: a fixed field moves every offset by its width, the length prefixes of the
+variable ones are read as a column. The fixed fields are then decoded column by column.
+
+NumPy is optional, it's only needed by this module.
+"""
+import itertools
+
+from . import constant
+from . import err
+from . import frame
+from .codec import compile
+
+try:
+    import numpy
+except ImportError:  # optional
+    numpy = None
+
+
+_INT_DIGITS_MAX = 18  # fits int64
+
+
+def decode_columns(spec, msgs, bits):
+    """
+
+    :param spec:
+    :type spec: py8583.spec.Py8583Spec | py8583.codec.Py8583Codec
+    :param msgs:
+    :type msgs: collections.Sequence[bytes | bytearray | memoryview]
+    :param bits: 'MTI' and field numbers
+    :type bits: collections.Iterable[int | str]
+    :return: (columns, present), both {bit: numpy.ndarray}
+    :rtype: (dict, dict)
+    """
+
+    _require_numpy()
+
+    starts = list(itertools.accumulate(map(len, msgs), initial=0))
+    starts.pop()  # the end of the last one
+
+    return _decode(compile(spec), b''.join(msgs), starts, bits)
+
+
+def decode_frames(spec, data, bits, length_type=constant.FrameLengthType.BIN2, header_len=0):
+    """
+    Same as decode_columns, for a buffer of framed messages(see py8583.frame).
+
+    :param data:
+    :type data: bytes | bytearray | memoryview | mmap.mmap
+    :param length_type:
+    :type length_type: constant.FrameLengthType
+    :param header_len: bytes of the header(e.g. TPDU) between the length and the MTI
+    :type header_len: int
+    """
+
+    _require_numpy()
+
+    starts = []
+    end = 0
+    for start, end in frame.iter_frames(data, length_type):
+        starts.append(start + header_len)
+    if end < len(data):
+        raise err.Py8583Error('truncated frame at offset(%s)' % end)
+
+    return _decode(compile(spec), data, starts, bits)
+
+
+#### decode ####
+def _require_numpy():
+    if numpy is None:
+        raise err.Py8583ProgramError('numpy is required by py8583.columnar, pip install numpy')
+
+
+def _decode(codec, data, starts, bits):
+    view = memoryview(data)
+    if view.format != 'B' or view.ndim != 1:
+        view = view.cast('B')
+    buffer = numpy.frombuffer(view, dtype=numpy.uint8)
+
+    count = len(starts)
+    starts = numpy.asarray(starts, dtype=numpy.int64)
+    bits = list(bits)
+    field_bits = sorted(bit for bit in bits if bit != 'MTI')
+
+    positions = dict((bit, numpy.zeros(count, dtype=numpy.int64)) for bit in field_bits)  # start of the field
+    present = dict((bit, numpy.zeros(count, dtype=bool)) for bit in field_bits)
+
+    mti_len = codec.mti.skip(view, 0)
+    groups = _group_by_bitmap(codec, view, buffer, starts + mti_len)
+
+    # walk the fields of every group, for all its messages at once
+    wanted = set(field_bits)
+    last = field_bits[-1] if field_bits else 0
+    for (primary, secondary), indexes in groups:
+        bitmap_len = (16 if secondary else 8) * (1 if codec._bitmap_binary else 2)
+        offsets = starts[indexes] + (mti_len + bitmap_len)
+
+        for bit in _present_bits(primary, secondary, last):
+            if bit in wanted:
+                positions[bit][indexes] = offsets
+                present[bit][indexes] = True
+            offsets = _skip(codec[bit], view, buffer, offsets)
+
+    columns = {}
+    if 'MTI' in bits:
+        columns['MTI'] = _text_column(buffer, starts, mti_len)
+        present['MTI'] = numpy.ones(count, dtype=bool)
+    for bit in field_bits:
+        columns[bit] = _column(codec[bit], view, buffer, positions[bit], present[bit])
+
+    return columns, present
+
+
+def _group_by_bitmap(codec, view, buffer, positions):
+    """
+    :return: [((primary, secondary), indexes of the messages), ...]
+    """
+
+    groups = {}  # (primary, secondary) -> [index of the message, ...]
+    if codec._bitmap_binary:
+        primary = _gather(buffer, positions, 8).view('>u8').ravel()
+        secondary = numpy.zeros(len(positions), dtype=numpy.uint64)
+        extended = numpy.flatnonzero(primary >> numpy.uint64(63))
+        secondary[extended] = _gather(buffer, positions[extended] + 8, 8).view('>u8').ravel()
+
+        for index, key in enumerate(zip(primary.tolist(), secondary.tolist())):
+            groups.setdefault(key, []).append(index)
+    else:  # hex, unpacked one by one
+        for index, pos in enumerate(positions.tolist()):
+            primary, secondary, _ = codec.unpack_bitmap(view, pos)
+            groups.setdefault((primary, secondary), []).append(index)
+
+    return [(key, numpy.asarray(indexes, dtype=numpy.int64)) for key, indexes in groups.items()]
+
+
+def _present_bits(primary, secondary, last):
+    """
+    Set bits of the bitmap up to <last>, bit 1 not included.
+    """
+
+    bits = []
+    remain = (primary << 64 | secondary) & ~(1 << 127)
+    while remain:
+        high = remain.bit_length()
+        bit = 129 - high
+        if bit > last:
+            break
+        bits.append(bit)
+        remain ^= 1 << (high - 1)
+
+    return bits
+
+
+def _skip(field_codec, view, buffer, offsets):
+    """
+    Offsets after the field starting at <offsets>.
+    """
+
+    field_spec = field_codec.field_spec
+    width = field_codec.prefix_len
+
+    if not width:  # a fixed field doesn't read msg
+        return offsets + field_codec.skip(None, 0)
+
+    if field_spec.data_len_encode_type == constant.DataType.ASCII:
+        lengths = _digits(field_spec, view, _gather(buffer, offsets, width), offsets, 'length prefix')
+        if (lengths > field_spec.data_len_max).any():
+            raise ValueError('unpack field(%s) failed, data_len is too long > max(%s)' % (
+                field_spec.index, field_spec.data_len_max
+            ))
+        return offsets + width + lengths
+
+    skip = field_codec.skip
+    return numpy.fromiter((skip(view, offset) for offset in offsets.tolist()), dtype=numpy.int64, count=len(offsets))
+
+
+def _digits(field_spec, view, block, positions, what):
+    """
+    (messages, width) ascii digits -> int64
+    """
+
+    digits = block.astype(numpy.int64) - ord('0')
+    invalid = (digits < 0) | (digits > 9)
+    if invalid.any():
+        bad = int(positions[invalid.any(axis=1)][0])
+        raise err.Py8583Error('%s of field(%s) at offset(%s) is not numeric: %r' % (
+            what, field_spec.index, bad, bytes(view[bad: bad + block.shape[1]])
+        ))
+
+    return digits @ (10 ** numpy.arange(block.shape[1] - 1, -1, -1, dtype=numpy.int64))
+
+
+def _nibbles(field_spec, block):
+    """
+    (messages, bytes) BCD -> (messages, digits) ascii digits, without the padding nibble
+    """
+
+    nibbles = numpy.empty((block.shape[0], block.shape[1] * 2), dtype=numpy.uint8)
+    nibbles[:, 0::2] = block >> 4
+    nibbles[:, 1::2] = block & 0x0f
+    if field_spec.data_len_max & 1:
+        nibbles = nibbles[:, 1:] if field_spec.bcd_pad == 'left' else nibbles[:, :-1]
+
+    return nibbles + ord('0')
+
+
+#### column ####
+def _gather(buffer, positions, width):
+    """
+    (messages, width) uint8, the bytes at <positions>
+    """
+
+    return buffer[positions[:, None] + numpy.arange(width, dtype=numpy.int64)]
+
+
+def _text_column(buffer, positions, width):
+    block = numpy.ascontiguousarray(_gather(buffer, positions, width))
+    return block.view('S%d' % width).reshape(len(positions))
+
+
+def _column(field_codec, view, buffer, positions, present):
+    field_spec = field_codec.field_spec
+    count = len(positions)
+
+    if not field_codec.prefix_len and field_spec.content_type != 'z':
+        width = field_codec.skip(None, 0)
+        rows = numpy.flatnonzero(present)
+
+        if field_spec.data_type == constant.DataType.BIN:
+            column = numpy.zeros((count, width), dtype=numpy.uint8)
+            column[rows] = _gather(buffer, positions[rows], width)
+            return column
+
+        if field_spec.data_type == constant.DataType.ASCII:
+            if field_spec.content_type == 'n' and width <= _INT_DIGITS_MAX:
+                column = numpy.zeros(count, dtype=numpy.int64)
+                column[rows] = _digits(
+                    field_spec, view, _gather(buffer, positions[rows], width), positions[rows], 'content'
+                )
+                return column
+
+            column = numpy.zeros(count, dtype='S%d' % width)
+            column[rows] = _text_column(buffer, positions[rows], width)
+            return column
+
+        if field_spec.data_type == constant.DataType.BCD and field_spec.data_len_max <= _INT_DIGITS_MAX:
+            column = numpy.zeros(count, dtype=numpy.int64)
+            column[rows] = _digits(
+                field_spec, view, _nibbles(field_spec, _gather(buffer, positions[rows], width)), positions[rows], 'content'
+            )
+            return column
+
+    # variable length, or a type not decoded in bulk
+    column = numpy.empty(count, dtype=object)
+    unpack = field_codec.unpack
+    for index in numpy.flatnonzero(present).tolist():
+        value = unpack(view, int(positions[index]))[0]
+        column[index] = value.tobytes() if isinstance(value, memoryview) else value
+
+    return column
@@ -12,6 +12,15 @@ class LengthType(IntEnum):
     LLVAR = 2
     LLLVAR = 3
 
+class Validation(IntEnum):
+    NONE = 0
+    BUILD = 1  # check the content types of every built message
+    ALL = 2  # and of every parsed one
+
+class FrameLengthType(IntEnum):
+    BIN2 = 1  # 2 bytes binary, big-endian
+    ASCII4 = 2  # 4 ascii digits
+
 # logging模块的logger名称
 # LOGGER_NAME = 'py8583'
 LOGGER_NAME = None
\ No newline at end of file
@@ -0,0 +1,204 @@
+# coding=utf-8
+"""
+Specs of the networks one gateway talks to, each one a delta over a base.
+
+    dialects = Py8583Dialects(default='iso')
+    dialects.register('iso', {'fields': {}})
+    dialects.register('cup', {'fields': {
+        '2': {'data_type': 'BCD', 'data_len_encode_type': 'BCD'},
+        '32': {'data_len_max': 28},
+    }})
+    dialects.register('cup_acq', {'base': 'cup', 'fields': {'48': {'content_type': 'ans'}}})
+
+    dialects.route_link('unionpay-1', 'cup')
+    dialects.route_header(b'\\x60\\x00\\x03\\x00\\x00', 'cup_acq')    # e.g. the TPDU
+    dialects.route_MTI('0800', 'iso')
+
+    message = dialects.parse(msg, link='unionpay-1')
+
+Every dialect is loaded by load_spec and compiled once. A field a dialect doesn't change
+is the very field of its base, so its compiled codec is shared too.
+
+dispatch() looks at the link, then the header, then the MTI as it is encoded at the start
+of msg, then falls back to the default dialect. Nothing of msg is decoded to choose.
+"""
+from . import err
+from .codec import compile
+from .py8583 import Py8583
+from .spec import load_spec
+
+
+class Py8583Dialects(object):
+
+    def __init__(self, default=None):
+        """
+
+        :param default: dialect used when no route matches, None to raise Py8583DialectError
+        :type default: str | None
+        """
+
+        self.default = default
+
+        self._specs = {}  # name -> Py8583Spec
+        self._deltas = {}  # name -> (fields, validation), the delta over the default spec
+        self._links = {}  # link -> codec
+        self._headers = {}  # header bytes -> codec
+        self._MTIs = {}  # encoded MTI -> codec
+        self._MTI_lens = []  # lengths of the encoded MTIs routed, ascending
+
+    def register(self, name, definition):
+        """
+        Register a dialect, the definition is the declarative form of load_spec:
+
+            {
+                "base": "cup",          # optional, a registered dialect, default the default spec
+                "validation": "BUILD",  # optional, default the one of the base
+                "fields": {"32": {"data_len_max": 28}, ...},
+            }
+
+        :param name:
+        :type name: str
+        :param definition:
+        :type definition: dict
+        :return: the compiled spec of the dialect
+        :rtype: py8583.spec.Py8583Spec
+        """
+
+        if name in self._specs:
+            raise err.Py8583DialectError('dialect(%s) is registered already' % name)
+
+        base = definition.get('base', 'default')
+        if base == 'default':
+            base_fields, base_validation = {}, 'NONE'
+        elif base in self._deltas:
+            base_fields, base_validation = self._deltas[base]
+        else:
+            raise err.Py8583DialectError('dialect(%s): unknown base(%s)' % (name, base))
+
+        fields = dict(base_fields)
+        for key, attrs in definition.get('fields', {}).items():
+            key = str(key)
+            merged = dict(fields.get(key, {}))
+            merged.update(attrs)
+            fields[key] = merged
+        validation = definition.get('validation', base_validation)
+
+        spec = load_spec({'base': 'default', 'fields': fields, 'validation': validation})
+
+        self._specs[name] = spec
+        self._deltas[name] = (fields, validation)
+
+        return spec
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def __iter__(self):
+        return iter(self._specs)
+
+    def __getitem__(self, name):
+        """
+
+        :param name:
+        :type name: str
+        :return:
+        :rtype: py8583.spec.Py8583Spec
+        """
+
+        try:
+            return self._specs[name]
+        except KeyError:
+            raise err.Py8583DialectError('unknown dialect(%s)' % name)
+
+    def codec(self, name):
+        """
+
+        :param name:
+        :type name: str
+        :return:
+        :rtype: py8583.codec.Py8583Codec
+        """
+
+        return compile(self[name])
+
+    #### route ####
+    def route_link(self, link, name):
+        """
+        Messages of <link>(any hashable, e.g. the name or the address of a connection) are <name>.
+        """
+
+        self._links[link] = self.codec(name)
+
+    def route_header(self, header, name):
+        """
+        Messages carrying <header>(e.g. a TPDU) are <name>.
+
+        :param header:
+        :type header: bytes
+        """
+
+        self._headers[bytes(header)] = self.codec(name)
+
+    def route_MTI(self, MTI, name):
+        """
+        Messages of <MTI> are <name>, the MTI is matched as <name> encodes it(ASCII, BCD...).
+
+        :param MTI:
+        :type MTI: str
+        """
+
+        codec = self.codec(name)
+        encoded = codec.mti.pack(MTI)
+
+        self._MTIs[encoded] = codec
+        if len(encoded) not in self._MTI_lens:
+            self._MTI_lens = sorted(self._MTI_lens + [len(encoded)])
+
+    def dispatch(self, link=None, header=None, msg=None):
+        """
+        The codec of a message, by its link, its header or the MTI at the start of <msg>.
+
+        :param link:
+        :param header:
+        :type header: bytes | bytearray | memoryview | None
+        :param msg: the message, the header excluded
+        :type msg: bytes | bytearray | memoryview | None
+        :return:
+        :rtype: py8583.codec.Py8583Codec
+        """
+
+        if link is not None:
+            codec = self._links.get(link)
+            if codec is not None:
+                return codec
+
+        if header is not None:
+            codec = self._headers.get(bytes(header))
+            if codec is not None:
+                return codec
+
+        if msg is not None:
+            for length in self._MTI_lens:
+                codec = self._MTIs.get(bytes(msg[:length]))
+                if codec is not None:
+                    return codec
+
+        if self.default is not None:
+            return self.codec(self.default)
+
+        raise err.Py8583DialectError('no dialect for link(%r), header(%r), msg(%r)' % (
+            link, None if header is None else bytes(header), None if msg is None else bytes(msg[:8])
+        ))
+
+    def parse(self, msg, link=None, header=None, lazy=False, trace_hook=None, only=None):
+        """
+        Parse <msg> with the dialect dispatch() picks.
+
+        :return:
+        :rtype: Py8583
+        """
+
+        message = Py8583(self.dispatch(link, header, msg), trace_hook=trace_hook)
+        message.parse(msg, lazy=lazy, only=only)
+
+        return message
@@ -24,8 +24,49 @@ class Py8583DataTooLongError(Py8583Error):
     pass
 
 
+class Py8583BufferTooSmallError(Py8583Error):
+    """
+    buffer is too small to hold the message.
+    """
+    pass
+
+
 class Py8583InvalidDataTypeError(Py8583Error):
     """
     Invalid data type.
     """
-    pass
\ No newline at end of file
+    pass
+
+class Py8583TLVError(Py8583Error):
+    """
+    Malformed TLV data, e.g. field 55.
+    """
+    pass
+
+
+class Py8583SpecError(Py8583Error):
+    """
+    Invalid spec definition, <problems> lists every problem found.
+    """
+
+    def __init__(self, message, problems=()):
+        super(Py8583SpecError, self).__init__(message)
+        self.problems = list(problems)
+
+
+class Py8583ValidationError(Py8583Error):
+    """
+    Field contents not matching their content type,
+    <violations> lists every one found: [(bit, content_type, invalid bytes), ...]
+    """
+
+    def __init__(self, message, violations=()):
+        super(Py8583ValidationError, self).__init__(message)
+        self.violations = list(violations)
+
+
+class Py8583DialectError(Py8583Error):
+    """
+    Unknown dialect, or no dialect matches a message.
+    """
+    pass
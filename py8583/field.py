@@ -2,19 +2,30 @@
 """
 
 """
-import binascii
 import json
 import logging
 
 from . import constant
 from . import err
+from .bcd import bcd2str, str2bcd
 
 log = logging.getLogger(constant.LOGGER_NAME)
 
 
 class Py8583Field(object):
+    """
+    A field is immutable once created, so it can be shared by every spec and by the compiled codecs,
+    use replace() to get a modified copy.
+    """
+
+    __slots__ = (
+        'index', 'field_type', 'field_name', 'data_len_max', 'data_len_type', 'data_len_encode_type',
+        'data_type', 'content_type', 'bcd_pad', 'reserved', 'remark', 'encoding', '_frozen',
+    )
+
     _FORMAT_STR = '{index}'
-    def __init__(self, index, field_name, content_type, data_len_max, data_len_type, encoding='latin', remark=''):
+    def __init__(self, index, field_name, content_type, data_len_max, data_len_type, encoding='latin', remark='',
+                 data_type=None, data_len_encode_type=constant.DataType.ASCII, bcd_pad=None):
         """
         value -> content -> data -> field
 
@@ -26,9 +37,13 @@ class Py8583Field(object):
         :param content_type: 该域的值的类型, 可以是: 字母字符串, 数字字符串, 二进制串, 月份(MM), 日期(DD)等
         :param data_len_max: 将该域的值(content)打包为data后, data的最大长度
         :param data_len_type: data的长度类型, 定长, 1位变长, 2位变长, 3位变长
-        :param data_type: 封装该域的值(content) 的容器的类型,可以是二进制,ASC字符串,BCD码
         :param encoding: content的编码, 如utf8, latin. 需要将value编码为encoding指定的编码方式.
         :param remark: 备注
+        :param data_type: 封装该域的值(content) 的容器的类型,可以是二进制,ASC字符串,BCD码.
+            None: 'b' is BIN, the others ASCII. BCD is only for 'n' and 'z', data_len_max and the length are then in digits.
+        :param data_len_encode_type: 长度前缀的编码类型, ASCII, BCD or BIN
+        :param bcd_pad: side of the padding nibble of an odd number of BCD digits, 'left' or 'right'.
+            None: 'right' for 'z'(track data), 'left' for the others.
         """
         self.index = index  # 域索引
 
@@ -37,21 +52,70 @@ class Py8583Field(object):
 
         self.data_len_max = data_len_max  # 数据长度最大值
         self.data_len_type = data_len_type  # 数据长度类型
-        self.data_len_encode_type = constant.DataType.ASCII  # 数据域长度的编码类型
+        self.data_len_encode_type = constant.DataType(data_len_encode_type)  # 数据域长度的编码类型
 
-        self.data_type = self._gen_data_type(content_type)  # 数据类型
+        self.data_type = self._gen_data_type(content_type) if data_type is None else constant.DataType(data_type)  # 数据类型
         self.content_type = content_type
+        self.bcd_pad = self._gen_bcd_pad(content_type) if bcd_pad is None else bcd_pad
+        if self.data_type == constant.DataType.BCD and content_type not in ('n', 'z'):
+            raise err.Py8583InvalidDataTypeError(
+                'field(%s) of content_type(%s) can not be BCD' % (index, content_type)
+            )
+        if self.bcd_pad not in ('left', 'right'):
+            raise err.Py8583ProgramError('field(%s) have invalid bcd_pad(%r)' % (index, bcd_pad))
         self.reserved = None  # 保留
 
         self.remark = remark
         self.encoding = encoding
 
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise err.Py8583ProgramError(
+                'field(%s) is immutable, use replace(%s=...) to get a modified copy' % (self.index, name)
+            )
+        object.__setattr__(self, name, value)
+
     def __str__(self):
         return json.dumps(
-            vars(self),
+            dict(
+                (name, getattr(self, name))
+                for name in Py8583Field.__slots__
+                if name != '_frozen'
+            ),
             indent=4
         )
 
+    def replace(self, **changes):
+        """
+        Return a copy of the field, with <changes> applied.
+
+            spec[32].replace(data_len_max=28)
+
+        :return:
+        :rtype: Py8583Field
+        """
+
+        kwargs = {
+            'index': self.index,
+            'field_name': self.field_name,
+            'content_type': self.content_type,
+            'data_len_max': self.data_len_max,
+            'data_len_type': self.data_len_type,
+            'encoding': self.encoding,
+            'remark': self.remark,
+            'data_len_encode_type': self.data_len_encode_type,
+        }
+        # derived from content_type unless given, so a new content_type derives them again
+        if self.data_type != self._gen_data_type(self.content_type):
+            kwargs['data_type'] = self.data_type
+        if self.bcd_pad != self._gen_bcd_pad(self.content_type):
+            kwargs['bcd_pad'] = self.bcd_pad
+        kwargs.update(changes)
+
+        return type(self)(**kwargs)
+
     def gen_data_len(self, data):
         """
         通过content, 计算得到data_len
@@ -230,6 +294,12 @@ class Py8583Field(object):
         else:
             return constant.DataType.ASCII
 
+    def _gen_bcd_pad(self, content_type):
+        if content_type == 'z':  # 磁道信息补在右边
+            return 'right'
+        else:
+            return 'left'
+
     def _trans_track_data(self, value):
         # 处理磁道信息
         if self.content_type == 'z':
@@ -299,12 +369,3 @@ class Py8583ComposedField(Py8583Field):
     def unpack(self, msg, pos=0):
         raise NotImplementedError()
 
-
-def bcd2str(bcd):
-    return binascii.hexlify(bcd).decode('latin')
-
-
-def str2bcd(string):
-    if(len(string) % 2 == 1):
-        string = string.zfill(len(string) + 1)
-    return binascii.unhexlify(string)
@@ -1,60 +1,296 @@
 # coding=utf-8
-import binascii
-import json
+"""
+BER-TLV of field 55 (ICC system related data).
 
-def parse(s):
-    """
+    tlv = Py8583TLV(icc_data)
+    tlv.get(0x9F26)       # or tlv.get('9F26'), tlv.get(b'\\x9f\\x26') -> bytes
+    tlv.view(0x9F10)      # memoryview into icc_data, no copy
+    tlv.template(0x70)    # a constructed tag, indexed on first use
+    tlv.find(0x5F34)      # search into the constructed tags too
 
-    :param s:
-    :type s: str
-    :return:
-    :rtype: dict
+    encode([(0x9F26, arqc), (0x9F27, b'\\x80')])   # -> bytes for Py8583.set_bit(55, ...)
+
+Tags are ints, 0x9F26 for '9F26'. The data is indexed once, values are
+sliced out only when they're asked for.
+"""
+from . import err
+
+
+class Py8583TLV(object):
     """
-    fields = {}
+    Index of the data objects at one level of BER-TLV data.
+    """
+
+    __slots__ = ('_raw', '_entries', '_index', '_templates')
+
+    def __init__(self, data):
+        """
+
+        :param data:
+        :type data: bytes | bytearray | memoryview
+        """
+
+        view = memoryview(data)
+        if view.format != 'B' or view.ndim != 1:
+            view = view.cast('B')
+
+        # bytes(bytes) is the same object, slicing bytes makes one copy only
+        self._raw = data if type(data) is bytes else view
+        self._entries = _index_tlv(view, 0, len(view))  # [(tag, start, value_pos, value_len, constructed), ...]
+        self._index = {}  # tag -> entry, the first one wins
+        for entry in self._entries:
+            self._index.setdefault(entry[0], entry)
+        self._templates = {}  # tag -> Py8583TLV
+
+    def __repr__(self):
+        return '<Py8583TLV %s>' % ' '.join(tag_hex(entry[0]) for entry in self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        for entry in self._entries:
+            yield entry[0]
+
+    def __contains__(self, tag):
+        return _tag_key(tag) in self._index
+
+    def __getitem__(self, tag):
+        entry = self._index.get(_tag_key(tag))
+        if entry is None:
+            raise KeyError(tag)
+
+        return bytes(self._raw[entry[2]: entry[2] + entry[3]])
+
+    #### access ####
+    def get(self, tag, default=None):
+        """
+        Value of <tag>.
+
+        :param tag: 0x9F26, '9F26' or b'\\x9f\\x26'
+        :type tag: int | str | bytes
+        :param default: returned when <tag> is absent
+        :return:
+        :rtype: bytes
+        """
+
+        entry = self._index.get(tag if tag.__class__ is int else _tag_key(tag))
+        if entry is None:
+            return default
+
+        return bytes(self._raw[entry[2]: entry[2] + entry[3]])
+
+    def view(self, tag):
+        """
+        Value of <tag> as a view into the data, None if <tag> is absent.
+
+        :rtype: memoryview | None
+        """
+
+        entry = self._index.get(_tag_key(tag))
+        if entry is None:
+            return None
+
+        return memoryview(self._raw)[entry[2]: entry[2] + entry[3]]
+
+    def raw(self, tag):
+        """
+        The whole data object of <tag> (tag, length and value), None if <tag> is absent.
+
+        :rtype: memoryview | None
+        """
+
+        entry = self._index.get(_tag_key(tag))
+        if entry is None:
+            return None
+
+        return memoryview(self._raw)[entry[1]: entry[2] + entry[3]]
+
+    def offset(self, tag):
+        """
+        (offset, length) of the value of <tag>, None if <tag> is absent.
+
+        :rtype: (int, int) | None
+        """
+
+        entry = self._index.get(_tag_key(tag))
+        if entry is None:
+            return None
+
+        return entry[2], entry[3]
+
+    def items(self):
+        """
+        (tag, value) of every data object, in order.
+        """
+
+        raw = self._raw
+        for tag, _, pos, length, _ in self._entries:
+            yield tag, bytes(raw[pos: pos + length])
 
-    index = 0
-    while index < len(s):
-        tag = s[index]
-        # 判定tag是否占两个字节长度
-        if 0b11111 == (ord(tag) & 0b11111):
-            tag = s[index:index+2]
-            index += 2
+    #### constructed ####
+    def is_constructed(self, tag):
+        entry = self._index.get(_tag_key(tag))
+        return entry is not None and entry[4]
+
+    def template(self, tag):
+        """
+        Data objects inside the constructed <tag>, indexed on first use.
+
+        :rtype: Py8583TLV
+        """
+
+        key = _tag_key(tag)
+        template = self._templates.get(key)
+        if template is None:
+            entry = self._index.get(key)
+            if entry is None:
+                raise KeyError(tag)
+            if not entry[4]:
+                raise err.Py8583TLVError('tag(%s) is primitive, not a template' % tag_hex(key))
+
+            template = self._templates[key] = Py8583TLV(memoryview(self._raw)[entry[2]: entry[2] + entry[3]])
+
+        return template
+
+    def find(self, tag, default=None):
+        """
+        Value of <tag> at this level, or else in the first constructed tag holding it.
+
+        :rtype: bytes
+        """
+
+        key = _tag_key(tag)
+        if key in self._index:
+            return self.get(key)
+
+        for entry in self._entries:
+            if entry[4]:
+                value = self.template(entry[0]).find(key)
+                if value is not None:
+                    return value
+
+        return default
+
+
+#### tag ####
+_TAG_KEYS = {}  # '9F26' / b'\x9f\x26' -> 0x9F26
+_TAG_BYTES = {}  # 0x9F26 / '9F26' / b'\x9f\x26' -> b'\x9f\x26'
+_TAG_KEYS_MAX = 1024
+
+
+def _tag_key(tag):
+    if isinstance(tag, int):
+        return tag
+
+    key = _TAG_KEYS.get(tag)
+    if key is None:
+        if isinstance(tag, str):
+            key = int(tag, 16)
         else:
-            index += 1
-        tag = binascii.hexlify(tag)
+            key = int.from_bytes(tag, 'big')
+        if len(_TAG_KEYS) < _TAG_KEYS_MAX:
+            _TAG_KEYS[tag] = key
 
-        # 求长度
-        length, length_len = _parse_len(s, index)
-        index += length_len
+    return key
 
-        value = s[index:index+length]
-        value = binascii.hexlify(value)
-        index += length
 
-        fields[tag] = {
-            'len': length,
-            'value': value
-        }
+def tag_bytes(tag):
+    """
+    0x9F26 -> b'\\x9f\\x26'
+
+    :param tag:
+    :type tag: int | str | bytes
+    :return:
+    :rtype: bytes
+    """
 
+    encoded = _TAG_BYTES.get(tag)
+    if encoded is None:
+        key = _tag_key(tag)
+        encoded = key.to_bytes((key.bit_length() + 7) // 8 or 1, 'big')
+        if len(_TAG_BYTES) < _TAG_KEYS_MAX:
+            _TAG_BYTES[tag] = encoded
 
-    return fields
+    return encoded
 
-def build(data):
+
+def tag_hex(tag):
     """
+    0x9F26 -> '9F26'
 
-    :param data:
-    :type data: dict[str,dict]
-    :return: hexlify str
+    :param tag:
+    :type tag: int
+    :return:
     :rtype: str
     """
 
-    fields = []
-    for tag, info in data.items():
-        field = tag + _build_len(info['len']) + info['value']
+    return '%0*X' % (((tag.bit_length() + 7) // 8 or 1) * 2, tag)
 
-        fields.append(field)
 
-    return ''.join(fields)
+def _index_tlv(data, pos, end):
+    """
+    One pass over data[pos:end].
+
+    :return: [(tag, start, value_pos, value_len, constructed), ...]
+    :rtype: list[tuple]
+    """
+
+    entries = []
+    append = entries.append
+
+    while pos < end:
+        start = pos
+        tag = data[pos]
+        pos += 1
+        if tag == 0x00:  # 数据对象之间的填充
+            continue
+
+        constructed = bool(tag & 0x20)
+        if tag & 0x1f == 0x1f:  # 后续字节最高位为1则tag继续
+            while True:
+                if pos >= end:
+                    raise err.Py8583TLVError('truncated tag at offset(%s)' % start)
+                byte = data[pos]
+                pos += 1
+                tag = (tag << 8) | byte
+                if not byte & 0x80:
+                    break
+
+        if pos >= end:
+            raise err.Py8583TLVError('missing length of tag(%s) at offset(%s)' % (tag_hex(tag), start))
+        length, pos = _parse_len(data, pos, end)
+
+        if pos + length > end:
+            raise err.Py8583TLVError(
+                'value of tag(%s) at offset(%s) needs %s bytes, only %s left' % (tag_hex(tag), start, length, end - pos)
+            )
+
+        append((tag, start, pos, length, constructed))
+        pos += length
+
+    return entries
+
+
+#### length ####
+def _parse_len(data, pos, end):
+    """
+
+    :return: length, position of the value
+    :rtype: (int, int)
+    """
+
+    length = data[pos]
+    pos += 1
+    if length & 0x80:  # 第一字节最高位为1, 右边7bit为后续长度字节数
+        count = length & 0x7f
+        if count == 0 or count > 4 or pos + count > end:
+            raise err.Py8583TLVError('invalid length at offset(%s)' % (pos - 1))
+        length = int.from_bytes(data[pos: pos + count], 'big')
+        pos += count
+
+    return length, pos
+
 
 def _build_len(length):
     """
@@ -62,56 +298,191 @@ def _build_len(length):
     :param length:
     :type length: int
     :return:
-    :rtype: str
+    :rtype: bytes
     """
 
-    assert length >= 0 and length <= 65535
-
     if length <= 127:
-        len_str = chr(length)
-    elif 128 <= length and length <= 255:
-        len_byte1 = chr(0x81)
-        len_byte2 = chr(length)
+        if length < 0:
+            raise err.Py8583TLVError('length(%s) out of range' % length)
+        return _SHORT_LENS[length]
+
+    count = (length.bit_length() + 7) // 8
+    if count > 4:
+        raise err.Py8583TLVError('length(%s) out of range' % length)
+
+    return bytes((0x80 | count,)) + length.to_bytes(count, 'big')
+
+
+_SHORT_LENS = tuple(bytes((length,)) for length in range(128))
+
+
+#### build ####
+def encode(items):
+    """
+    Encode data objects in the given order, lengths are computed from the values.
+
+        encode([(0x9F26, arqc), (0x9F27, b'\\x80'), (0x70, [(0x5A, pan)])])
+
+    :param items: (tag, value) in order, a list value is encoded as a constructed tag
+    :type items: collections.Iterable[(int | str | bytes, bytes | list)]
+    :return:
+    :rtype: bytes
+    """
+
+    headers, values, size = _encode_plan(items)
+
+    buffer = bytearray(size)
+    _fill(buffer, 0, headers, values)
+
+    return bytes(buffer)
+
+
+def encode_into(buffer, offset, items):
+    """
+    Same as encode, but write into <buffer> at <offset>.
+
+    :return: offset after the data objects
+    :rtype: int
+    """
+
+    headers, values, size = _encode_plan(items)
+    if offset + size > len(buffer):
+        raise err.Py8583BufferTooSmallError(
+            'buffer(%s) from offset(%s) is too small for %s bytes' % (len(buffer), offset, size)
+        )
+
+    return _fill(buffer, offset, headers, values)
+
+
+def _encode_plan(items):
+    """
+    Tag and length of every data object, sized before anything is written.
+    """
+
+    headers = []
+    values = []
+    size = 0
+    for tag, value in items:
+        if isinstance(value, list):
+            value = encode(value)
+        header = tag_bytes(tag) + _build_len(len(value))
+        headers.append(header)
+        values.append(value)
+        size += len(header) + len(value)
 
-        len_str = len_byte1+len_byte2
-    else:
-        len_byte1 = chr(0x82)
-        len_byte2 = chr(length>>8)
-        len_byte3 = chr(length&0xff)
+    return headers, values, size
 
-        len_str = len_byte1+len_byte2+len_byte3
 
-    return binascii.hexlify(len_str)
+def _fill(buffer, pos, headers, values):
+    view = memoryview(buffer)
+    for header, value in zip(headers, values):
+        end = pos + len(header)
+        view[pos:end] = header
+        pos = end
+        end = pos + len(value)
+        view[pos:end] = value
+        pos = end
 
-def _parse_len(s, index):
-    length_byte1 = s[index]
+    return pos
 
-    if 0 == (ord(length_byte1) & 0x80):  # 第一字节最高位为0, 长度为1字节
-        length = ord(length_byte1)
-        length_len = 1
-    else:  # 第一字节最高位为1,T的长度为变长(第一字节右边7bit为T的长度)
-        length_byte2 = s[index + 1]
 
-        # 这是L的值 所占的字节. L的长度 所占字节固定为1
-        remain_bytes = ord(length_byte1) & 0x7f
-        assert remain_bytes == 1 or remain_bytes == 2
-        length_len = 1 + remain_bytes
+class Py8583TLVTemplate(object):
+    """
+    Field 55 of which only a few tags change between transactions.
+
+        template = Py8583TLVTemplate([(0x9F26, arqc), (0x9F37, b'\\x00' * 4), (0x9A, b'\\x00' * 3), ...])
+        message.set_bit(55, template.build({0x9F37: unpredictable_number, 0x9A: date}))
+
+    The data is encoded once into a buffer, build() only overwrites the values of
+    the dynamic tags, which keep the length they have in <items>.
+    A template holds one buffer, use one per thread.
+    """
+
+    DYNAMIC_TAGS = (0x9F37, 0x9A, 0x9F02)
+
+    def __init__(self, items, dynamic=DYNAMIC_TAGS):
+        """
+
+        :param items: see encode, dynamic tags hold a placeholder of the right length
+        :type items: collections.Iterable[(int | str | bytes, bytes | list)]
+        :param dynamic: tags changed by build
+        :type dynamic: collections.Iterable[int | str | bytes]
+        """
+
+        self._buffer = bytearray(encode(items))
+
+        tlv = Py8583TLV(bytes(self._buffer))
+        self._slots = {}  # tag -> (offset, length) of the value
+        for tag in dynamic:
+            key = _tag_key(tag)
+            slot = tlv.offset(key)
+            if slot is None:
+                raise err.Py8583TLVError('dynamic tag(%s) is not in the template' % tag_hex(key))
+            self._slots[key] = slot
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def build(self, values=None):
+        """
+
+        :param values: dynamic tag -> value, the tags not given keep their last value
+        :type values: dict[int, bytes]
+        :return:
+        :rtype: bytes
+        """
+
+        buffer = self._buffer
+        if values:
+            for tag, value in values.items():
+                slot = self._slots.get(tag if tag.__class__ is int else _tag_key(tag))
+                if slot is None:
+                    raise err.Py8583TLVError('tag(%s) is not dynamic in the template' % tag_hex(_tag_key(tag)))
+                pos, length = slot
+                if len(value) != length:
+                    raise err.Py8583TLVError(
+                        'tag(%s) needs %s bytes, got %s' % (tag_hex(_tag_key(tag)), length, len(value))
+                    )
+                buffer[pos:pos + length] = value
+
+        return bytes(buffer)
+
+
+#### hex dict ####
+def parse(s):
+    """
+    {tag: {'len': ..., 'value': ...}}, tag and value are lower case hex.
+
+    :param s:
+    :type s: bytes | bytearray | memoryview
+    :return:
+    :rtype: dict
+    """
 
-        if remain_bytes == 1:
-            length = ord(length_byte2)
-        else:  # remain_bytes == 2
-            length_byte3 = s[index + 2]
-            length = ord(length_byte2) << 8 + ord(length_byte3)
+    tlv = Py8583TLV(s)
+    raw = tlv._raw
 
-    return length, length_len
+    fields = {}
+    for tag, _, pos, length, _ in tlv._entries:
+        fields[tag_hex(tag).lower()] = {
+            'len': length,
+            'value': bytes(raw[pos: pos + length]).hex(),
+        }
 
+    return fields
 
-if __name__ == '__main__':
-    
-    s_l = [
-        
-    ]
 
-    for s in s_l:
-        print json.dumps(parse(s), indent=4)
+def build(data):
+    """
 
+    :param data: as returned by parse
+    :type data: dict[str,dict]
+    :return: hexlify str
+    :rtype: str
+    """
+
+    fields = []
+    for tag, info in data.items():
+        fields.append(tag + _build_len(info['len']).hex() + info['value'])
+
+    return ''.join(fields)
@@ -0,0 +1,281 @@
+# coding=utf-8
+"""
+Length-prefixed framing of ISO 8583 messages on a stream.
+
+frame = length + header(optional, e.g. TPDU) + message
+The length counts the header and the message, not itself.
+"""
+import struct
+
+from . import constant
+from . import err
+
+
+_LENGTH_FIELD_LEN = {
+    constant.FrameLengthType.BIN2: 2,
+    constant.FrameLengthType.ASCII4: 4,
+}
+
+_LENGTH_MAX = {
+    constant.FrameLengthType.BIN2: 0xffff,
+    constant.FrameLengthType.ASCII4: 9999,
+}
+
+
+def length_field_len(length_type):
+    """
+
+    :param length_type:
+    :type length_type: constant.FrameLengthType
+    :return: bytes of the length field
+    :rtype: int
+    """
+
+    try:
+        return _LENGTH_FIELD_LEN[length_type]
+    except KeyError:
+        raise err.Py8583ProgramError('Invalid frame length_type(%s)' % (length_type,))
+
+
+def pack_length(length, length_type):
+    """
+
+    :param length:
+    :type length: int
+    :param length_type:
+    :type length_type: constant.FrameLengthType
+    :return:
+    :rtype: bytes
+    """
+
+    if length > _LENGTH_MAX[length_type]:
+        raise err.Py8583DataTooLongError(
+            'frame length(%s) > max(%s) of %s' % (length, _LENGTH_MAX[length_type], length_type)
+        )
+
+    if length_type == constant.FrameLengthType.BIN2:
+        return struct.pack('!H', length)
+    else:  # ASCII4
+        return b'%04d' % length
+
+
+def unpack_length(data, pos, length_type):
+    """
+
+    :param data:
+    :type data: bytes | bytearray | memoryview
+    :param pos:
+    :type pos: int
+    :param length_type:
+    :type length_type: constant.FrameLengthType
+    :return:
+    :rtype: int
+    """
+
+    if length_type == constant.FrameLengthType.BIN2:
+        return struct.unpack_from('!H', data, pos)[0]
+    else:  # ASCII4
+        length_str = bytes(data[pos:pos + 4])
+        if not length_str.isdigit():
+            raise err.Py8583Error('Invalid ascii frame length(%r) at pos(%s)' % (length_str, pos))
+        return int(length_str)
+
+
+def pack_frame(msg, length_type, header=b''):
+    """
+
+    :param msg:
+    :type msg: bytes
+    :param length_type:
+    :type length_type: constant.FrameLengthType
+    :param header:
+    :type header: bytes
+    :return:
+    :rtype: bytes
+    """
+
+    return b''.join([pack_length(len(header) + len(msg), length_type), header, msg])
+
+
+def iter_frames(data, length_type, pos=0, end=None):
+    """
+    Yield (start, end) of the body (header + message) of every complete frame in data[pos:end].
+    Stop at the first incomplete frame, whose length field starts at the last yielded end.
+
+    :param data:
+    :type data: bytes | bytearray | memoryview
+    :param length_type:
+    :type length_type: constant.FrameLengthType
+    :param pos:
+    :type pos: int
+    :param end:
+    :type end: int | None
+    :return:
+    :rtype: collections.Iterator[(int, int)]
+    """
+
+    if end is None:
+        end = len(data)
+    length_len = length_field_len(length_type)
+
+    while pos + length_len <= end:
+        start = pos + length_len
+        frame_end = start + unpack_length(data, pos, length_type)
+        if frame_end > end:
+            break
+
+        yield start, frame_end
+        pos = frame_end
+
+
+class Py8583FrameReader(object):
+    """
+    Read frames from a socket or a file-like object.
+
+    Reads in big chunks and splits as many frames as are buffered,
+    so one recv usually gives many messages.
+    """
+
+    def __init__(self, source, length_type=constant.FrameLengthType.BIN2, header_len=0, chunk_size=65536):
+        """
+
+        :param source: socket, or file-like object opened in binary mode
+        :param length_type:
+        :type length_type: constant.FrameLengthType
+        :param header_len: bytes of the header(e.g. TPDU) between the length and the MTI
+        :type header_len: int
+        :param chunk_size: bytes to read per recv/read
+        :type chunk_size: int
+        """
+
+        length_field_len(length_type)  # check length_type
+
+        self.source = source
+        self.length_type = length_type
+        self.header_len = header_len
+        self.chunk_size = chunk_size
+
+        self._buffer = bytearray()
+        self._read_into = self._gen_read_into(source)
+
+    def __iter__(self):
+        for header, msg in self.frames():
+            yield msg
+
+    def frames(self):
+        """
+        Yield (header, message) of every frame until EOF.
+
+        :return:
+        :rtype: collections.Iterator[(bytes, bytes)]
+        """
+
+        buf = self._buffer
+        header_len = self.header_len
+        chunk = bytearray(self.chunk_size)
+
+        while True:
+            consumed = 0
+            try:
+                for start, end in iter_frames(buf, self.length_type):
+                    if end - start < header_len:
+                        raise err.Py8583Error('frame length(%s) < header_len(%s)' % (end - start, header_len))
+                    consumed = end
+                    yield bytes(buf[start:start + header_len]), bytes(buf[start + header_len:end])
+            finally:  # the consumer may stop in the middle
+                if consumed:
+                    del buf[:consumed]
+
+            n = self._read_into(chunk)
+            if not n:  # EOF
+                if buf:
+                    raise err.Py8583Error('stream closed in the middle of a frame, %s bytes left' % len(buf))
+                return
+            buf += memoryview(chunk)[:n]
+
+    def _gen_read_into(self, source):
+        if hasattr(source, 'recv_into'):  # socket
+            return source.recv_into
+        elif hasattr(source, 'readinto'):
+            return source.readinto
+        else:
+            def read_into(chunk):
+                data = source.read(len(chunk))
+                chunk[:len(data)] = data
+                return len(data)
+            return read_into
+
+
+class Py8583FrameWriter(object):
+    """
+    Write frames to a socket or a file-like object.
+
+    Frames are collected in a buffer and sent with a single sendall/write on flush(),
+    or as soon as the buffer holds <flush_size> bytes.
+    """
+
+    def __init__(self, dest, length_type=constant.FrameLengthType.BIN2, header=b'', flush_size=65536):
+        """
+
+        :param dest: socket, or file-like object opened in binary mode
+        :param length_type:
+        :type length_type: constant.FrameLengthType
+        :param header: default header(e.g. TPDU) between the length and the MTI
+        :type header: bytes
+        :param flush_size:
+        :type flush_size: int
+        """
+
+        length_field_len(length_type)  # check length_type
+
+        self.dest = dest
+        self.length_type = length_type
+        self.header = header
+        self.flush_size = flush_size
+
+        self._buffer = bytearray()
+        self._send = dest.sendall if hasattr(dest, 'sendall') else dest.write
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+
+    def write(self, msg, header=None):
+        """
+
+        :param msg: a built message
+        :type msg: bytes | bytearray | memoryview
+        :param header: header of this frame, default self.header
+        :type header: bytes | None
+        :return:
+        """
+
+        if header is None:
+            header = self.header
+
+        buf = self._buffer
+        buf += pack_length(len(header) + len(msg), self.length_type)
+        buf += header
+        buf += msg
+
+        if len(buf) >= self.flush_size:
+            self.flush()
+
+    def write_message(self, message, header=None):
+        """
+
+        :param message:
+        :type message: py8583.py8583.Py8583
+        :param header:
+        :type header: bytes | None
+        :return:
+        """
+
+        self.write(message.build(), header)
+
+    def flush(self):
+        if self._buffer:
+            self._send(self._buffer)
+            del self._buffer[:]
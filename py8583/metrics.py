@@ -0,0 +1,174 @@
+# coding=utf-8
+"""
+Counters of build / parse, per stage and per field, built on the trace hook.
+
+    metrics = Py8583Metrics()
+    message = Py8583(spec, trace_hook=metrics)
+    ...
+    metrics.snapshot()
+    start_http_server(metrics, 9583)   # GET /metrics, Prometheus text format
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from . import trace
+from .trace import Py8583TraceHook
+
+
+_FIELD_STAGES = (trace.STAGE_BUILD_FIELD, trace.STAGE_PARSE_FIELD)
+
+# name, type, help, position of the value in a counter
+_EXPOSITIONS = (
+    ('calls_total', 'counter', 'Number of runs', 0),
+    ('seconds_total', 'counter', 'Seconds spent', 1),
+    ('bytes_total', 'counter', 'Bytes built or parsed', 2),
+    ('max_seconds', 'gauge', 'Longest run since the last reset', 3),
+)
+
+
+class Py8583Metrics(Py8583TraceHook):
+    """
+    Accumulate count, time, bytes and the longest run of every stage,
+    and of every bit for the build_field / parse_field stages.
+
+    One instance can be shared by many messages and threads.
+    """
+
+    def __init__(self, prefix='py8583'):
+        """
+
+        :param prefix: prefix of the exposed metric names
+        :type prefix: str
+        """
+
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stages = {}  # stage -> [count, seconds, bytes, max_seconds]
+        self._fields = {}  # (stage, bit) -> [count, seconds, bytes, max_seconds]
+
+    def on_event(self, event):
+        if event.stage in _FIELD_STAGES:
+            key, counters = (event.stage, event.bit), self._fields
+        else:
+            key, counters = event.stage, self._stages
+
+        with self._lock:
+            counter = counters.get(key)
+            if counter is None:
+                counter = counters[key] = [0, 0.0, 0, 0.0]
+            counter[0] += 1
+            counter[1] += event.elapsed
+            counter[2] += event.length
+            if event.elapsed > counter[3]:
+                counter[3] = event.elapsed
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._fields.clear()
+
+    def snapshot(self):
+        """
+        Copy of the counters.
+
+            {
+                'stages': {'parse_MTI': {'count': 1, 'seconds': ..., 'bytes': 4, 'max_seconds': ...}, ...},
+                'fields': {'parse_field': {48: {...}, 55: {...}}, 'build_field': {...}},
+            }
+
+        :return:
+        :rtype: dict
+        """
+
+        with self._lock:
+            stages = dict((stage, list(counter)) for stage, counter in self._stages.items())
+            fields = dict((key, list(counter)) for key, counter in self._fields.items())
+
+        snapshot = {
+            'stages': dict((stage, _counter_dict(counter)) for stage, counter in stages.items()),
+            'fields': {},
+        }
+        for (stage, bit), counter in fields.items():
+            snapshot['fields'].setdefault(stage, {})[bit] = _counter_dict(counter)
+
+        return snapshot
+
+    def exposition(self):
+        """
+        The counters in Prometheus text format.
+
+        :return:
+        :rtype: str
+        """
+
+        with self._lock:
+            stages = sorted((stage, list(counter)) for stage, counter in self._stages.items())
+            fields = sorted((key, list(counter)) for key, counter in self._fields.items())
+
+        lines = []
+        for kind, samples in (
+            ('stage', [('stage="%s"' % stage, counter) for stage, counter in stages]),
+            ('field', [('stage="%s",bit="%s"' % key, counter) for key, counter in fields]),
+        ):
+            for suffix, metric_type, help_text, position in _EXPOSITIONS:
+                name = '%s_%s_%s' % (self.prefix, kind, suffix)
+                lines.append('# HELP %s %s, by %s.' % (name, help_text, kind))
+                lines.append('# TYPE %s %s' % (name, metric_type))
+                for labels, counter in samples:
+                    lines.append('%s{%s} %r' % (name, labels, counter[position]))
+
+        return '\n'.join(lines) + '\n'
+
+
+def _counter_dict(counter):
+    return {
+        'count': counter[0],
+        'seconds': counter[1],
+        'bytes': counter[2],
+        'max_seconds': counter[3],
+    }
+
+
+#### endpoint ####
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics = None  # set on the subclass made by start_http_server
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+
+        body = self.metrics.exposition().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # keep scrapes out of stderr
+        pass
+
+
+def start_http_server(metrics, port, host='127.0.0.1'):
+    """
+    Serve <metrics> at http://<host>:<port>/metrics from a daemon thread.
+
+    :param metrics:
+    :type metrics: Py8583Metrics
+    :param port: 0 picks a free port, see server.server_address
+    :type port: int
+    :param host:
+    :type host: str
+    :return: call server.shutdown() to stop it
+    :rtype: ThreadingHTTPServer
+    """
+
+    handler = type('Py8583MetricsHandler', (_MetricsHandler,), {'metrics': metrics})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    thread = threading.Thread(target=server.serve_forever, name='py8583-metrics')
+    thread.daemon = True
+    thread.start()
+
+    return server
@@ -0,0 +1,213 @@
+# coding=utf-8
+"""
+Pool of persistent asyncio connections to one upstream host.
+
+Every connection is kept alive by network management echo messages
+(MTI 0800, field 70 = 301) and reconnected with exponential backoff when it dies.
+Requests go to the live connection with the fewest outstanding requests.
+"""
+import asyncio
+import itertools
+import logging
+import random
+import time
+
+from . import constant
+from . import err
+from .aio import Py8583AsyncClient
+from .codec import compile
+from .py8583 import Py8583
+
+log = logging.getLogger(constant.LOGGER_NAME)
+
+
+class Py8583ConnectionPool(object):
+
+    def __init__(self, host, port, spec, size=4, echo_interval=30.0, echo_timeout=5.0,
+                 reconnect_min=0.5, reconnect_max=30.0, **client_kwargs):
+        """
+
+        :param host:
+        :type host: str
+        :param port:
+        :type port: int
+        :param spec:
+        :type spec: py8583.spec.Py8583Spec | py8583.codec.Py8583Codec
+        :param size: number of connections
+        :type size: int
+        :param echo_interval: seconds between two echo messages on a connection
+        :type echo_interval: float
+        :param echo_timeout: seconds to wait for the echo response before dropping the connection
+        :type echo_timeout: float
+        :param reconnect_min: first reconnect delay, doubled on every failure
+        :type reconnect_min: float
+        :param reconnect_max: max reconnect delay
+        :type reconnect_max: float
+        :param client_kwargs: passed to Py8583AsyncClient, e.g. length_type, header, key_bits, timeout
+        """
+
+        self.host = host
+        self.port = port
+        self.codec = compile(spec)
+        self.size = size
+        self.echo_interval = echo_interval
+        self.echo_timeout = echo_timeout
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+        self.client_kwargs = client_kwargs
+
+        self._clients = [None] * size
+        self._tasks = []
+        self._available = None  # asyncio.Event, set while any connection is live
+        self._stan = itertools.cycle(range(1, 1000000))
+        self._closed = False
+
+    #### meta ####
+    async def start(self):
+        """
+        Start keeping <size> connections, don't wait for them to be connected.
+        """
+
+        self._available = asyncio.Event()
+        self._tasks = [
+            asyncio.ensure_future(self._keep_connection(slot))
+            for slot in range(self.size)
+        ]
+
+    async def close(self):
+        self._closed = True
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        for client in self._clients:
+            if client is not None:
+                await client.close()
+        self._clients = [None] * self.size
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    #### request ####
+    def next_stan(self):
+        """
+        Next systems trace audit number of this pool, 000001 - 999999.
+
+        :return:
+        :rtype: str
+        """
+
+        return '%06d' % next(self._stan)
+
+    @property
+    def live_clients(self):
+        return [
+            client
+            for client in self._clients
+            if client is not None and not client.closed
+        ]
+
+    async def request(self, message, timeout=None):
+        """
+        Send <message> on the live connection with the fewest outstanding requests.
+        If no connection is live, wait for one within <timeout>.
+
+        :param message:
+        :type message: Py8583
+        :param timeout: seconds
+        :type timeout: float | None
+        :return:
+        :rtype: Py8583
+        """
+
+        if self._closed or self._available is None:
+            raise err.Py8583Error('pool is not started')
+
+        clients = self.live_clients
+        if not clients:
+            self._available.clear()
+            try:
+                await asyncio.wait_for(self._available.wait(), timeout)
+            except asyncio.TimeoutError:
+                raise err.Py8583Error('no live connection to %s:%s' % (self.host, self.port))
+            clients = self.live_clients
+
+        client = min(clients, key=lambda c: c.outstanding)
+        return await client.request(message, timeout)
+
+    #### connection keeper ####
+    async def _keep_connection(self, slot):
+        failures = 0
+
+        while not self._closed:
+            try:
+                client = await Py8583AsyncClient.connect(self.host, self.port, self.codec, **self.client_kwargs)
+            except Exception as e:
+                failures += 1
+                delay = self._backoff(failures)
+                log.warning('connect %s:%s failed(%r), retry in %.2fs', self.host, self.port, e, delay)
+                await asyncio.sleep(delay)
+                continue
+
+            failures = 0
+            self._clients[slot] = client
+            self._available.set()
+            log.info('connection %s to %s:%s is up', slot, self.host, self.port)
+
+            try:
+                await self._watch(client)
+            except Exception:
+                # whatever went wrong, the slot must be reconnected, the keeper never ends but on close()
+                log.exception('connection %s to %s:%s failed', slot, self.host, self.port)
+            finally:
+                self._clients[slot] = None
+                try:
+                    await client.close()
+                except Exception as e:
+                    log.warning('close connection %s to %s:%s failed(%r)', slot, self.host, self.port, e)
+
+            log.warning('connection %s to %s:%s is down', slot, self.host, self.port)
+
+    async def _watch(self, client):
+        """
+        Return when <client> is dead.
+        """
+
+        while True:
+            try:
+                await asyncio.wait_for(client.wait_closed(), self.echo_interval)
+                return  # connection lost
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await client.request(self.build_echo(), self.echo_timeout)
+            except Exception as e:  # a bad echo response(e.g. unparsable) means a dead connection too
+                log.warning('echo on %s:%s failed(%r)', self.host, self.port, e)
+                return
+
+    def build_echo(self):
+        """
+        Network management echo request.
+
+        :return:
+        :rtype: Py8583
+        """
+
+        message = Py8583(self.codec)
+        message.MTI = '0800'
+        message.set_bit(7, time.strftime('%m%d%H%M%S', time.gmtime()))
+        message.set_bit(11, self.next_stan())
+        message.set_bit(70, '301')
+
+        return message
+
+    def _backoff(self, failures):
+        delay = min(self.reconnect_max, self.reconnect_min * (2 ** (failures - 1)))
+        return delay * random.uniform(0.5, 1.0)  # jitter, don't reconnect all at once
@@ -1,34 +1,60 @@
 # coding=utf-8
-import binascii
-import json
+import array
+import functools
 import logging
-import struct
+from time import perf_counter
 
 from . import constant
 from . import err
+from . import trace
+from . import validate
+from .bcd import bcd2str, str2bcd  # importable from here as before
+from .bitmap import Py8583Bitmap
+from .codec import compile
 from .field import Py8583Field
 from .spec import Py8583Spec
+from .trace import Py8583TraceEvent
 
 log = logging.getLogger(constant.LOGGER_NAME)
 
+# value of a lazy parsed field not decoded yet
+_UNDECODED = object()
+
+
 class Py8583(object):
-    _BIT_DEFAULT_VALUE = 0
+    """
+    Field values are kept in a list in bit order, the value of <bit> is at bitmap.rank(bit).
+    A parsed field also keeps where its encoded bytes are in the parsed msg, as
+    (offset << 32 | length) in a parallel array, 0 if the field was set after parsing.
+    After parse(msg, only=...) the fields past the last requested one are not in the
+    lists yet, _rest is where they start in msg until they are indexed.
+    """
+
+    __slots__ = ('spec', 'codec', 'trace_hook', 'bitmap', '_MTI', '_values', '_offsets', '_raw', '_rest')
 
     #### meta ####
-    def __init__(self, spec):
+    def __init__(self, spec, trace_hook=None):
         """
 
-        :param spec:
-        :type spec: Py8583Spec
+        :param spec: a spec, or a codec compiled from it by py8583.codec.compile
+        :type spec: Py8583Spec | py8583.codec.Py8583Codec
+        :param trace_hook: receives structured events of every build / parse
+        :type trace_hook: py8583.trace.Py8583TraceHook | None
         :return:
         """
 
-        self.spec = spec
+        self.codec = compile(spec)
+        self.spec = self.codec.spec if spec is self.codec else spec
+        self.trace_hook = trace_hook
 
-        self.bitmap = []
-        self.all_field_data = {}
+        self.bitmap = Py8583Bitmap()
         self._MTI = ''  # message type identifier
 
+        self._values = []
+        self._offsets = array.array('Q')
+        self._raw = None  # the parsed msg
+        self._rest = None  # offset in the parsed msg of the fields not indexed yet
+
         self.reset()
 
     def __str__(self):
@@ -39,8 +65,11 @@ class Py8583(object):
         return ''.join([mti_info, bitmap_info, all_field_innfo])
 
     def reset(self):
-        self.all_field_data = {}
         self._MTI = ''
+        del self._values[:]
+        del self._offsets[:]
+        self._raw = None
+        self._rest = None
         self._reset_bitmap()
 
     #### property ####
@@ -50,13 +79,26 @@ class Py8583(object):
 
     @MTI.setter
     def MTI(self, MTI):
-        try:  # MTI should only contain numbers
-            int(MTI)
-        except:
+        # MTI should only contain numbers, int() would also take ' 12', '+12' or '1_2'
+        if not (isinstance(MTI, str) and MTI.isdigit() and MTI.isascii()):
             raise ValueError("Invalid MTI [{0}]: MTI must contain only numbers".format(MTI))
 
         self._MTI = MTI
 
+    @property
+    def all_field_data(self):
+        """
+        {bit: value} of all fields, a new dict every time.
+
+        :return:
+        :rtype: dict
+        """
+
+        return dict(
+            (bit, self.get_bit(bit))
+            for bit in self.bitmap.bits()
+        )
+
     #### field ####
     def get_field_spec(self, bit):
         """
@@ -70,170 +112,569 @@ class Py8583(object):
         return self.spec[bit]
 
     def get_bit(self, bit):
-        self._check_bit(bit)
+        self._check_field_bit(bit)
+
+        bitmap = self.bitmap
+        if not bitmap.test(bit):
+            raise err.Py8583BitNotExistError('bit(%s) not exist in bitmap.' % bit)
+
+        rank = bitmap.rank(bit)
+        try:
+            value = self._values[rank]
+        except IndexError:  # after the bits a selective parse stopped at
+            self._index_rest()
+            value = self._values[rank]
+        if value is _UNDECODED:  # lazy parsed, decode on first access
+            value = self._decode_field(bit, rank)
+
+        return value
 
-        if not self.bitmap[bit]:
+    def get_raw(self, bit):
+        """
+        Get the encoded content of <bit>, without the length prefix and without decoding it.
+        For a lazy parsed field, it's a view into the parsed buffer.
+
+        :param bit:
+        :type bit: int
+        :return:
+        :rtype: memoryview
+        """
+
+        self._check_field_bit(bit)
+
+        bitmap = self.bitmap
+        if not bitmap.test(bit):
             raise err.Py8583BitNotExistError('bit(%s) not exist in bitmap.' % bit)
+
+        field_codec = self.codec[bit]
+        rank = bitmap.rank(bit)
+        try:
+            located = self._offsets[rank]
+        except IndexError:  # after the bits a selective parse stopped at
+            self._index_rest()
+            located = self._offsets[rank]
+        if located:
+            offset = located >> 32
+            return self._raw[offset + field_codec.prefix_len: offset + (located & 0xffffffff)]
         else:
-            return self.all_field_data[bit]
+            return memoryview(field_codec.pack(self._values[rank]))[field_codec.prefix_len:]
 
     def set_bit(self, bit, value):
-        self._check_bit(bit)
+        self._check_field_bit(bit)
+        if self._rest is not None:
+            self._index_rest()
+
+        bitmap = self.bitmap
+        rank = bitmap.rank(bit)
+        if bitmap.test(bit):
+            self._values[rank] = value
+            self._offsets[rank] = 0
+        else:
+            self._values.insert(rank, value)
+            self._offsets.insert(rank, 0)
+            bitmap.set(bit)
 
-        field_spec = self.get_field_spec(bit)
+    def clear_bit(self, bit):
+        self._check_field_bit(bit)
+        if self._rest is not None:
+            self._index_rest()
+
+        bitmap = self.bitmap
+        if bitmap.test(bit):
+            rank = bitmap.rank(bit)
+            del self._values[rank]  # delete data
+            del self._offsets[rank]
+            bitmap.clear(bit)
+
+    def to_dict(self):
+        """
+        All fields of the message, binary fields as bytes.
 
-        self.all_field_data[bit] = value
-        self._update_bitmap(bit, 1)
+        :return: {'MTI': '0200', 2: '4111111111111111', ...}
+        :rtype: dict
+        """
 
-    def clear_bit(self, bit):
-        self._check_bit(bit)
+        result = {'MTI': self.MTI}
+        for bit in self.bitmap.bits():
+            value = self.get_bit(bit)
+            if isinstance(value, memoryview):
+                value = value.tobytes()
+            result[bit] = value
+
+        return result
 
-        self.all_field_data.pop(bit, None)  # delete data
-        self._update_bitmap(bit, 0)
+    #### response ####
+    # fields a response echoes from its request by default
+    RESPONSE_ECHO_BITS = frozenset([2, 3, 4, 7, 11, 12, 13, 32, 37, 41, 42, 49])
+
+    @classmethod
+    def make_response(cls, request, overrides=None, echo=RESPONSE_ECHO_BITS):
+        """
+        The response to <request>, echoing its <echo> fields.
+
+            response = Py8583.make_response(request, {38: 'A12345', 39: '00'})
+
+        The MTI is turned into the response one(0100 -> 0110, 0200 -> 0210).
+        The echoed fields of a parsed request are not decoded, build() copies their bytes
+        from the request's msg, only the <overrides> are encoded.
+        So keep the request's msg unchanged until the response is built.
+
+        :param request:
+        :type request: Py8583
+        :param overrides: bit -> value set on the response, None to leave an echoed bit out; 'MTI' too
+        :type overrides: dict | None
+        :param echo:
+        :type echo: collections.Container[int]
+        :return:
+        :rtype: Py8583
+        """
+
+        overrides = overrides or {}
+        if request._rest is not None:
+            request._index_rest()
+
+        response = cls(request.spec, request.trace_hook)
+        response.MTI = _response_MTI(request.MTI)
+
+        values = response._values
+        offsets = response._offsets
+        bitmap = response.bitmap
+        request_values = request._values
+        request_offsets = request._offsets
+        for rank, bit in enumerate(request.bitmap.bits()):  # ascending, so appending keeps the ranks
+            if bit in echo and bit not in overrides:
+                values.append(request_values[rank])
+                offsets.append(request_offsets[rank])
+                bitmap.set(bit)
+        response._raw = request._raw
+
+        for bit, value in overrides.items():
+            if bit == 'MTI':
+                response.MTI = value
+            elif value is None:
+                response.clear_bit(bit)
+            else:
+                response.set_bit(bit, value)
+
+        return response
 
     #### build ####
     def build(self):
         """
-        Build result str.
+        Build result bytes.
         :return:
-        :rtype: str
+        :rtype: bytes
         """
-        result = b''.join(
-            [
-                self._build_MTI(),
-                self._build_bitmap(),
-                self._build_all_field(),
-            ]
-        )
-
-        log.debug('MTI: %s', self.MTI)
-        log.debug('Bitmap: %s', self.bitmap_info())
-        log.debug('Field: \n%s', self.field_info())
+        result = b''.join(self._build_pieces())
+        self._log_message()
 
         return result
 
-    def _build_MTI(self):
-        mti_spec = self.get_field_spec('MTI')
+    def build_into(self, buffer, offset=0, header_len=0):
+        """
+        Build the message directly into <buffer>, starting at <offset>.
+
+        <header_len> bytes are reserved at <offset> for a transport length header and left untouched,
+        the message starts at offset + header_len.
+
+        :param buffer:
+        :type buffer: bytearray | memoryview
+        :param offset:
+        :type offset: int
+        :param header_len:
+        :type header_len: int
+        :return: number of bytes written, header_len included
+        :rtype: int
+        """
 
-        return mti_spec.pack(self.MTI)
+        pieces = self._build_pieces()
 
-    def _build_bitmap(self):
-        extended = self.bitmap[1]
-
-        primary_bitmap = 0
-        secondary_bitmap = 0
-        for bit in range(1, 65):
-            primary_bitmap |= self.bitmap[bit] << (64 - bit)
-        for bit in range(65, 129):
-            secondary_bitmap |= self.bitmap[bit] << (128 - bit)
-
-        packed_bitmap = struct.pack('!Q', primary_bitmap)
-        if extended:
-            packed_bitmap += struct.pack('!Q', secondary_bitmap)
-
-        bitmap_spec = self.get_field_spec(1)
-        return bitmap_spec.pack(packed_bitmap)
-
-    def _build_all_field(self):
-        all_filed = [
-            self._build_field(bit)
-            for bit in range(2, 129)  # index startwith 1, and index 1 is extend bitmap flag.
-            if self.bitmap[bit]
+        size = header_len
+        for piece in pieces:
+            size += len(piece)
+
+        view = memoryview(buffer)
+        if offset + size > len(view):
+            raise err.Py8583BufferTooSmallError(
+                'buffer(%s) from offset(%s) is too small for %s bytes' % (len(view), offset, size)
+            )
+
+        pos = offset + header_len
+        for piece in pieces:
+            end = pos + len(piece)
+            view[pos:end] = piece
+            pos = end
+
+        self._log_message()
+
+        return size
+
+    def _build_pieces(self):
+        """
+        Encoded pieces of the message, in order.
+
+        :return:
+        :rtype: list[bytes | memoryview]
+        """
+
+        if self._rest is not None:
+            self._index_rest()
+        if self.trace_hook is not None:
+            return self._build_pieces_traced()
+
+        pieces = [
+            self._build_MTI(),
+            self._build_bitmap(),
         ]
+        self._build_all_field(pieces)
 
-        return ''.join(all_filed)
+        return pieces
 
-    def _build_field(self, bit):
-        if not self.bitmap[bit]:
-            raise err.Py8583BitNotExistError('bit(%s) not exist in bitmap' % bit)
+    def _build_pieces_traced(self):
+        on_event = self.trace_hook.on_event
 
-        field_spec = self.get_field_spec(bit)
-        data = self.all_field_data[bit]
-        log.debug(
-            'build_field: %s, index(%s), data(%s), len(%s), content_type(%s), type(%s)',
-            field_spec.field_name, bit, data, len(str(data)), field_spec.content_type, type(data)
-        )
+        start = perf_counter()
+        mti = self._build_MTI()
+        on_event(Py8583TraceEvent(trace.STAGE_BUILD_MTI, None, 0, len(mti), perf_counter() - start))
+
+        start = perf_counter()
+        bitmap = self._build_bitmap()
+        on_event(Py8583TraceEvent(trace.STAGE_BUILD_BITMAP, None, len(mti), len(bitmap), perf_counter() - start))
+
+        pieces = [mti, bitmap]
+        offset = len(mti) + len(bitmap)
+        start = perf_counter()
+        self._build_all_field(pieces)
+        length = sum(len(piece) for piece in pieces) - offset
+        on_event(Py8583TraceEvent(trace.STAGE_BUILD_ALL_FIELD, None, offset, length, perf_counter() - start))
+
+        return pieces
+
+    def _build_MTI(self):
+        return self.codec.mti.pack(self.MTI)
 
-        return field_spec.pack(data)
+    def _build_bitmap(self):
+        bitmap = self.bitmap
+
+        if bitmap.extended:
+            return self.codec.pack_bitmap(bitmap.primary, bitmap.secondary)
+        else:
+            return self.codec.pack_bitmap(bitmap.primary)
+
+    def _build_all_field(self, pieces):
+        if self.trace_hook is not None or log.isEnabledFor(logging.DEBUG):
+            return self._build_all_field_traced(pieces)
+        if self.codec.validation:
+            return self._build_all_field_checked(pieces)
+
+        append = pieces.append
+        codec = self.codec
+        values = self._values
+        offsets = self._offsets
+        raw = self._raw
+
+        # bit 1 (extend bitmap flag) is not included.
+        for rank, bit in enumerate(self.bitmap.bits()):
+            located = offsets[rank]
+            if located:  # parsed and never set, reuse the original bytes
+                offset = located >> 32
+                append(raw[offset: offset + (located & 0xffffffff)])
+            else:
+                prefix, data = codec[bit].encode(values[rank])
+                if prefix:
+                    append(prefix)
+                append(data)
+
+        return pieces
+
+    def _build_all_field_checked(self, pieces):
+        append = pieces.append
+        codec = self.codec
+        values = self._values
+        offsets = self._offsets
+        raw = self._raw
+        violations = []
+
+        for rank, bit in enumerate(self.bitmap.bits()):
+            field_codec = codec[bit]
+            located = offsets[rank]
+            if located:  # parsed and never set, reuse the original bytes
+                offset = located >> 32
+                append(raw[offset: offset + (located & 0xffffffff)])
+                data = raw[offset + field_codec.prefix_len: offset + (located & 0xffffffff)]
+            else:
+                prefix, data = field_codec.encode(values[rank])
+                if prefix:
+                    append(prefix)
+                append(data)
+
+            if field_codec.check is not None:
+                invalid = field_codec.check(data)
+                if invalid:
+                    violations.append((bit, field_codec.field_spec.content_type, invalid))
+
+        if violations:
+            raise validate.validation_error(violations)
+
+        return pieces
+
+    def _build_all_field_traced(self, pieces):
+        trace_hook = self.trace_hook
+        append = pieces.append
+        values = self._values
+        offsets = self._offsets
+        raw = self._raw
+        offset = sum(len(piece) for piece in pieces)
+        located_fields = [] if self.codec.validation else None
+
+        for rank, bit in enumerate(self.bitmap.bits()):
+            start = perf_counter()
+            located = offsets[rank]
+            if located:  # parsed and never set, reuse the original bytes
+                data = raw[(located >> 32): (located >> 32) + (located & 0xffffffff)]
+                length = len(data)
+            else:
+                prefix, data = self._build_field(bit, values[rank])
+                length = len(prefix) + len(data)
+                if prefix:
+                    append(prefix)
+            append(data)
+            if located_fields is not None:
+                located_fields.append((bit, offset << 32 | length))
+
+            if trace_hook is not None:
+                trace_hook.on_event(
+                    Py8583TraceEvent(trace.STAGE_BUILD_FIELD, bit, offset, length, perf_counter() - start)
+                )
+            offset += length
+
+        if located_fields:
+            validate.check_fields(self.codec, b''.join(pieces), located_fields)
+
+        return pieces
+
+    def _build_field(self, bit, data):
+        prefix, encoded = self.codec[bit].encode(data)
+
+        if log.isEnabledFor(logging.DEBUG):
+            field_spec = self.get_field_spec(bit)
+            log.debug(
+                'build_field: %s, index(%s), data(%s), len(%s), content_type(%s), type(%s)',
+                field_spec.field_name, bit, data, len(encoded), field_spec.content_type, type(data)
+            )
+
+        return prefix, encoded
 
     #### parse ####
-    def parse(self, msg):
-        pos = self._parse_MTI(msg, 0)
-        log.debug('MTI: %s', self.MTI)
+    def parse(self, msg, lazy=False, only=None):
+        """
+        msg is parsed through a single memoryview without per field copies, binary fields are views.
+        A lazy or selective parse keeps a view of msg itself, so don't modify msg while the message is in use.
+        An eager parse of a mutable buffer(bytearray, mmap...) copies it once: the buffer can be reused,
+        or resized, as soon as parse returns. bytes are never copied.
+
+        :param msg:
+        :type msg: bytes | bytearray | memoryview
+        :param lazy: only index the offset of every field, decode a field when it's first got by get_bit
+        :type lazy: bool
+        :param only: decode only these bits, e.g. {2, 3, 4, 11}. The other fields before the last of them
+            are only walked over, like lazy ones, and the walk stops there: the fields after it are
+            indexed when one of them is first needed(get_bit, set_bit, build...). lazy is ignored.
+            Validation.ALL checks the walked fields only.
+        :type only: collections.Collection[int] | None
+        :return:
+        """
+
+        msg = memoryview(msg)
+        if msg.format != 'B' or msg.ndim != 1:
+            msg = msg.cast('B')
+        if not lazy and only is None and not isinstance(msg.obj, bytes):
+            # build() copies the fields from msg, don't pin nor follow a buffer the caller may reuse
+            msg = memoryview(bytes(msg))
+
+        del self._values[:]
+        del self._offsets[:]
+        self._raw = msg
+        self._rest = None
+
+        if self.trace_hook is not None:
+            self._parse_traced(msg, lazy, only)
+        else:
+            pos = self._parse_MTI(msg, 0)
+            pos = self._parse_bitmap(msg, pos)
+            if only is not None:
+                self._parse_only_field(msg, pos, only)
+            elif lazy:
+                self._index_all_field(msg, pos)
+            else:
+                self._parse_all_field(msg, pos)
+
+        if self.codec.validation == constant.Validation.ALL:
+            validate.check_fields(self.codec, msg, zip(self.bitmap.bits(), self._offsets))
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('MTI: %s', self.MTI)
+            log.debug('Bitmap: %s', self.bitmap_info())
+            if lazy or only is not None:
+                log.debug('Field offsets: %s', self._offsets)
+            else:
+                log.debug('Field: \n%s', self.field_info())
 
-        pos = self._parse_bitmap(msg, pos)
-        log.debug('Bitmap: %s', self.bitmap_info())
+    def _parse_traced(self, msg, lazy, only=None):
+        on_event = self.trace_hook.on_event
 
-        pos = self._parse_all_field(msg, pos)
-        log.debug('Field: \n%s', self.field_info())
+        if only is not None:
+            parse_fields = functools.partial(self._parse_only_field, only=only)
+        elif lazy:
+            parse_fields = self._index_all_field
+        else:
+            parse_fields = self._parse_all_field
+
+        pos = 0
+        for stage, parse_stage in (
+            (trace.STAGE_PARSE_MTI, self._parse_MTI),
+            (trace.STAGE_PARSE_BITMAP, self._parse_bitmap),
+            (trace.STAGE_PARSE_ALL_FIELD, parse_fields),
+        ):
+            start = perf_counter()
+            end = parse_stage(msg, pos)
+            on_event(Py8583TraceEvent(stage, None, pos, end - pos, perf_counter() - start))
+            pos = end
+
+        return pos
 
     def _parse_MTI(self, msg, pos):
-        mti_spec = self.get_field_spec('MTI')
-        mti, data_len = mti_spec.unpack(msg, pos)
+        mti, pos = self.codec.mti.unpack(msg, pos)
         self.MTI = mti
 
-        return pos+data_len
+        return pos
 
     def _parse_bitmap(self, msg, pos):
-        bitmap_spec = self.spec[1]
-
-        data_type = bitmap_spec.data_type
-        if data_type == constant.DataType.BIN:
-            primary = msg[pos:pos + 8]
-            pos += 8
-        else:  # ASCII
-            primary = binascii.unhexlify(msg[pos: pos + 16])
-            pos += 16
-
-        # 构建主位图
-        int_primary = struct.unpack_from('!Q', primary)[0]
-        for i in range(1, 65):
-            self.bitmap[i] = (int_primary >> (64 - i)) & 0x1
-
-        # 填充扩展位图
-        if self._bitmap_len() == 128:  # 使用了扩展位图
-            if data_type == constant.DataType.BIN:
-                secondary = msg[pos:pos + 8]
-                pos += 8
-            else:
-                secondary = msg[pos:pos + 16]
-                pos += 16
-
-            int_secondary = struct.unpack_from('!Q', secondary)[0]
-            for i in range(1, 65):
-                self.bitmap[i + 64] = (int_secondary >> (64 - i)) & 0x1
+        int_primary, int_secondary, pos = self.codec.unpack_bitmap(msg, pos)
+        self.bitmap.load(int_primary, int_secondary)
 
         return pos
 
     def _parse_all_field(self, msg, pos):
-        for bit in range(2, 129):  # index startwith 1, and index 1 is extend bitmap flag.
-            if self.bitmap[bit]:
+        if self.trace_hook is not None or log.isEnabledFor(logging.DEBUG):
+            for bit in self.bitmap.bits():  # bit 1 (extend bitmap flag) is not included.
                 pos = self._parse_field(bit, msg, pos)
+            return pos
 
-    def _parse_field(self, bit, msg, pos):
-        field_spec = self.get_field_spec(bit)
+        codec = self.codec
+        append_value = self._values.append
+        append_offset = self._offsets.append
 
-        field_value, new_pos = field_spec.unpack(msg, pos)
-        self.set_bit(bit, field_value)
-        log.debug(
-            'parse_field:  %s, index(%s), value(%s), len(%s), type(%s)',
-            field_spec.field_name, bit, field_value, (new_pos-pos), type(field_value)
-        )
+        for bit in self.bitmap.bits():
+            field_value, end = codec[bit].unpack(msg, pos)
+            append_value(field_value)
+            append_offset(pos << 32 | (end - pos))
+            pos = end
+
+        return pos
+
+    def _index_all_field(self, msg, pos):
+        return self._index_fields(msg, pos, self.bitmap.bits())
+
+    def _index_fields(self, msg, pos, bits):
+        codec = self.codec
+        append_value = self._values.append
+        append_offset = self._offsets.append
+
+        for bit in bits:
+            end = codec[bit].skip(msg, pos)
+            append_value(_UNDECODED)
+            append_offset(pos << 32 | (end - pos))
+            pos = end
+
+        return pos
+
+    def _parse_only_field(self, msg, pos, only):
+        codec = self.codec
+        append_value = self._values.append
+        append_offset = self._offsets.append
+        last = max(only) if only else 0
+
+        for bit in self.bitmap.bits():
+            if bit > last:  # nothing requested after this, index the rest when needed
+                self._rest = pos
+                break
+
+            field_codec = codec[bit]
+            if bit in only:
+                field_value, end = field_codec.unpack(msg, pos)
+            else:
+                field_value, end = _UNDECODED, field_codec.skip(msg, pos)
+            append_value(field_value)
+            append_offset(pos << 32 | (end - pos))
+            pos = end
+
+        return pos
+
+    def _index_rest(self):
+        """
+        Index the fields a selective parse stopped before.
+        """
+
+        pos = self._rest
+        if pos is None:
+            return
+        self._rest = None
+
+        bits = list(self.bitmap.bits())
+        self._index_fields(self._raw, pos, bits[len(self._offsets):])
+
+    def _decode_field(self, bit, rank):
+        located = self._offsets[rank]
+        if self.trace_hook is None:
+            field_value, _ = self.codec[bit].unpack(self._raw, located >> 32)
+        else:
+            start = perf_counter()
+            field_value, _ = self.codec[bit].unpack(self._raw, located >> 32)
+            self.trace_hook.on_event(
+                Py8583TraceEvent(trace.STAGE_PARSE_FIELD, bit, located >> 32, located & 0xffffffff, perf_counter() - start)
+            )
+        self._values[rank] = field_value
+
+        return field_value
+
+    def _parse_field(self, bit, msg, pos):
+        start = perf_counter()
+        field_value, new_pos = self.codec[bit].unpack(msg, pos)
+        self._values.append(field_value)
+        self._offsets.append(pos << 32 | (new_pos - pos))
+
+        if self.trace_hook is not None:
+            self.trace_hook.on_event(
+                Py8583TraceEvent(trace.STAGE_PARSE_FIELD, bit, pos, new_pos - pos, perf_counter() - start)
+            )
+        if log.isEnabledFor(logging.DEBUG):
+            field_spec = self.get_field_spec(bit)
+            log.debug(
+                'parse_field:  %s, index(%s), value(%s), len(%s), type(%s)',
+                field_spec.field_name, bit, field_value, (new_pos-pos), type(field_value)
+            )
 
         return new_pos
 
     #### helper ####
+    def _log_message(self):
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('MTI: %s', self.MTI)
+            log.debug('Bitmap: %s', self.bitmap_info())
+            log.debug('Field: \n%s', self.field_info())
+
     def _check_bit(self, bit):
         if bit < 1 or bit > 128:
             raise err.Py8583ProgramError('Bit number %s out of range.' % bit)
 
+    def _check_field_bit(self, bit):
+        self._check_bit(bit)
+        if bit == 1:
+            raise err.Py8583ProgramError('Bit 1 is the secondary bitmap flag, it is maintained by the bitmap.')
+
     def _reset_bitmap(self):
-        if len(self.bitmap) == 129:  # initialized
-            for index in range(1, 129):  # index(0) is NOT used
-                self.bitmap[index] = self._BIT_DEFAULT_VALUE
-        else:  # first initialize
-            for index in range(0, 129):  # index(0) is NOT used, but placehold
-                self.bitmap.append(self._BIT_DEFAULT_VALUE)
+        self.bitmap.reset()
 
     def _trans_value(self, field_spec):
         """
@@ -243,7 +684,7 @@ class Py8583(object):
         :return:
         """
 
-        value = self.all_field_data[field_spec.index]
+        value = self.get_bit(field_spec.index)
         """:type: str"""
         data_type = field_spec.data_type
 
@@ -261,33 +702,7 @@ class Py8583(object):
         """
 
         # bitmap[1] 标志是否使用扩展位图
-        return 128 if self.bitmap[1] else 64
-
-    def _update_bitmap(self, bit, flag):
-        """
-
-        :param bit:
-        :param flag: 0 clear the <bit>, 1 set the <bit>
-        :type flag: int
-        :return:
-        """
-
-        if flag not in (0, 1):
-            raise err.Py8583ProgramError('flag(%s) must be 0 or 1' % flag)
-
-        self.bitmap[bit] = flag
-        self._update_extend_bitmap_flag()
-
-    def _update_extend_bitmap_flag(self):
-        """
-        Update the flag which determine whether or not use extend bitmap.
-        :return:
-        """
-
-        if 1 in self.bitmap[65:]:  # 判定扩展位图是否有值
-            self.bitmap[1] = 1  # enable extend bitmap
-        else:
-            self.bitmap[1] = 0  # diable extend bitmap
+        return 128 if self.bitmap.extended else 64
 
     #### show method ####
     def bitmap_info(self):
@@ -297,20 +712,20 @@ class Py8583(object):
         :rtype: str
         """
 
-        bitmap_str = json.dumps(self.bitmap, separators=(',', ':'))  # got '[1,0,1,0,1,0,0,1...]'
-        bitmap_str = bitmap_str.strip('[]')  # remove '[' and ']', got '1,0,1,0,1,0,0,1...'
-        bitmap_str = bitmap_str.replace(',', '')  # Got '100101001...'
+        bitmap_str = self.bitmap.bits_str()  # Got '100101001...'
         splitted_bitmap_str = ' | '.join(
             bitmap_str[i:i + 8]
-            for i in range(1, self._bitmap_len() + 1, 8)  # split every 8 character
+            for i in range(0, self._bitmap_len(), 8)  # split every 8 character
         )  # Got 10010100 | 1...
 
         return splitted_bitmap_str
 
     def field_info(self):
         all_field_info_list = []
-        for index in sorted(self.all_field_data.keys()):
-            field_data = self.all_field_data[index]
+        for index in self.bitmap.bits():
+            field_data = self.get_bit(index)
+            if isinstance(field_data, memoryview):
+                field_data = field_data.tobytes()
             field_spec = self.get_field_spec(index)
 
             if field_spec.content_type == 'n' and field_spec.data_len_type == constant.LengthType.FIXED:
@@ -325,11 +740,13 @@ class Py8583(object):
         return all_field_info
 
 
-def bcd2str(bcd):
-    return binascii.hexlify(bcd).decode('latin')
+def _response_MTI(MTI):
+    """
+    '0200' -> '0210', the 3rd digit(message function) of a response is the request's + 1.
+    """
+
+    if len(MTI) != 4 or MTI[2] not in '02468':
+        raise err.Py8583ProgramError('MTI(%s) is not a request, has no response MTI' % MTI)
 
+    return MTI[:2] + str(int(MTI[2]) + 1) + MTI[3:]
 
-def str2bcd(string):
-    if(len(string) % 2 == 1):
-        string = string.zfill(len(string) + 1)
-    return binascii.unhexlify(string)
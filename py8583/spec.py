@@ -1,13 +1,100 @@
 # coding=utf-8
+import codecs
+import hashlib
+import json
+import marshal
+import os
+import sys
+import types
 
+from . import err
+from .codec import compile
 from .field import Py8583Field
-from .constant import DataType, LengthType
+from .constant import DataType, LengthType, Validation
 
 class Py8583Spec(object):
     _valid_content_types = ('a', 'n', 's', 'an', 'as', 'ns', 'ans', 'b', 'z')
 
-    def __init__(self):
-        self._spec = {
+    # the fields are immutable, every spec shares the same ones
+    _default_spec = None
+
+    validation = Validation.NONE
+
+    def __init__(self, validation=Validation.NONE):
+        """
+
+        :param validation: check field contents against their content type, see py8583.validate.
+            It's part of the compiled codec, set it here, not once the spec is in use.
+        :type validation: Validation
+        """
+
+        # cached per class, a subclass may override _gen_default_spec
+        cls = type(self)
+        default_spec = cls.__dict__.get('_default_spec')
+        if default_spec is None:
+            default_spec = cls._default_spec = self._gen_default_spec()
+
+        self._spec = dict(default_spec)
+        self.validation = Validation(validation)
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen', False):
+            raise err.Py8583ProgramError('spec is immutable, can not set %s' % name)
+        object.__setattr__(self, name, value)
+
+    @classmethod
+    def from_fields(cls, fields, validation=Validation.NONE):
+        """
+        An immutable spec made of <fields>, the default spec is not used.
+
+        :param fields: 'MTI' and 1-128 -> field
+        :type fields: dict[int | str, Py8583Field]
+        :param validation:
+        :type validation: Validation
+        :return:
+        :rtype: Py8583Spec
+        """
+
+        spec = cls.__new__(cls)
+        spec._spec = types.MappingProxyType(dict(fields))
+        spec.validation = Validation(validation)
+        spec._frozen = True
+
+        return spec
+
+    def to_dict(self):
+        """
+        The spec in the declarative form read by load_spec.
+
+        :return:
+        :rtype: dict
+        """
+
+        definition = {
+            'fields': dict(
+                (str(index), {
+                    'field_name': field.field_name,
+                    'content_type': field.content_type,
+                    'data_len_max': field.data_len_max,
+                    'data_len_type': LengthType(field.data_len_type).name,
+                    'encoding': field.encoding,
+                    'remark': field.remark,
+                    'data_type': DataType(field.data_type).name,
+                    'data_len_encode_type': DataType(field.data_len_encode_type).name,
+                    'bcd_pad': field.bcd_pad,
+                })
+                for index, field in self._spec.items()
+            )
+        }
+        if self.validation != Validation.NONE:
+            definition['validation'] = Validation(self.validation).name
+
+        return definition
+
+    @staticmethod
+    def _gen_default_spec():
+        return {
+            'MTI' : Py8583Field('MTI', 'Message type indicator', 'n', 4, LengthType.FIXED),
             1 : Py8583Field(1, 'Bit Map Extended', 'b', 8, LengthType.FIXED),
             2 : Py8583Field(2, 'Primary account number (PAN)', 'n', 19, LengthType.LLVAR),
             3 : Py8583Field(3, 'Precessing code', 'n', 6, LengthType.FIXED),
@@ -67,7 +154,7 @@ class Py8583Spec(object):
             52 : Py8583Field(52, 'Personal identification number (PIN) data', 'b', 8, LengthType.FIXED),
             53 : Py8583Field(53, 'Security related control information', 'n', 16, LengthType.FIXED),
             54 : Py8583Field(54, 'Amounts additional', 'an', 120, LengthType.LLLVAR),
-            55 : Py8583Field(55, 'Integrated circuit card (ICC) system related data', 'ans', 999, LengthType.LLLVAR),
+            55 : Py8583Field(55, 'Integrated circuit card (ICC) system related data', 'b', 999, LengthType.LLLVAR),
             56 : Py8583Field(56, 'Original data elements', 'ans', 999, LengthType.LLLVAR),
             57 : Py8583Field(57, 'Authorisation life cycle code', 'ans', 999, LengthType.LLLVAR),
             58 : Py8583Field(58, 'Authorising agent institution identification code', 'ans', 999, LengthType.LLLVAR),
@@ -160,3 +247,270 @@ class Py8583Spec(object):
 
         return self._spec[item]
 
+
+
+#### declarative spec ####
+_SPEC_CACHE_VERSION = 4
+_FIELD_KEYS = (
+    'field_name', 'content_type', 'data_len_max', 'data_len_type', 'encoding', 'remark',
+    'data_type', 'data_len_encode_type', 'bcd_pad',
+)
+# key -> value when neither the field nor its base gives it
+_FIELD_DEFAULTS = {'encoding': 'latin', 'remark': '', 'data_type': None, 'data_len_encode_type': 'ASCII', 'bcd_pad': None}
+_FIELD_INDEXES = ['MTI'] + list(range(1, 129))
+
+_loaded_specs = {}  # content hash -> Py8583Spec
+
+# row -> Py8583Field, a row loaded twice gives the same field, so specs loaded from deltas
+# share the fields they don't change with the default spec and with each other, and so
+# share their compiled field codecs too
+_row_fields = {}
+
+
+def load_spec(source, cache_dir=None):
+    """
+    Load a spec from its declarative form:
+
+        {
+            "base": "default",      # optional, start from the default spec
+            "validation": "BUILD",  # optional, NONE(default), BUILD or ALL, see py8583.validate
+            "fields": {
+                "MTI": {"field_name": "Message type indicator", "content_type": "n", "data_len_max": 4, "data_len_type": "FIXED"},
+                "32": {"data_len_max": 28},     # with a base, only what differs
+                ...
+            }
+        }
+
+    Without a base, every one of MTI and 1-128 must be given in full.
+    A field takes field_name, content_type, data_len_max, data_len_type(FIXED, LVAR, LLVAR, LLLVAR),
+    encoding(default latin) and remark. Optionally, data_type(ASCII, BCD, BIN, default from content_type),
+    data_len_encode_type(ASCII, BCD, BIN, default ASCII) and bcd_pad(left, right), see Py8583Field.
+    A CUP style field:
+
+        "2": {"data_type": "BCD", "data_len_encode_type": "BCD"}
+
+    The same content is loaded once per process, every caller gets the same immutable spec,
+    compiled already. With <cache_dir>, the validated fields are also cached on disk by
+    the hash of the content, so the next process skips reading and checking them.
+
+    :param source: path of a JSON file, or the definition as a dict
+    :type source: str | dict
+    :param cache_dir:
+    :type cache_dir: str | None
+    :return:
+    :rtype: Py8583Spec
+    """
+
+    if isinstance(source, dict):
+        content = json.dumps(_str_keys(source), sort_keys=True).encode('utf-8')
+        definition = source
+    else:
+        with open(source, 'rb') as f:
+            content = f.read()
+        definition = None
+
+    digest = hashlib.sha256(content).hexdigest()
+    spec = _loaded_specs.get(digest)
+    if spec is not None:
+        return spec
+
+    normalized = _read_spec_cache(cache_dir, digest) if cache_dir else None
+    if normalized is None:
+        if definition is None:
+            try:
+                definition = json.loads(content.decode('utf-8'))
+            except ValueError as e:
+                raise err.Py8583SpecError('%s is not valid JSON: %s' % (source, e))
+        normalized = _normalize_spec(definition)
+        if cache_dir:
+            _write_spec_cache(cache_dir, digest, normalized)
+
+    validation, rows = normalized
+    spec = Py8583Spec.from_fields(
+        dict((row[0], _row_field(row)) for row in rows),
+        Validation(validation),
+    )
+
+    compile(spec)
+
+    return _loaded_specs.setdefault(digest, spec)
+
+
+def _normalize_spec(definition):
+    """
+    Check <definition>, all the problems are reported at once.
+
+    :return: (validation, [(index, field_name, content_type, data_len_max, data_len_type, encoding, remark,
+               data_type, data_len_encode_type, bcd_pad), ...]), the enums as int
+    :rtype: (int, list[tuple])
+    """
+
+    problems = []
+
+    if not isinstance(definition, dict) or not isinstance(definition.get('fields'), dict):
+        raise err.Py8583SpecError('spec must be an object with "fields"')
+
+    base = definition.get('base')
+    if base is None:
+        base_fields = {}
+    elif base == 'default':
+        base_fields = Py8583Spec()._spec
+    else:
+        raise err.Py8583SpecError('unknown base(%r), only "default" is supported' % (base,))
+
+    validation = definition.get('validation', 'NONE')
+    if isinstance(validation, str) and validation in Validation.__members__:
+        validation = int(Validation[validation])
+    else:
+        problems.append('validation(%r) should be one of %s' % (validation, ', '.join(Validation.__members__)))
+
+    given = {}
+    for key, attrs in definition['fields'].items():
+        index = key if key == 'MTI' else _field_number(key)
+        if index not in _FIELD_INDEXES:
+            problems.append('field(%s): index should be MTI or 1-128' % key)
+        elif not isinstance(attrs, dict):
+            problems.append('field(%s): should be an object' % key)
+        else:
+            unknown = set(attrs) - set(_FIELD_KEYS)
+            if unknown:
+                problems.append('field(%s): unknown keys %s' % (key, sorted(unknown)))
+            given[index] = attrs
+
+    rows = []
+    for index in _FIELD_INDEXES:
+        base_field = base_fields.get(index)
+        attrs = given.get(index)
+        if attrs is None:
+            if base_field is None:
+                problems.append('field(%s): missing' % index)
+            else:
+                rows.append(_field_row(base_field))
+            continue
+
+        row = dict(_FIELD_DEFAULTS)
+        if base_field is not None:
+            row.update(zip(_FIELD_KEYS, _field_row(base_field)[1:]))
+        row.update(attrs)
+
+        missing = [name for name in _FIELD_KEYS if name not in row]
+        if missing:
+            problems.append('field(%s): missing %s' % (index, ', '.join(missing)))
+            continue
+
+        if row['content_type'] not in Py8583Spec._valid_content_types:
+            problems.append('field(%s): content_type(%r) should be one of %s' % (
+                index, row['content_type'], ', '.join(Py8583Spec._valid_content_types)
+            ))
+        if not isinstance(row['data_len_max'], int) or isinstance(row['data_len_max'], bool) or row['data_len_max'] <= 0:
+            problems.append('field(%s): data_len_max(%r) should be a positive int' % (index, row['data_len_max']))
+        data_len_type = row['data_len_type']
+        if isinstance(data_len_type, str) and data_len_type in LengthType.__members__:
+            row['data_len_type'] = int(LengthType[data_len_type])
+        elif data_len_type not in set(int(t) for t in LengthType):
+            problems.append('field(%s): data_len_type(%r) should be one of %s' % (
+                index, data_len_type, ', '.join(LengthType.__members__)
+            ))
+        try:
+            codecs.lookup(row['encoding'])
+        except (LookupError, TypeError):
+            problems.append('field(%s): unknown encoding(%r)' % (index, row['encoding']))
+        for name in ('data_type', 'data_len_encode_type'):
+            data_type = row[name]
+            if isinstance(data_type, str) and data_type in DataType.__members__:
+                row[name] = int(DataType[data_type])
+            elif data_type not in set(int(t) for t in DataType) and (data_type is not None or name != 'data_type'):
+                problems.append('field(%s): %s(%r) should be one of %s' % (
+                    index, name, data_type, ', '.join(DataType.__members__)
+                ))
+        if row['data_type'] == DataType.BCD and row['content_type'] not in ('n', 'z'):
+            problems.append('field(%s): content_type(%r) can not be BCD, only n and z' % (index, row['content_type']))
+        if row['bcd_pad'] not in (None, 'left', 'right'):
+            problems.append('field(%s): bcd_pad(%r) should be left or right' % (index, row['bcd_pad']))
+
+        rows.append((index,) + tuple(row[name] for name in _FIELD_KEYS))
+
+    if problems:
+        raise err.Py8583SpecError('invalid spec:\n  ' + '\n  '.join(problems), problems)
+
+    return validation, rows
+
+
+def _field_number(key):
+    try:
+        return int(key)
+    except (TypeError, ValueError):
+        return None
+
+
+def _field_row(field):
+    """
+    data_type and bcd_pad are None when derived from content_type,
+    so a delta changing content_type derives them again.
+    """
+
+    data_type = field.data_type
+    bcd_pad = field.bcd_pad
+    return (
+        field.index, field.field_name, field.content_type, field.data_len_max,
+        int(field.data_len_type), field.encoding, field.remark,
+        None if data_type == field._gen_data_type(field.content_type) else int(data_type),
+        int(field.data_len_encode_type),
+        None if bcd_pad == field._gen_bcd_pad(field.content_type) else bcd_pad,
+    )
+
+
+def _row_field(row):
+    row = tuple(row)
+    if not _row_fields:
+        for field in Py8583Spec()._spec.values():
+            _row_fields[_field_row(field)] = field
+
+    field = _row_fields.get(row)
+    if field is None:
+        index, name, content_type, data_len_max, data_len_type, encoding, remark, data_type, len_encode_type, bcd_pad = row
+        field = _row_fields[row] = Py8583Field(
+            index, name, content_type, data_len_max, LengthType(data_len_type), encoding, remark,
+            data_type=None if data_type is None else DataType(data_type),
+            data_len_encode_type=DataType(len_encode_type),
+            bcd_pad=bcd_pad,
+        )
+
+    return field
+
+
+def _str_keys(value):
+    """
+    <value> with the keys of every dict turned into str, int field keys and 'MTI' can't be sorted together.
+    """
+
+    if isinstance(value, dict):
+        return dict((str(key), _str_keys(item)) for key, item in value.items())
+    return value
+
+
+def _spec_cache_path(cache_dir, digest):
+    # marshal's format changes between python versions
+    return os.path.join(cache_dir, 'spec-%s-py%s%s.v%s' % (
+        digest, sys.version_info[0], sys.version_info[1], _SPEC_CACHE_VERSION
+    ))
+
+
+def _read_spec_cache(cache_dir, digest):
+    try:
+        with open(_spec_cache_path(cache_dir, digest), 'rb') as f:
+            return marshal.load(f)
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def _write_spec_cache(cache_dir, digest, normalized):
+    path = _spec_cache_path(cache_dir, digest)
+    tmp_path = '%s.%s.tmp' % (path, os.getpid())
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            marshal.dump(normalized, f)
+        os.replace(tmp_path, path)
+    except (IOError, OSError):  # the cache is only an optimization
+        pass
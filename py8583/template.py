@@ -0,0 +1,193 @@
+# coding=utf-8
+"""
+Messages that are built again and again with only a few fields changed.
+"""
+import array
+
+from . import err
+from . import validate
+from .py8583 import Py8583, _UNDECODED
+
+
+class Py8583Template(Py8583):
+    """
+    A Py8583 keeping the last message it built, and the place of every field in it.
+
+        template = Py8583Template(spec)
+        template.MTI = '0200'
+        template.set_bit(41, 'TERM0001')      # and the other terminal fields
+        ...
+        for transaction in transactions:
+            template.set_bit(4, transaction.amount)
+            template.set_bit(11, transaction.stan)
+            msg = template.build()             # only 4 and 11 are encoded
+
+    A field is dirty from set_bit until the next build, set_bit with the value the field
+    already holds keeps it clean. As long as no field is added or removed and the dirty
+    fields keep their encoded length (always true for fixed fields), build() copies the
+    last message and overwrites the dirty fields in place. Otherwise the message is built
+    in full, reusing the bytes of the clean fields the way a parsed message does.
+    """
+
+    __slots__ = ('_dirty',)
+
+    def reset(self):
+        super(Py8583Template, self).reset()
+        self._dirty = None  # bit -> where it was in the last message, None if the layout changed
+
+    #### field ####
+    def set_bit(self, bit, value):
+        self._check_field_bit(bit)
+        if self._rest is not None:
+            self._index_rest()
+
+        bitmap = self.bitmap
+        if not bitmap.test(bit):
+            self._dirty = None
+        else:
+            rank = bitmap.rank(bit)
+            located = self._offsets[rank]
+            if located:
+                current = self._values[rank]
+                if current is _UNDECODED:
+                    current = self._decode_field(bit, rank)
+                if current == value:  # unchanged, keep the encoded bytes
+                    return
+                if self._dirty is not None:
+                    self._dirty[bit] = located
+
+        super(Py8583Template, self).set_bit(bit, value)
+
+    def clear_bit(self, bit):
+        self._check_field_bit(bit)
+
+        if self.bitmap.test(bit):
+            self._dirty = None
+
+        super(Py8583Template, self).clear_bit(bit)
+
+    def is_dirty(self, bit):
+        """
+        Whether <bit> will be encoded by the next build.
+
+        :param bit:
+        :type bit: int
+        :return:
+        :rtype: bool
+        """
+
+        if self._rest is not None:
+            self._index_rest()
+
+        bitmap = self.bitmap
+        return bitmap.test(bit) and not self._offsets[bitmap.rank(bit)]
+
+    def dirty_bits(self):
+        """
+
+        :return:
+        :rtype: list[int]
+        """
+
+        if self._rest is not None:
+            self._index_rest()
+
+        offsets = self._offsets
+        return [bit for rank, bit in enumerate(self.bitmap.bits()) if not offsets[rank]]
+
+    #### build ####
+    def build(self):
+        msg = None
+        if self._dirty is not None and self.trace_hook is None:
+            msg = self._patch()
+
+        if msg is None:
+            msg = super(Py8583Template, self).build()
+            self._keep_encoded(msg)
+        else:
+            self._log_message()
+
+        return msg
+
+    def build_into(self, buffer, offset=0, header_len=0):
+        msg = self.build()
+
+        size = header_len + len(msg)
+        view = memoryview(buffer)
+        if offset + size > len(view):
+            raise err.Py8583BufferTooSmallError(
+                'buffer(%s) from offset(%s) is too small for %s bytes' % (len(view), offset, size)
+            )
+        view[offset + header_len: offset + size] = msg
+
+        return size
+
+    def parse(self, msg, lazy=False, only=None):
+        super(Py8583Template, self).parse(msg, lazy, only)
+        self._dirty = {}
+
+    def _patch(self):
+        """
+        The last message with the dirty fields overwritten in place,
+        None if one of them changed its encoded length.
+        """
+
+        codec = self.codec
+        if codec.mti.prefix_len:  # a variable MTI may move the bitmap
+            return None
+        mti = codec.mti.pack(self.MTI)
+        bitmap = self.bitmap
+        values = self._values
+        buffer = bytearray(self._raw)
+        buffer[:len(mti)] = mti
+
+        patched = []
+        violations = []
+        for bit, located in self._dirty.items():
+            rank = bitmap.rank(bit)
+            field_codec = codec[bit]
+            prefix, data = field_codec.encode(values[rank])
+            offset = located >> 32
+            if len(prefix) + len(data) != located & 0xffffffff:
+                return None
+            if codec.validation and field_codec.check is not None:  # the clean fields were checked already
+                invalid = field_codec.check(data)
+                if invalid:
+                    violations.append((bit, field_codec.field_spec.content_type, invalid))
+            end = offset + len(prefix)
+            buffer[offset:end] = prefix
+            buffer[end:end + len(data)] = data
+            patched.append((rank, located))
+
+        if violations:
+            raise validate.validation_error(violations)
+
+        msg = bytes(buffer)
+
+        self._raw = memoryview(msg)
+        offsets = self._offsets
+        for rank, located in patched:
+            offsets[rank] = located
+        self._dirty.clear()
+
+        return msg
+
+    def _keep_encoded(self, msg):
+        """
+        Make <msg>, just built in full, the source of the clean fields.
+        """
+
+        msg = memoryview(msg)
+        codec = self.codec
+        offsets = array.array('Q')
+
+        pos = codec.mti.skip(msg, 0)
+        pos = codec.unpack_bitmap(msg, pos)[2]
+        for bit in self.bitmap.bits():
+            end = codec[bit].skip(msg, pos)
+            offsets.append(pos << 32 | (end - pos))
+            pos = end
+
+        self._raw = msg
+        self._offsets = offsets
+        self._dirty = {}
@@ -0,0 +1,57 @@
+# coding=utf-8
+"""
+Structured trace events of build / parse, for hooks that want numbers instead of log lines.
+"""
+import collections
+
+
+# stage of an event
+STAGE_BUILD_MTI = 'build_MTI'
+STAGE_BUILD_BITMAP = 'build_bitmap'
+STAGE_BUILD_ALL_FIELD = 'build_all_field'
+STAGE_BUILD_FIELD = 'build_field'
+STAGE_PARSE_MTI = 'parse_MTI'
+STAGE_PARSE_BITMAP = 'parse_bitmap'
+STAGE_PARSE_ALL_FIELD = 'parse_all_field'
+STAGE_PARSE_FIELD = 'parse_field'
+
+
+# stage: one of STAGE_*
+# bit: field number of a *_field stage, None otherwise
+# offset: position of the stage's bytes in the message
+# length: number of bytes the stage built or parsed
+# elapsed: seconds spent in the stage
+Py8583TraceEvent = collections.namedtuple('Py8583TraceEvent', ['stage', 'bit', 'offset', 'length', 'elapsed'])
+
+
+class Py8583TraceHook(object):
+    """
+    Receives the trace events of the messages it's attached to:
+
+        message = Py8583(spec, trace_hook=hook)
+    """
+
+    def on_event(self, event):
+        """
+
+        :param event:
+        :type event: Py8583TraceEvent
+        :return:
+        """
+
+        raise NotImplementedError()
+
+
+class Py8583TraceRecorder(Py8583TraceHook):
+    """
+    Keep every event in <events>.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def on_event(self, event):
+        self.events.append(event)
+
+    def clear(self):
+        del self.events[:]
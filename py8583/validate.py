@@ -0,0 +1,140 @@
+# coding=utf-8
+"""
+Check field contents against their content type, enabled per spec:
+
+    spec = Py8583Spec(validation=Validation.BUILD)     # Validation.ALL checks parsed messages too
+    message = Py8583(spec)
+    ...
+    message.build()     # raises Py8583ValidationError listing every invalid field
+
+The encoded bytes are checked, there is no per character loop in Python: a table precompiled
+per content type translates the allowed bytes to '0' and the others to 'A', the field is valid
+if it turned into digits(bytes.isdigit). Only for an invalid field, bytes.translate deletes
+the allowed bytes, what remains is reported. Binary fields('b') are not checked.
+"""
+import string
+
+from . import constant
+from . import err
+
+
+_DIGITS = string.digits.encode('ascii')
+_ALPHA = string.ascii_letters.encode('ascii') + b' '  # fixed 'a' fields are padded with spaces
+_SPECIAL = bytes(c for c in range(0x20, 0x7f) if not chr(c).isalnum())
+_CLASSES = {'a': _ALPHA, 'n': _DIGITS, 's': _SPECIAL}
+
+# track 2 data, '=' is sent as 'D', an odd length is padded with 'F'
+_TRACK_DIGITS = '0123456789=DF'
+
+# BCD nibbles allowed by content type
+_BCD_NIBBLES = {'n': '0123456789', 'z': '0123456789DF'}
+
+# (data type, content type) -> bytes allowed
+_ALLOWED_CACHE = {}
+
+
+def allowed_bytes(data_type, content_type):
+    """
+    The bytes an encoded field of <content_type> can hold.
+
+    :param data_type:
+    :type data_type: constant.DataType
+    :param content_type:
+    :type content_type: str
+    :return: None if not checked
+    :rtype: bytes | None
+    """
+
+    key = (data_type, content_type)
+    if key in _ALLOWED_CACHE:
+        return _ALLOWED_CACHE[key]
+
+    if data_type == constant.DataType.BIN or content_type == 'b':
+        allowed = None
+    elif data_type == constant.DataType.BCD:
+        nibbles = _BCD_NIBBLES[content_type]
+        allowed = bytes(sorted(int(high + low, 16) for high in nibbles for low in nibbles))
+    elif content_type == 'z':
+        allowed = _TRACK_DIGITS.encode('ascii')
+    else:
+        allowed = bytes(sorted(set(b''.join(_CLASSES[c] for c in content_type))))
+
+    _ALLOWED_CACHE[key] = allowed
+    return allowed
+
+
+def make_check(field_spec):
+    """
+    data(bytes-like, without the length prefix) -> the invalid bytes in it, b'' if valid.
+
+    :param field_spec:
+    :type field_spec: py8583.field.Py8583Field
+    :return: None if the field is not checked
+    :rtype: ((bytes | bytearray | memoryview) -> bytes) | None
+    """
+
+    allowed = allowed_bytes(field_spec.data_type, field_spec.content_type)
+    if allowed is None:
+        return None
+
+    if allowed == _DIGITS:
+        def check(data):
+            data = bytes(data)
+            if data.isdigit() or not data:
+                return b''
+            return data.translate(None, allowed)
+    else:
+        # allowed bytes -> '0', the others -> 'A': the field is valid if it turns into digits
+        table = bytes(0x30 if byte in allowed else 0x41 for byte in range(256))
+
+        def check(data):
+            data = bytes(data)
+            if data.translate(table).isdigit() or not data:
+                return b''
+            return data.translate(None, allowed)
+
+    return check
+
+
+def check_fields(codec, msg, located):
+    """
+    Check every located field of <msg>, all of them before raising.
+
+    :param codec:
+    :type codec: py8583.codec.Py8583Codec
+    :param msg:
+    :type msg: bytes | bytearray | memoryview
+    :param located: [(bit, offset << 32 | length), ...], the length prefix included
+    :type located: collections.Iterable[(int | str, int)]
+    :raise: err.Py8583ValidationError
+    """
+
+    violations = []
+    for bit, location in located:
+        field_codec = codec[bit]
+        check = field_codec.check
+        if check is None:
+            continue
+
+        start = (location >> 32) + field_codec.prefix_len
+        invalid = check(msg[start:(location >> 32) + (location & 0xffffffff)])
+        if invalid:
+            violations.append((bit, field_codec.field_spec.content_type, invalid))
+
+    if violations:
+        raise validation_error(violations)
+
+
+def validation_error(violations):
+    """
+
+    :param violations: [(bit, content_type, invalid bytes), ...]
+    :type violations: list[tuple]
+    :return:
+    :rtype: err.Py8583ValidationError
+    """
+
+    return err.Py8583ValidationError(
+        'invalid content: ' + ', '.join('field(%s) %r has %r' % violation for violation in violations),
+        violations
+    )
@@ -0,0 +1,96 @@
+# coding=utf-8
+"""
+Local issuer for the asyncio tests: a server reading framed requests,
+each one handed to handler(connection, request), which answers as the test needs.
+"""
+import asyncio
+
+from py8583 import constant
+from py8583 import frame
+from py8583.py8583 import Py8583
+
+
+async def echo(connection, request):
+    """
+    Answer every request at once, approved.
+    """
+
+    connection.send(Py8583.make_response(request, {39: '00'}))
+
+
+class IssuerStub(object):
+
+    def __init__(self, spec, handler=echo, length_type=constant.FrameLengthType.BIN2):
+        self.spec = spec
+        self.handler = handler
+        self.length_type = length_type
+
+        self.connections = []
+        self.requests = []
+        self._server = None
+
+    async def start(self):
+        """
+
+        :return: the port listened on
+        :rtype: int
+        """
+
+        self._server = await asyncio.start_server(self._serve, '127.0.0.1', 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        for connection in self.connections:
+            connection.close()
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def _serve(self, reader, writer):
+        connection = StubConnection(self, writer)
+        self.connections.append(connection)
+
+        length_len = frame.length_field_len(self.length_type)
+        try:
+            while True:
+                length_data = await reader.readexactly(length_len)
+                body = await reader.readexactly(frame.unpack_length(length_data, 0, self.length_type))
+
+                request = Py8583(self.spec)
+                request.parse(bytes(body))
+                self.requests.append(request)
+                await self.handler(connection, request)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            connection.close()
+
+
+class StubConnection(object):
+
+    def __init__(self, stub, writer):
+        self.stub = stub
+        self.writer = writer
+
+    def send(self, message):
+        """
+
+        :param message: a message, or the bytes of one
+        :type message: Py8583 | bytes
+        """
+
+        msg = message if isinstance(message, bytes) else message.build()
+        self.writer.write(frame.pack_frame(msg, self.stub.length_type))
+
+    def close(self):
+        self.writer.close()
@@ -0,0 +1,145 @@
+# coding=utf-8
+import asyncio
+
+import pytest
+
+from py8583 import err
+from py8583.aio import Py8583AsyncClient
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec
+
+from issuer_stub import IssuerStub
+
+
+SPEC = Py8583Spec()
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+def purchase(stan):
+    message = Py8583(SPEC)
+    message.MTI = '0200'
+    message.set_bit(4, '000000001000')
+    message.set_bit(11, stan)
+    message.set_bit(41, 'TERM0001')
+    return message
+
+
+def test_request_response():
+    async def main():
+        async with IssuerStub(SPEC) as stub:
+            client = await Py8583AsyncClient.connect('127.0.0.1', stub.port, SPEC)
+            response = await client.request(purchase('000001'))
+            await client.close()
+        return response
+
+    response = run(main())
+    assert response.MTI == '0210'
+    assert response.get_bit(11) == '000001'
+    assert response.get_bit(39) == '00'
+
+
+def test_out_of_order_responses():
+    held = []
+
+    async def answer_reversed(connection, request):
+        held.append(request)
+        if len(held) == 3:
+            for request in reversed(held):
+                connection.send(Py8583.make_response(request, {39: '00', 38: request.get_bit(11)}))
+
+    async def main():
+        async with IssuerStub(SPEC, answer_reversed) as stub:
+            client = await Py8583AsyncClient.connect('127.0.0.1', stub.port, SPEC)
+            responses = await asyncio.gather(*[
+                client.request(purchase(stan)) for stan in ('000001', '000002', '000003')
+            ])
+            assert client.outstanding == 0
+            await client.close()
+        return responses
+
+    responses = run(main())
+    assert [response.get_bit(11) for response in responses] == ['000001', '000002', '000003']
+    assert [response.get_bit(38) for response in responses] == ['000001', '000002', '000003']
+
+
+def test_timeout():
+    async def answer_odd(connection, request):
+        if int(request.get_bit(11)) % 2:
+            connection.send(Py8583.make_response(request, {39: '00'}))
+
+    async def main():
+        async with IssuerStub(SPEC, answer_odd) as stub:
+            client = await Py8583AsyncClient.connect('127.0.0.1', stub.port, SPEC)
+            with pytest.raises(asyncio.TimeoutError):
+                await client.request(purchase('000002'), timeout=0.1)
+            assert client.outstanding == 0
+
+            # the connection is still usable
+            response = await client.request(purchase('000003'), timeout=1)
+            await client.close()
+        return response
+
+    assert run(main()).get_bit(11) == '000003'
+
+
+def test_peer_disconnect():
+    async def hang_up(connection, request):
+        connection.close()
+
+    async def main():
+        async with IssuerStub(SPEC, hang_up) as stub:
+            client = await Py8583AsyncClient.connect('127.0.0.1', stub.port, SPEC)
+            with pytest.raises(err.Py8583Error):
+                await client.request(purchase('000001'), timeout=5)
+            await client.wait_closed()
+            assert client.closed
+            assert client.writer.is_closing()
+
+            with pytest.raises(err.Py8583Error):
+                await client.request(purchase('000002'))
+            await client.close()
+
+    run(main())
+
+
+def test_unparsable_message_dropped():
+    async def garbage_first(connection, request):
+        connection.send(b'0210' + b'\x40' + b'\x00' * 7 + b'XX')  # field 2, a bad length
+        connection.send(Py8583.make_response(request, {39: '00'}))
+
+    async def main():
+        async with IssuerStub(SPEC, garbage_first) as stub:
+            client = await Py8583AsyncClient.connect('127.0.0.1', stub.port, SPEC)
+            response = await client.request(purchase('000001'), timeout=5)
+            assert not client.closed
+            await client.close()
+        return response
+
+    assert run(main()).get_bit(39) == '00'
+
+
+def test_unsolicited_callback_failure():
+    received = []
+
+    def unsolicited(message):
+        received.append(message)
+        raise ValueError('callback bug')
+
+    async def advice_first(connection, request):
+        advice = Py8583.make_response(request, {39: '00', 11: '999999'})
+        connection.send(advice)
+        connection.send(Py8583.make_response(request, {39: '00'}))
+
+    async def main():
+        async with IssuerStub(SPEC, advice_first) as stub:
+            client = await Py8583AsyncClient.connect('127.0.0.1', stub.port, SPEC, unsolicited=unsolicited)
+            response = await client.request(purchase('000001'), timeout=5)
+            assert not client.closed
+            await client.close()
+        return response
+
+    assert run(main()).get_bit(11) == '000001'
+    assert [message.get_bit(11) for message in received] == ['999999']
@@ -0,0 +1,95 @@
+# coding=utf-8
+import os
+
+import pytest
+
+from py8583 import err, frame
+from py8583.archive import Py8583CaptureArchive
+from py8583.constant import FrameLengthType
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec, load_spec
+
+
+SPEC = Py8583Spec()
+
+
+def capture(tmpdir, count=10, tail=b''):
+    frames = []
+    for n in range(count):
+        message = Py8583(SPEC)
+        message.MTI = '0200'
+        message.set_bit(11, '%06d' % n)
+        message.set_bit(41, 'TERM%04d' % (n % 2))
+        frames.append(frame.pack_frame(message.build(), FrameLengthType.BIN2))
+
+    path = os.path.join(str(tmpdir), 'capture')
+    with open(path, 'wb') as f:
+        f.write(b''.join(frames) + tail)
+    return path
+
+
+def test_lookup(tmpdir):
+    with Py8583CaptureArchive(capture(tmpdir)) as archive:
+        assert len(archive) == 10
+        assert archive.keys(3) == {'mti': '0200', 'stan': '000003', 'rrn': None, 'tid': 'TERM0001'}
+        assert archive.find(tid='TERM0001', stan='000005') == [5]
+        assert [message.get_bit(11) for message in archive.find_messages(tid='TERM0000')] == [
+            '000000', '000002', '000004', '000006', '000008',
+        ]
+
+
+def test_close_with_parsed_messages_alive(tmpdir):
+    with Py8583CaptureArchive(capture(tmpdir)) as archive:
+        message = archive[7]
+        found = archive.find_messages(stan='000003')
+
+    assert message.get_bit(11) == '000007'
+    assert found[0].get_bit(11) == '000003'
+
+
+def test_index_reused(tmpdir):
+    path = capture(tmpdir)
+    with Py8583CaptureArchive(path):
+        pass
+    mtime = os.stat(path + '.idx').st_mtime_ns
+
+    with Py8583CaptureArchive(path) as archive:
+        assert archive[-1].get_bit(11) == '000009'
+    assert os.stat(path + '.idx').st_mtime_ns == mtime
+
+
+def test_truncated_capture(tmpdir, monkeypatch):
+    closed = []
+    close = Py8583CaptureArchive.close
+
+    def spy(self):
+        close(self)
+        closed.append(self._file.closed)
+
+    monkeypatch.setattr(Py8583CaptureArchive, 'close', spy)
+
+    with pytest.raises(err.Py8583Error):
+        Py8583CaptureArchive(capture(tmpdir, tail=b'\x00\x40' + b'0200'))
+    assert closed == [True]
+    assert os.listdir(str(tmpdir)) == ['capture']
+
+
+def test_bcd_key_fields(tmpdir):
+    spec = load_spec({'base': 'default', 'fields': {'MTI': {'data_type': 'BCD'}, '11': {'data_type': 'BCD'}}})
+    frames = []
+    for stan in ('000123', '001200', '000000'):
+        message = Py8583(spec)
+        message.MTI = '0200'
+        message.set_bit(11, stan)
+        frames.append(frame.pack_frame(message.build(), FrameLengthType.BIN2))
+    path = os.path.join(str(tmpdir), 'capture')
+    with open(path, 'wb') as f:
+        f.write(b''.join(frames))
+
+    with Py8583CaptureArchive(path, spec) as archive:
+        assert archive.keys(1) == {'mti': '0200', 'stan': '001200', 'rrn': None, 'tid': None}
+        assert archive.find(stan='000123') == [0]
+        assert archive.find(stan='001200') == [1]
+        assert archive.find(stan='000000') == [2]
+        assert archive.find(mti='0200') == [0, 1, 2]
+
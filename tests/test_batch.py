@@ -0,0 +1,61 @@
+# coding=utf-8
+from py8583.batch import build_many, parse_many
+from py8583.codec import compile
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec
+from py8583.trace import Py8583TraceRecorder
+
+
+SPEC = Py8583Spec()
+
+ALL_FIELDS = [
+    {'MTI': '0200', 2: '4111111111111111', 4: '000000001000', 11: '%06d' % n, 41: 'TERM0001'}
+    for n in range(5)
+] + [
+    {'MTI': '0800', 11: '000099', 70: '301'},
+]
+
+
+def build(fields):
+    message = Py8583(SPEC)
+    for bit, value in fields.items():
+        if bit == 'MTI':
+            message.MTI = value
+        else:
+            message.set_bit(bit, value)
+    return message.build()
+
+
+def test_build_many():
+    assert list(build_many(SPEC, ALL_FIELDS)) == [build(fields) for fields in ALL_FIELDS]
+
+
+def test_parse_many():
+    msgs = [build(fields) for fields in ALL_FIELDS]
+    assert [message.to_dict() for message in parse_many(SPEC, msgs)] == ALL_FIELDS
+
+
+def test_parse_many_reuses_one_message():
+    msgs = [build(fields) for fields in ALL_FIELDS]
+    assert len(set(id(message) for message in parse_many(compile(SPEC), msgs))) == 1
+
+
+def test_parse_many_lazy_and_only():
+    msgs = [build(fields) for fields in ALL_FIELDS]
+
+    assert [message.get_bit(11) for message in parse_many(SPEC, msgs, lazy=True)] == [
+        fields[11] for fields in ALL_FIELDS
+    ]
+    assert [message.get_bit(11) for message in parse_many(SPEC, msgs, only={11})] == [
+        fields[11] for fields in ALL_FIELDS
+    ]
+
+
+def test_trace_hook():
+    recorder = Py8583TraceRecorder()
+    msgs = list(build_many(SPEC, ALL_FIELDS[:2], trace_hook=recorder))
+    assert recorder.events
+
+    recorder.clear()
+    list(parse_many(SPEC, msgs, trace_hook=recorder))
+    assert [event.bit for event in recorder.events if event.stage == 'parse_field'] == [2, 4, 11, 41] * 2
@@ -0,0 +1,136 @@
+# coding=utf-8
+"""
+BCD fields and BCD / binary length prefixes against hand built bytes.
+"""
+import pytest
+
+from py8583.codec import compile
+from py8583.py8583 import Py8583
+from py8583.spec import load_spec
+
+
+# bits 2, 3, 4, 11, 41
+BITMAP = b'\x70\x20\x00\x00\x00\x80\x00\x00'
+
+
+def cup_spec(**fields):
+    """
+    default spec with MTI, 2, 3, 4, 11 and 35 in BCD, the LLVAR prefixes in BCD too.
+    """
+
+    definition = {
+        'MTI': {'data_type': 'BCD'},
+        '2': {'data_type': 'BCD', 'data_len_encode_type': 'BCD'},
+        '3': {'data_type': 'BCD'},
+        '4': {'data_type': 'BCD'},
+        '11': {'data_type': 'BCD'},
+        '35': {'data_type': 'BCD', 'data_len_encode_type': 'BCD'},
+    }
+    definition.update(fields)
+    return load_spec({'base': 'default', 'fields': definition})
+
+
+def purchase(spec, pan='4111111111111111'):
+    message = Py8583(spec)
+    message.MTI = '0200'
+    message.set_bit(2, pan)
+    message.set_bit(3, '000000')
+    message.set_bit(4, '000000001000')
+    message.set_bit(11, '000123')
+    message.set_bit(41, 'TERM0001')
+    return message
+
+
+def assert_parses_to(spec, msg, expected):
+    message = Py8583(spec)
+    message.parse(msg)
+    assert message.MTI == expected.MTI
+    assert list(message.bitmap.bits()) == list(expected.bitmap.bits())
+    for bit in expected.bitmap.bits():
+        assert message.get_bit(bit) == expected.get_bit(bit)
+
+
+#### BCD ####
+def test_bcd_message():
+    spec = cup_spec()
+    msg = (
+        b'\x02\x00' + BITMAP
+        + b'\x16' + b'\x41\x11\x11\x11\x11\x11\x11\x11'
+        + b'\x00\x00\x00'
+        + b'\x00\x00\x00\x00\x10\x00'
+        + b'\x00\x01\x23'
+        + b'TERM0001'
+    )
+
+    message = purchase(spec)
+    assert message.build() == msg
+    assert_parses_to(spec, msg, message)
+
+
+def test_bcd_odd_length_padded_left():
+    field_codec = compile(cup_spec())[2]
+    packed = b'\x15' + b'\x04\x11\x11\x11\x11\x11\x11\x11'  # 15 digits, the pad nibble first
+
+    assert field_codec.pack('411111111111111') == packed
+    assert field_codec.unpack(packed, 0) == ('411111111111111', len(packed))
+
+
+def test_bcd_odd_length_padded_right():
+    field_codec = compile(cup_spec(**{'2': {
+        'data_type': 'BCD', 'data_len_encode_type': 'BCD', 'bcd_pad': 'right',
+    }}))[2]
+    packed = b'\x15' + b'\x41\x11\x11\x11\x11\x11\x11\x10'
+
+    assert field_codec.pack('411111111111111') == packed
+    assert field_codec.unpack(packed, 0) == ('411111111111111', len(packed))
+
+
+def test_bcd_fixed_odd_length():
+    field_codec = compile(cup_spec(**{'70': {'data_type': 'BCD'}}))[70]  # n3
+
+    assert field_codec.pack('301') == b'\x03\x01'
+    assert field_codec.unpack(b'\x03\x01', 0) == ('301', 2)
+
+
+def test_bcd_track2():
+    field_codec = compile(cup_spec())[35]
+    packed = b'\x09' + b'\x41\x11\xd2\x51\x2f'  # '=' sent as 'D', padded with 'F' on the right
+
+    assert field_codec.pack('4111=2512') == packed
+    assert field_codec.unpack(packed, 0) == ('4111=2512', len(packed))
+
+
+def test_bcd_lllvar_prefix():
+    field_codec = compile(load_spec({'base': 'default', 'fields': {
+        '48': {'content_type': 'n', 'data_type': 'BCD', 'data_len_encode_type': 'BCD'},
+    }}))[48]
+    packed = b'\x01\x23' + b'\x01' + b'\x11' * 61  # 123 digits, the pad nibble first
+
+    assert field_codec.pack('1' * 123) == packed
+    assert field_codec.unpack(packed, 0) == ('1' * 123, len(packed))
+
+
+def test_bcd_invalid_prefix():
+    field_codec = compile(cup_spec())[2]
+    with pytest.raises(ValueError):
+        field_codec.unpack(b'\x1a' + b'\x00' * 10, 0)
+
+
+#### binary length prefix ####
+def test_bin_llvar_prefix():
+    field_codec = compile(load_spec({'base': 'default', 'fields': {
+        '32': {'data_len_encode_type': 'BIN'},
+    }}))[32]
+
+    assert field_codec.pack('12345') == b'\x05' + b'12345'
+    assert field_codec.unpack(b'\x05' + b'12345', 0) == ('12345', 6)
+
+
+def test_bin_lllvar_prefix():
+    field_codec = compile(load_spec({'base': 'default', 'fields': {
+        '48': {'data_len_encode_type': 'BIN'},
+    }}))[48]
+    data = b'A' * 300
+
+    assert field_codec.pack(data.decode('ascii')) == b'\x01\x2c' + data
+    assert field_codec.unpack(b'\x01\x2c' + data, 0) == (data.decode('ascii'), 302)
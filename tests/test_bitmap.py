@@ -0,0 +1,63 @@
+# coding=utf-8
+import pytest
+
+from py8583.bitmap import Py8583Bitmap
+
+
+BITS = [2, 3, 11, 41, 63, 64, 65, 70, 127, 128]
+
+
+def bitmap_of(bits):
+    bitmap = Py8583Bitmap()
+    for bit in bits:
+        bitmap.set(bit)
+    return bitmap
+
+
+def test_bits_in_order():
+    bitmap = bitmap_of(reversed(BITS))
+    assert list(bitmap.bits()) == BITS
+    assert bitmap.popcount() == len(BITS)
+    assert bitmap.extended
+
+
+@pytest.mark.parametrize('bit', range(2, 129))
+def test_rank(bit):
+    bitmap = bitmap_of(BITS)
+    assert bitmap.rank(bit) == len([b for b in BITS if b < bit])
+
+
+def test_rank_is_index_in_bit_order():
+    bitmap = bitmap_of(BITS)
+    assert [bitmap.rank(bit) for bit in BITS] == list(range(len(BITS)))
+
+
+def test_rank_primary_only():
+    bitmap = bitmap_of([2, 64])
+    assert bitmap.rank(2) == 0
+    assert bitmap.rank(64) == 1
+    assert bitmap.rank(65) == 2
+    assert bitmap.rank(128) == 2
+
+
+def test_bit1_derived():
+    bitmap = bitmap_of([3])
+    assert not bitmap.extended
+    assert bitmap[1] == 0
+
+    bitmap.set(65)
+    assert bitmap.extended
+    assert bitmap[1] == 1
+
+    bitmap.clear(65)
+    assert not bitmap.extended
+    assert list(bitmap.bits()) == [3]
+
+
+def test_test_and_clear():
+    bitmap = bitmap_of(BITS)
+    for bit in range(2, 129):
+        assert bool(bitmap.test(bit)) == (bit in BITS)
+
+    bitmap.clear(63)
+    assert bitmap.rank(64) == 4
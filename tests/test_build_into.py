@@ -0,0 +1,78 @@
+# coding=utf-8
+import pytest
+
+from py8583 import err
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec
+from py8583.template import Py8583Template
+
+
+SPEC = Py8583Spec()
+
+
+def purchase(cls=Py8583):
+    message = cls(SPEC)
+    message.MTI = '0200'
+    message.set_bit(2, '4111111111111111')
+    message.set_bit(4, '000000001000')
+    message.set_bit(11, '000123')
+    message.set_bit(52, b'\x01\x23\x45\x67\x89\xab\xcd\xef')
+    message.set_bit(70, '301')
+    return message
+
+
+def test_same_bytes_as_build():
+    message = purchase()
+    msg = message.build()
+    buffer = bytearray(len(msg))
+
+    assert message.build_into(buffer) == len(msg)
+    assert buffer == msg
+
+
+def test_offset_and_header_len():
+    message = purchase()
+    msg = message.build()
+    buffer = bytearray(b'#' * (3 + 2 + len(msg) + 4))
+
+    size = message.build_into(buffer, offset=3, header_len=2)
+    assert size == 2 + len(msg)
+    assert buffer == b'###' + b'##' + msg + b'####'  # the header is left untouched
+
+
+def test_into_memoryview():
+    message = purchase()
+    msg = message.build()
+    buffer = bytearray(len(msg) + 10)
+
+    message.build_into(memoryview(buffer)[10:])
+    assert buffer[10:] == msg
+
+
+def test_parsed_message():
+    msg = purchase().build()
+    message = Py8583(SPEC)
+    message.parse(msg, lazy=True)
+    message.set_bit(11, '000124')
+    buffer = bytearray(len(msg))
+
+    message.build_into(buffer)
+    assert bytes(buffer) == message.build()
+
+
+@pytest.mark.parametrize('offset, header_len', [(2, 0), (0, 2), (1, 1)])
+def test_buffer_too_small(offset, header_len):
+    message = purchase()
+    buffer = bytearray(len(message.build()) + 1)
+
+    message.build_into(buffer, 1)  # fits exactly
+    with pytest.raises(err.Py8583BufferTooSmallError):
+        message.build_into(buffer, offset, header_len)
+
+
+def test_template():
+    template = purchase(Py8583Template)
+    buffer = bytearray(200)
+
+    size = template.build_into(buffer, header_len=2)
+    assert bytes(buffer[2:size]) == purchase().build()
@@ -0,0 +1,117 @@
+# coding=utf-8
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from py8583 import bulk, frame
+from py8583.__main__ import main
+from py8583.constant import FrameLengthType
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEADER = b'\x60\x00\x03\x00\x00'
+
+
+def messages(count):
+    for n in range(count):
+        message = Py8583(Py8583Spec())
+        message.MTI = '0200'
+        message.set_bit(4, '%012d' % (n * 100))
+        message.set_bit(11, '%06d' % n)
+        message.set_bit(52, bytes([n % 256]) * 8)
+        yield message
+
+
+def capture(tmpdir, count=25, length_type=FrameLengthType.BIN2, header=b''):
+    path = os.path.join(str(tmpdir), 'capture')
+    with open(path, 'wb') as f:
+        for message in messages(count):
+            f.write(frame.pack_frame(message.build(), length_type, header))
+    return path
+
+
+def expected(count):
+    return [message.to_dict() for message in messages(count)]
+
+
+def test_split_chunks(tmpdir):
+    path = capture(tmpdir, 25)
+    chunks = list(bulk.split_chunks(path, chunk_frames=10))
+
+    assert len(chunks) == 3
+    assert chunks[0][0] == 0 and chunks[-1][1] == os.path.getsize(path)
+    assert all(end == start for (_, end), (start, _) in zip(chunks, chunks[1:]))
+
+
+def test_bulk_decode_in_order(tmpdir):
+    path = capture(tmpdir, 25)
+    assert list(bulk.bulk_decode(path, workers=2, chunk_frames=4)) == expected(25)
+
+
+def test_bulk_decode_header_ascii4(tmpdir):
+    path = capture(tmpdir, 7, FrameLengthType.ASCII4, HEADER)
+    results = bulk.bulk_decode(path, length_type=FrameLengthType.ASCII4, header_len=len(HEADER), workers=1)
+    assert list(results) == expected(7)
+
+
+def test_bulk_decode_truncated(tmpdir):
+    path = capture(tmpdir, 3)
+    with open(path, 'ab') as f:
+        f.write(b'\x00\x40' + b'0200')
+
+    with pytest.raises(ValueError):
+        list(bulk.bulk_decode(path, workers=1))
+
+
+def test_bulk_decode_empty(tmpdir):
+    path = os.path.join(str(tmpdir), 'empty')
+    open(path, 'wb').close()
+    assert list(bulk.bulk_decode(path, workers=1)) == []
+
+
+def test_write_jsonl():
+    out = io.StringIO()
+    assert bulk.write_jsonl(expected(2), out) == 2
+
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert lines[1] == {'MTI': '0200', '4': '000000000100', '11': '000001', '52': '0101010101010101'}
+
+
+def test_write_csv():
+    out = io.StringIO()
+    assert bulk.write_csv(expected(2), out, [11, 52, 70]) == 2
+
+    rows = list(csv.reader(io.StringIO(out.getvalue())))
+    assert rows == [['MTI', '11', '52', '70'], ['0200', '000000', '0' * 16, ''], ['0200', '000001', '01' * 8, '']]
+
+
+def test_cli(tmpdir):
+    path = capture(tmpdir, 12)
+    output = os.path.join(str(tmpdir), 'out.csv')
+
+    main(['bulk-decode', path, '--workers', '2', '--chunk-frames', '5', '--format', 'csv', '--bits', '4,11', '-o', output])
+
+    with open(output, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['MTI', '4', '11']
+    assert rows[1:] == [['0200', '%012d' % (n * 100), '%06d' % n] for n in range(12)]
+
+
+def test_cli_module(tmpdir):
+    path = capture(tmpdir, 3, FrameLengthType.ASCII4, HEADER)
+
+    result = subprocess.run(
+        [sys.executable, '-m', 'py8583', 'bulk-decode', path, '--framing', 'ascii4',
+         '--header-len', str(len(HEADER)), '--spec', 'py8583.spec:Py8583Spec', '--workers', '1'],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+    )
+
+    assert [json.loads(line)['11'] for line in result.stdout.decode('utf-8').splitlines()] == ['000000', '000001', '000002']
+    assert result.stderr == b'decoded 3 messages\n'
@@ -0,0 +1,103 @@
+# coding=utf-8
+"""
+Fields encoded and decoded against hand built bytes.
+"""
+import pytest
+
+from py8583 import err
+from py8583.codec import compile
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec
+
+
+# bits 2, 3, 4, 11, 41
+BITMAP = b'\x70\x20\x00\x00\x00\x80\x00\x00'
+
+
+def purchase(spec, pan='4111111111111111'):
+    message = Py8583(spec)
+    message.MTI = '0200'
+    message.set_bit(2, pan)
+    message.set_bit(3, '000000')
+    message.set_bit(4, '000000001000')
+    message.set_bit(11, '000123')
+    message.set_bit(41, 'TERM0001')
+    return message
+
+
+def assert_parses_to(spec, msg, expected):
+    message = Py8583(spec)
+    message.parse(msg)
+    assert message.MTI == expected.MTI
+    assert list(message.bitmap.bits()) == list(expected.bitmap.bits())
+    for bit in expected.bitmap.bits():
+        assert message.get_bit(bit) == expected.get_bit(bit)
+
+
+#### ASCII ####
+def test_ascii_message():
+    spec = Py8583Spec()
+    msg = (
+        b'0200' + BITMAP
+        + b'16' + b'4111111111111111'
+        + b'000000'
+        + b'000000001000'
+        + b'000123'
+        + b'TERM0001'
+    )
+
+    message = purchase(spec)
+    assert message.build() == msg
+    assert_parses_to(spec, msg, message)
+
+
+def test_ascii_lllvar():
+    field_codec = compile(Py8583Spec())[48]
+    assert field_codec.pack('ABC') == b'003ABC'
+    assert field_codec.unpack(b'xx003ABCyy', 2) == ('ABC', 8)
+
+
+def test_ascii_too_long():
+    with pytest.raises(err.Py8583DataTooLongError):
+        compile(Py8583Spec())[2].pack('1' * 20)
+
+
+#### BIN ####
+def test_bin_content():
+    field_codec = compile(Py8583Spec())[52]
+    pin_block = b'\x01\x23\x45\x67\x89\xab\xcd\xef'
+
+    assert field_codec.pack(pin_block) == pin_block
+    value, end = field_codec.unpack(b'xx' + pin_block, 2)
+    assert bytes(value) == pin_block and end == 10
+
+
+def test_secondary_bitmap():
+    spec = Py8583Spec()
+    message = Py8583(spec)
+    message.MTI = '0800'
+    message.set_bit(11, '000001')
+    message.set_bit(70, '301')
+    msg = b'0800' + b'\x80\x20\x00\x00\x00\x00\x00\x00' + b'\x04\x00\x00\x00\x00\x00\x00\x00' + b'000001' + b'301'
+
+    assert message.build() == msg
+    assert_parses_to(spec, msg, message)
+
+
+#### already encoded ####
+def test_bytes_on_variable_field():
+    assert compile(Py8583Spec())[48].pack(b'\x9f\x27\x01\x80') == b'004\x9f\x27\x01\x80'
+
+
+@pytest.mark.parametrize('bit, value, packed', [
+    (4, b'12AB', b'0000000012AB'),  # padded as a str would be
+    (41, bytearray(b'T1'), b'      T1'),
+    (41, memoryview(b'TERM0001'), b'TERM0001'),
+])
+def test_bytes_on_fixed_field(bit, value, packed):
+    assert compile(Py8583Spec())[bit].pack(value) == packed
+
+
+def test_bytes_on_fixed_field_too_long():
+    with pytest.raises(err.Py8583DataTooLongError):
+        compile(Py8583Spec())[41].pack(b'TERM00001')
@@ -0,0 +1,147 @@
+# coding=utf-8
+"""
+decode_columns / decode_frames against Py8583.get_bit, message by message.
+"""
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+from py8583 import err, frame
+from py8583.columnar import decode_columns, decode_frames
+from py8583.constant import FrameLengthType
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec, load_spec
+
+
+HEADER = b'\x60\x00\x03\x00\x00'
+
+
+def message(n, spec=None):
+    """
+    the bitmaps differ on purpose: 2 and 35 on every other message, 102 (secondary bitmap) on every third
+    """
+
+    message = Py8583(spec or Py8583Spec())
+    message.MTI = '0200' if n % 2 else '0210'
+    if n % 2:
+        message.set_bit(2, '6222%012d' % n)
+    message.set_bit(4, '%012d' % (n * 100))
+    message.set_bit(7, '1018%06d' % n)
+    message.set_bit(11, '%06d' % n)
+    message.set_bit(22, '051')
+    if n % 2:
+        message.set_bit(35, '6222%012d=2512' % n)
+    message.set_bit(41, 'TERM%04d' % n)
+    message.set_bit(52, bytes([n % 256]) * 8)
+    if n % 3 == 0:
+        message.set_bit(102, 'ACCOUNT%d' % n)
+    return message
+
+
+def msgs(count, spec=None):
+    return [message(n, spec).build() for n in range(count)]
+
+
+#### decode_columns ####
+def test_numeric_columns():
+    columns, present = decode_columns(Py8583Spec(), msgs(20), [4, 11, 22])
+
+    assert columns[4].dtype == numpy.int64
+    assert columns[4].tolist() == [n * 100 for n in range(20)]
+    assert columns[11].tolist() == list(range(20))
+    assert columns[22].tolist() == [51] * 20
+    assert present[4].all() and present[11].all()
+
+
+def test_text_and_binary_columns():
+    columns, present = decode_columns(Py8583Spec(), msgs(12), ['MTI', 41, 52])
+
+    assert columns['MTI'].dtype == numpy.dtype('S4')
+    assert columns['MTI'].tolist() == [b'0210', b'0200'] * 6
+    assert present['MTI'].all()
+    assert columns[41].tolist() == [b'TERM%04d' % n for n in range(12)]
+    assert columns[52].dtype == numpy.uint8
+    assert columns[52].shape == (12, 8)
+    assert columns[52][:, 0].tolist() == list(range(12))
+
+
+def test_variable_columns_and_present():
+    count = 15
+    data = msgs(count)
+    columns, present = decode_columns(Py8583Spec(), data, [2, 35, 102])
+
+    for n, msg in enumerate(data):
+        parsed = Py8583(Py8583Spec())
+        parsed.parse(msg)
+        for bit in (2, 35, 102):
+            assert present[bit][n] == parsed.bitmap.test(bit)
+            assert columns[bit][n] == (parsed.get_bit(bit) if parsed.bitmap.test(bit) else None)
+
+
+def test_absent_fixed_fields_are_zero():
+    data = msgs(6)
+    columns, present = decode_columns(Py8583Spec(), data, [2, 4])
+    assert present[2].tolist() == [n % 2 == 1 for n in range(6)]
+
+    # a fixed field missing from some messages
+    spec = Py8583Spec()
+    with_4 = message(1).build()
+    without_4 = message(2)
+    without_4.clear_bit(4)
+    columns, present = decode_columns(spec, [with_4, without_4.build()], [4, 11])
+    assert columns[4].tolist() == [100, 0]
+    assert present[4].tolist() == [True, False]
+    assert columns[11].tolist() == [1, 2]
+
+
+def test_bcd_columns():
+    spec = load_spec({'base': 'default', 'fields': {
+        'MTI': {'data_type': 'BCD'},
+        '2': {'data_type': 'BCD', 'data_len_encode_type': 'BCD'},
+        '4': {'data_type': 'BCD'},
+        '11': {'data_type': 'BCD'},
+        '22': {'data_type': 'BCD'},  # odd digits, padded
+    }})
+    data = msgs(10, spec)
+    columns, present = decode_columns(spec, data, ['MTI', 2, 4, 11, 22])
+
+    assert columns[4].tolist() == [n * 100 for n in range(10)]
+    assert columns[11].tolist() == list(range(10))
+    assert columns[22].tolist() == [51] * 10
+    assert columns[2].tolist() == [('6222%012d' % n if n % 2 else None) for n in range(10)]
+
+
+def test_non_numeric_content():
+    data = msgs(3)
+    bad = bytearray(data[1])
+    position = bad.index(b'0000000001001018')  # field 4, right before field 7
+    bad[position: position + 1] = b'X'
+    with pytest.raises(err.Py8583Error):
+        decode_columns(Py8583Spec(), [data[0], bytes(bad), data[2]], [4])
+
+
+def test_empty():
+    columns, present = decode_columns(Py8583Spec(), [], ['MTI', 4, 2])
+    assert all(len(column) == 0 for column in columns.values())
+
+
+#### decode_frames ####
+def test_decode_frames():
+    data = b''.join(frame.pack_frame(msg, FrameLengthType.BIN2, HEADER) for msg in msgs(9))
+    columns, present = decode_frames(Py8583Spec(), data, [4, 102], header_len=len(HEADER))
+
+    assert columns[4].tolist() == [n * 100 for n in range(9)]
+    assert columns[102].tolist() == [('ACCOUNT%d' % n if n % 3 == 0 else None) for n in range(9)]
+    assert present[102].tolist() == [n % 3 == 0 for n in range(9)]
+
+
+def test_decode_frames_ascii_length():
+    data = b''.join(frame.pack_frame(msg, FrameLengthType.ASCII4) for msg in msgs(5))
+    columns, present = decode_frames(Py8583Spec(), data, [11], length_type=FrameLengthType.ASCII4)
+    assert columns[11].tolist() == list(range(5))
+
+
+def test_truncated_frame():
+    data = b''.join(frame.pack_frame(msg, FrameLengthType.BIN2) for msg in msgs(3))
+    with pytest.raises(err.Py8583Error):
+        decode_frames(Py8583Spec(), data[:-5], [4])
@@ -0,0 +1,142 @@
+# coding=utf-8
+"""
+Py8583Dialects: register over a base, routes and their order, parse.
+"""
+import pytest
+
+from py8583 import err
+from py8583.constant import Validation
+from py8583.dialect import Py8583Dialects
+from py8583.py8583 import Py8583
+
+
+TPDU = b'\x60\x00\x03\x00\x00'
+
+
+def dialects(default='iso'):
+    dialects = Py8583Dialects(default=default)
+    dialects.register('iso', {'fields': {}})
+    dialects.register('cup', {'fields': {
+        'MTI': {'data_type': 'BCD'},
+        '2': {'data_type': 'BCD', 'data_len_encode_type': 'BCD'},
+        '32': {'data_len_max': 28},
+    }})
+    dialects.register('cup_acq', {'base': 'cup', 'validation': 'BUILD', 'fields': {
+        '32': {'content_type': 'ans'},
+    }})
+    return dialects
+
+
+def purchase(spec, MTI='0200'):
+    message = Py8583(spec)
+    message.MTI = MTI
+    message.set_bit(2, '6222000000000001')
+    message.set_bit(4, '000000001000')
+    message.set_bit(11, '000123')
+    return message
+
+
+#### register ####
+def test_register_over_a_base():
+    d = dialects()
+
+    assert set(d) == {'iso', 'cup', 'cup_acq'}
+    assert 'cup' in d and 'visa' not in d
+    assert d['cup'][32].data_len_max == 28
+    # cup_acq keeps the fields of cup and changes its own
+    assert d['cup_acq'][2].data_type == d['cup'][2].data_type
+    assert d['cup_acq'][32].data_len_max == 28
+    assert d['cup_acq'][32].content_type == 'ans'
+    assert d['cup'][32].content_type == d['iso'][32].content_type
+
+
+def test_validation_inherited():
+    d = dialects()
+    d.register('cup_acq_2', {'base': 'cup_acq', 'fields': {'48': {'content_type': 'ans'}}})
+    d.register('cup_acq_3', {'base': 'cup_acq', 'validation': 'NONE'})
+
+    assert d['cup'].validation == Validation.NONE
+    assert d['cup_acq'].validation == Validation.BUILD
+    assert d['cup_acq_2'].validation == Validation.BUILD
+    assert d['cup_acq_3'].validation == Validation.NONE
+
+
+def test_register_errors():
+    d = dialects()
+    with pytest.raises(err.Py8583DialectError):
+        d.register('cup', {'fields': {}})
+    with pytest.raises(err.Py8583DialectError):
+        d.register('visa', {'base': 'nope', 'fields': {}})
+    with pytest.raises(err.Py8583DialectError):
+        d['nope']
+    with pytest.raises(err.Py8583DialectError):
+        d.route_link('link', 'nope')
+
+
+def test_unchanged_fields_share_their_codec():
+    d = dialects()
+    iso, cup = d.codec('iso'), d.codec('cup')
+
+    assert d.codec('cup') is cup
+    assert iso[4] is cup[4]
+    assert iso[2] is not cup[2]
+
+
+#### dispatch ####
+def test_dispatch_order():
+    d = dialects()
+    d.route_link('unionpay-1', 'cup')
+    d.route_header(TPDU, 'cup_acq')
+    d.route_MTI('0800', 'cup')
+
+    cup, cup_acq, iso = d.codec('cup'), d.codec('cup_acq'), d.codec('iso')
+    echo = purchase(d['cup'], '0800').build()
+
+    # link, then header, then MTI, then the default
+    assert d.dispatch(link='unionpay-1', header=TPDU, msg=b'0200') is cup
+    assert d.dispatch(link='other', header=TPDU, msg=echo) is cup_acq
+    assert d.dispatch(link='other', header=b'\x60\x00\x04\x00\x00', msg=echo) is cup
+    assert d.dispatch(link='other', header=bytearray(TPDU)) is cup_acq
+    assert d.dispatch(msg=memoryview(echo)) is cup
+    assert d.dispatch(msg=b'0800') is iso  # the MTI is matched as cup encodes it, BCD
+    assert d.dispatch() is iso
+
+
+def test_route_MTI_of_several_encodings():
+    d = dialects()
+    d.route_MTI('0800', 'cup')
+    d.route_MTI('0200', 'iso')
+
+    assert d.dispatch(msg=b'\x08\x00rest') is d.codec('cup')
+    assert d.dispatch(msg=b'0200rest') is d.codec('iso')
+
+
+def test_no_default():
+    d = dialects(default=None)
+    d.route_link('unionpay-1', 'cup')
+
+    assert d.dispatch(link='unionpay-1') is d.codec('cup')
+    with pytest.raises(err.Py8583DialectError):
+        d.dispatch(link='other', header=TPDU, msg=b'0200')
+
+
+#### parse ####
+def test_parse():
+    d = dialects()
+    d.route_link('unionpay-1', 'cup')
+    msg = purchase(d['cup']).build()
+
+    message = d.parse(msg, link='unionpay-1')
+    assert message.MTI == '0200'
+    assert message.get_bit(2) == '6222000000000001'
+    assert message.get_bit(4) == '000000001000'
+    assert message.codec is d.codec('cup')
+
+
+def test_parse_only():
+    d = dialects()
+    d.route_header(TPDU, 'cup')
+    msg = purchase(d['cup']).build()
+
+    message = d.parse(msg, header=TPDU, only=[11])
+    assert message.get_bit(11) == '000123'
@@ -0,0 +1,98 @@
+# coding=utf-8
+import pytest
+
+from py8583 import err, field55
+
+
+def test_encode_short():
+    assert field55.encode([(0x9F27, b'\x80'), (0x95, b'\x00' * 5)]) == (
+        b'\x9f\x27\x01\x80' + b'\x95\x05' + b'\x00' * 5
+    )
+
+
+def test_multi_byte_tags():
+    data = b'\x9f\x26\x02\x12\x34' + b'\xdf\x81\x01\x01\x55' + b'\x5f\x34\x01\x01'
+    tlv = field55.Py8583TLV(data)
+
+    assert list(tlv) == [0x9F26, 0xDF8101, 0x5F34]
+    assert tlv.get(0x9F26) == b'\x12\x34'
+    assert tlv.get('DF8101') == b'\x55'
+    assert tlv.get(b'\x5f\x34') == b'\x01'
+    assert field55.encode(tlv.items()) == data
+
+
+@pytest.mark.parametrize('length, encoded', [
+    (127, b'\x7f'),
+    (128, b'\x81\x80'),
+    (255, b'\x81\xff'),
+    (256, b'\x82\x01\x00'),
+    (300, b'\x82\x01\x2c'),  # ord(b2) << 8 + ord(b3) read 1 << 52
+    (70000, b'\x83\x01\x11\x70'),
+])
+def test_long_lengths(length, encoded):
+    value = bytes(range(256)) * (length // 256) + bytes(range(length % 256))
+    data = b'\x9f\x10' + encoded + value + b'\x9f\x27\x01\x80'
+
+    assert field55.encode([(0x9F10, value), (0x9F27, b'\x80')]) == data
+
+    tlv = field55.Py8583TLV(data)
+    assert tlv.get(0x9F10) == value
+    assert tlv.get(0x9F27) == b'\x80'
+
+
+def test_constructed():
+    inner = b'\x9f\x26\x02\x12\x34' + b'\x5f\x34\x01\x01'
+    data = b'\x70' + bytes((len(inner),)) + inner + b'\x95\x01\x00'
+    tlv = field55.Py8583TLV(data)
+
+    assert tlv.is_constructed(0x70)
+    assert tlv.template(0x70).get(0x5F34) == b'\x01'
+    assert tlv.find(0x9F26) == b'\x12\x34'
+    assert tlv.find(0x9F36) is None
+
+
+def test_padding_between_objects():
+    tlv = field55.Py8583TLV(b'\x95\x01\x00' + b'\x00\x00' + b'\x9f\x27\x01\x80')
+    assert tlv.get(0x9F27) == b'\x80'
+
+
+@pytest.mark.parametrize('data', [
+    b'\x9f\x26\x08\x12\x34',  # value cut
+    b'\x9f\x26\x85\x00\x00\x00\x00\x01\x00',  # 5 length bytes
+    b'\x9f',  # tag cut
+])
+def test_malformed(data):
+    with pytest.raises(err.Py8583TLVError):
+        field55.Py8583TLV(data).get(0x9F26)
+
+
+def test_hex_dict():
+    data = b'\x9f\x26\x02\x12\x34' + b'\x9f\x10' + b'\x82\x01\x2c' + b'\xab' * 300
+    parsed = field55.parse(data)
+
+    assert parsed['9f26'] == {'len': 2, 'value': '1234'}
+    assert parsed['9f10'] == {'len': 300, 'value': 'ab' * 300}
+    assert bytes.fromhex(field55.build(parsed)) == data
+
+
+
+def test_template_build():
+    template = field55.Py8583TLVTemplate([(0x9F27, b'\x80'), (0x9F26, b'\x00' * 8)], dynamic=[0x9F26])
+    assert template.build({0x9F26: b'\x11' * 8}) == field55.encode([(0x9F27, b'\x80'), (0x9F26, b'\x11' * 8)])
+
+
+def test_encode_into():
+    items = [(0x9F27, b'\x80'), (0x70, [(0x5A, b'\x41\x11')])]
+    buffer = bytearray(b'..' + b'\x00' * 20)
+
+    end = field55.encode_into(buffer, 2, items)
+    assert bytes(buffer[2:end]) == field55.encode(items) == b'\x9f\x27\x01\x80' + b'\x70\x04\x5a\x02\x41\x11'
+
+    with pytest.raises(err.Py8583BufferTooSmallError):
+        field55.encode_into(bytearray(5), 0, items)
+
+
+def test_template_rejects_a_length_change():
+    template = field55.Py8583TLVTemplate([(0x9F37, b'\x00' * 4)], dynamic=[0x9F37])
+    with pytest.raises(err.Py8583TLVError):
+        template.build({0x9F37: b'\x00' * 5})
@@ -0,0 +1,78 @@
+# coding=utf-8
+import io
+import random
+
+import pytest
+
+from py8583 import err, frame
+from py8583.constant import FrameLengthType
+
+
+HEADER = b'\x60\x00\x03\x00\x00'
+MSGS = [b'0800' + bytes(i % 256 for i in range(size)) for size in (0, 1, 7, 300, 70, 1024)]
+
+
+class Trickle(object):
+    """
+    File-like object returning fewer bytes than asked, as a socket does.
+    """
+
+    def __init__(self, data, sizes):
+        self._data = io.BytesIO(data)
+        self._sizes = sizes
+
+    def read(self, size):
+        return self._data.read(min(size, next(self._sizes)))
+
+
+def stream(length_type, header=b''):
+    return b''.join(frame.pack_frame(msg, length_type, header) for msg in MSGS)
+
+
+@pytest.mark.parametrize('length_type', [FrameLengthType.BIN2, FrameLengthType.ASCII4])
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 64, 65536])
+def test_split_across_chunks(length_type, chunk_size):
+    reader = frame.Py8583FrameReader(io.BytesIO(stream(length_type)), length_type, chunk_size=chunk_size)
+    assert list(reader) == MSGS
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_short_reads(seed):
+    rand = random.Random(seed)
+    sizes = iter(lambda: rand.randint(1, 9), None)
+    reader = frame.Py8583FrameReader(
+        Trickle(stream(FrameLengthType.BIN2, HEADER), sizes), header_len=len(HEADER), chunk_size=16
+    )
+
+    assert list(reader.frames()) == [(HEADER, msg) for msg in MSGS]
+
+
+def test_eof_in_the_middle_of_a_frame():
+    data = stream(FrameLengthType.BIN2)
+    reader = frame.Py8583FrameReader(io.BytesIO(data[:-3]), chunk_size=7)
+
+    with pytest.raises(err.Py8583Error):
+        list(reader)
+
+
+def test_iter_frames():
+    data = stream(FrameLengthType.ASCII4)
+    frames = list(frame.iter_frames(data, FrameLengthType.ASCII4))
+    assert [data[start:end] for start, end in frames] == MSGS
+
+    # an incomplete frame at the end is left
+    assert list(frame.iter_frames(data[:-1], FrameLengthType.ASCII4)) == frames[:-1]
+
+
+def test_writer_round_trip():
+    out = io.BytesIO()
+    with frame.Py8583FrameWriter(out, FrameLengthType.ASCII4, HEADER, flush_size=100) as writer:
+        for msg in MSGS:
+            writer.write(msg)
+
+    assert out.getvalue() == stream(FrameLengthType.ASCII4, HEADER)
+
+
+def test_length_too_long():
+    with pytest.raises(err.Py8583DataTooLongError):
+        frame.pack_length(10000, FrameLengthType.ASCII4)
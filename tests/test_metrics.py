@@ -0,0 +1,100 @@
+# coding=utf-8
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from py8583.metrics import Py8583Metrics, start_http_server
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec
+from py8583.trace import Py8583TraceEvent
+
+
+SPEC = Py8583Spec()
+
+
+def echo(metrics):
+    message = Py8583(SPEC, trace_hook=metrics)
+    message.MTI = '0800'
+    message.set_bit(11, '000001')
+    message.set_bit(70, '301')
+    return message
+
+
+def test_snapshot():
+    metrics = Py8583Metrics()
+    msg = echo(metrics).build()
+    for _ in range(3):
+        Py8583(SPEC, trace_hook=metrics).parse(msg)
+
+    snapshot = metrics.snapshot()
+    assert snapshot['stages']['build_MTI']['count'] == 1
+    assert snapshot['stages']['parse_MTI']['count'] == 3
+    assert snapshot['stages']['parse_MTI']['bytes'] == 12
+    assert sorted(snapshot['fields']['parse_field']) == [11, 70]
+    assert snapshot['fields']['parse_field'][70]['count'] == 3
+    assert snapshot['fields']['parse_field'][70]['bytes'] == 9
+    assert snapshot['fields']['build_field'][11]['bytes'] == 6
+
+
+def test_counters():
+    metrics = Py8583Metrics()
+    metrics.on_event(Py8583TraceEvent('parse_field', 2, 20, 18, 0.5))
+    metrics.on_event(Py8583TraceEvent('parse_field', 2, 20, 16, 1.5))
+
+    assert metrics.snapshot()['fields']['parse_field'][2] == {
+        'count': 2, 'seconds': 2.0, 'bytes': 34, 'max_seconds': 1.5,
+    }
+
+    metrics.reset()
+    assert metrics.snapshot() == {'stages': {}, 'fields': {}}
+
+
+def test_shared_by_threads():
+    metrics = Py8583Metrics()
+    msg = echo(None).build()
+
+    def parse():
+        for _ in range(200):
+            Py8583(SPEC, trace_hook=metrics).parse(msg)
+
+    threads = [threading.Thread(target=parse) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert metrics.snapshot()['stages']['parse_MTI']['count'] == 800
+
+
+def test_exposition():
+    metrics = Py8583Metrics(prefix='iso')
+    metrics.on_event(Py8583TraceEvent('parse_MTI', None, 0, 4, 0.25))
+    metrics.on_event(Py8583TraceEvent('parse_field', 11, 20, 6, 0.5))
+
+    lines = metrics.exposition().splitlines()
+    assert '# TYPE iso_stage_calls_total counter' in lines
+    assert 'iso_stage_calls_total{stage="parse_MTI"} 1' in lines
+    assert 'iso_stage_bytes_total{stage="parse_MTI"} 4' in lines
+    assert 'iso_field_seconds_total{stage="parse_field",bit="11"} 0.5' in lines
+    assert '# TYPE iso_field_max_seconds gauge' in lines
+
+
+def test_http_endpoint():
+    metrics = Py8583Metrics()
+    echo(metrics).build()
+
+    server = start_http_server(metrics, 0)
+    try:
+        url = 'http://%s:%s' % server.server_address
+        with urllib.request.urlopen(url + '/metrics') as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert response.read().decode('utf-8') == metrics.exposition()
+
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(url + '/other')
+        assert e.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
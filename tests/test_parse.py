@@ -0,0 +1,161 @@
+# coding=utf-8
+"""
+Lazy and selective(only=) parse give the fields an eager parse gives.
+"""
+import pytest
+
+from py8583 import err
+from py8583.py8583 import Py8583, _UNDECODED
+from py8583.spec import Py8583Spec
+
+
+SPEC = Py8583Spec()
+
+VALUES = {
+    2: '4111111111111111',
+    3: '000000',
+    4: '000000001000',
+    7: '1018120000',
+    11: '000123',
+    12: '120000',
+    35: '4111111111111111=25121010000000000',
+    41: 'TERM0001',
+    48: 'additional data',
+    52: b'\x01\x23\x45\x67\x89\xab\xcd\xef',
+    55: b'\x9f\x26\x08\x12\x34\x56\x78\x9a\xbc\xde\xf0',
+    70: '301',
+    102: '0123456789',
+    128: b'\x00' * 8 + b'\xff' * 8,
+}
+
+
+def build():
+    message = Py8583(SPEC)
+    message.MTI = '0200'
+    for bit, value in VALUES.items():
+        message.set_bit(bit, value)
+    return message.build()
+
+
+def parsed(msg, **kwargs):
+    message = Py8583(SPEC)
+    message.parse(msg, **kwargs)
+    return message
+
+
+def fields(message):
+    return dict(
+        (bit, bytes(value) if isinstance(value, memoryview) else value)
+        for bit, value in ((bit, message.get_bit(bit)) for bit in message.bitmap.bits())
+    )
+
+
+def test_eager():
+    message = parsed(build())
+    assert message.MTI == '0200'
+    assert fields(message) == VALUES
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'lazy': True},
+    {'only': {3, 4}},
+    {'only': {2}},
+    {'only': {11, 41, 70}},
+    {'only': {128}},
+    {'only': set()},
+])
+def test_equivalent_to_eager(kwargs):
+    msg = build()
+    message = parsed(msg, **kwargs)
+
+    assert message.MTI == '0200'
+    assert message.bitmap == parsed(msg).bitmap
+    assert fields(message) == VALUES
+    assert message.build() == msg
+
+
+@pytest.mark.parametrize('kwargs', [{'lazy': True}, {'only': {3}}])
+def test_get_raw_equivalent_to_eager(kwargs):
+    msg = build()
+    eager = parsed(msg)
+    message = parsed(msg, **kwargs)
+
+    for bit in VALUES:
+        assert bytes(message.get_raw(bit)) == bytes(eager.get_raw(bit))
+
+
+def test_lazy_set_bit_keeps_the_others():
+    msg = build()
+    message = parsed(msg, lazy=True)
+    message.set_bit(11, '000124')
+
+    expected = dict(VALUES)
+    expected[11] = '000124'
+    assert fields(parsed(message.build())) == expected
+
+
+def test_lazy_decodes_on_first_access():
+    message = parsed(build(), lazy=True)
+    assert all(value is _UNDECODED for value in message._values)
+
+    assert message.get_bit(41) == VALUES[41]
+    assert message._values[message.bitmap.rank(41)] == VALUES[41]
+    assert message._values[message.bitmap.rank(11)] is _UNDECODED
+
+
+def test_only_stops_after_last_bit():
+    message = parsed(build(), only={3, 4})
+    assert message._rest is not None
+
+    message._index_rest()
+    assert message._rest is None
+    assert fields(message) == VALUES
+
+
+def test_only_get_bit_after_the_stop():
+    message = parsed(build(), only={3})
+
+    assert message.get_bit(102) == VALUES[102]  # indexes the rest
+    assert message._rest is None
+    assert message.get_bit(70) == VALUES[70]
+
+
+def test_only_set_and_clear_after_the_stop():
+    msg = build()
+    message = parsed(msg, only={3})
+    message.set_bit(70, '302')
+    message.clear_bit(102)
+
+    expected = parsed(msg)
+    expected.set_bit(70, '302')
+    expected.clear_bit(102)
+
+    assert message.build() == expected.build()
+    assert fields(parsed(message.build()))[70] == '302'
+
+
+def test_only_absent_bit():
+    message = parsed(build(), only={3})
+    with pytest.raises(err.Py8583BitNotExistError):
+        message.get_bit(5)
+
+
+def test_eager_parse_leaves_a_mutable_buffer_free():
+    msg = build()
+    buffer = bytearray(msg + msg)
+    message = parsed(memoryview(buffer)[:len(msg)])
+
+    del buffer[:len(msg)]  # no view of buffer is kept
+    buffer[:] = b'\x00' * len(buffer)
+    assert fields(message) == VALUES
+    assert message.build() == msg
+
+
+def test_lazy_parse_is_a_view():
+    msg = build()
+    buffer = bytearray(msg)
+    message = parsed(buffer, lazy=True)
+
+    with pytest.raises(BufferError):
+        buffer.clear()
+    assert message.get_raw(52).obj is buffer
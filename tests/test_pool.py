@@ -0,0 +1,92 @@
+# coding=utf-8
+import asyncio
+
+from py8583.aio import Py8583AsyncClient
+from py8583.pool import Py8583ConnectionPool
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec
+
+from issuer_stub import IssuerStub
+
+
+SPEC = Py8583Spec()
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+def pool_of(port, **kwargs):
+    return Py8583ConnectionPool(
+        '127.0.0.1', port, SPEC, size=1, echo_interval=0.05, echo_timeout=0.5,
+        reconnect_min=0.01, reconnect_max=0.02, **kwargs
+    )
+
+
+def wait_connections(stub, count):
+    async def wait():
+        while len(stub.connections) < count:
+            await asyncio.sleep(0.01)
+    return asyncio.wait_for(wait(), 5)
+
+
+def test_request():
+    async def main():
+        async with IssuerStub(SPEC) as stub:
+            async with pool_of(stub.port) as pool:
+                message = Py8583(SPEC)
+                message.MTI = '0200'
+                message.set_bit(11, pool.next_stan())
+                response = await pool.request(message, timeout=5)
+        return response
+
+    assert run(main()).get_bit(39) == '00'
+
+
+def test_keeper_survives_a_bad_echo_response():
+    async def bad_echo(connection, request):
+        connection.send(b'0810' + b'\x40' + b'\x00' * 7 + b'XX')  # field 2, a bad length
+
+    async def main():
+        async with IssuerStub(SPEC, bad_echo) as stub:
+            async with pool_of(stub.port) as pool:
+                await wait_connections(stub, 3)
+                assert not any(task.done() for task in pool._tasks)
+
+    run(main())
+
+
+def test_keeper_survives_an_echo_exception(monkeypatch):
+    async def fail(self, message, timeout=None):
+        raise ValueError('unexpected')
+
+    monkeypatch.setattr(Py8583AsyncClient, 'request', fail)
+
+    async def main():
+        async with IssuerStub(SPEC) as stub:
+            async with pool_of(stub.port) as pool:
+                await wait_connections(stub, 3)
+                assert not any(task.done() for task in pool._tasks)
+
+    run(main())
+
+
+def test_keeper_survives_a_connect_exception(monkeypatch):
+    connect = Py8583AsyncClient.connect.__func__
+    attempts = []
+
+    async def flaky(cls, *args, **kwargs):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError('unexpected')
+        return await connect(cls, *args, **kwargs)
+
+    monkeypatch.setattr(Py8583AsyncClient, 'connect', classmethod(flaky))
+
+    async def main():
+        async with IssuerStub(SPEC) as stub:
+            async with pool_of(stub.port) as pool:
+                await wait_connections(stub, 1)
+                assert not any(task.done() for task in pool._tasks)
+
+    run(main())
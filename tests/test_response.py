@@ -0,0 +1,72 @@
+# coding=utf-8
+"""
+make_response gives the bytes a full build of the same fields gives.
+"""
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec
+
+
+SPEC = Py8583Spec()
+
+TERMINAL = {
+    3: '000000',
+    22: '051',
+    25: '00',
+    41: 'TERM0001',
+    42: 'MERCHANT0000001',
+    49: '156',
+}
+
+
+def full_build(MTI, values):
+    message = Py8583(SPEC)
+    message.MTI = MTI
+    for bit, value in values.items():
+        message.set_bit(bit, value)
+    return message.build()
+
+
+def parse(msg, **kwargs):
+    message = Py8583(SPEC)
+    message.parse(msg, **kwargs)
+    return message
+
+
+def request():
+    values = dict(TERMINAL)
+    values.update({2: '4111111111111111', 4: '000000001000', 11: '000123', 48: 'not echoed'})
+    return values
+
+
+def test_make_response():
+    parsed = Py8583(SPEC)
+    parsed.parse(full_build('0200', request()))
+    response = Py8583.make_response(parsed, {38: 'A12345', 39: '00'})
+
+    expected = dict((bit, value) for bit, value in request().items() if bit in Py8583.RESPONSE_ECHO_BITS)
+    expected.update({38: 'A12345', 39: '00'})
+    assert response.MTI == '0210'
+    assert response.build() == full_build('0210', expected)
+
+
+def test_make_response_lazy_and_only():
+    msg = full_build('0200', request())
+    expected = Py8583.make_response(parse(msg), {39: '00', 4: None}).build()
+
+    for kwargs in ({'lazy': True}, {'only': {2}}):
+        assert Py8583.make_response(parse(msg, **kwargs), {39: '00', 4: None}).build() == expected
+
+
+def test_make_response_of_built_request():
+    message = Py8583(SPEC)
+    message.MTI = '0800'
+    message.set_bit(11, '000001')
+    message.set_bit(70, '301')
+
+    response = Py8583.make_response(message, {39: '00'}, echo=(11, 70))
+    assert response.build() == full_build('0810', {11: '000001', 39: '00', 70: '301'})
+
+
+def test_make_response_mti_override():
+    response = Py8583.make_response(parse(full_build('0200', request())), {'MTI': '0230', 39: '00'})
+    assert response.MTI == '0230'
@@ -0,0 +1,42 @@
+# coding=utf-8
+from py8583.constant import DataType, LengthType
+from py8583.field import Py8583Field
+from py8583.spec import Py8583Spec, load_spec
+
+
+class AcquirerSpec(Py8583Spec):
+
+    @staticmethod
+    def _gen_default_spec():
+        fields = Py8583Spec._gen_default_spec()
+        fields[32] = Py8583Field(32, 'Acquiring institution identification code', 'n', 28, LengthType.LLVAR)
+        return fields
+
+
+class OtherSpec(Py8583Spec):
+
+    @staticmethod
+    def _gen_default_spec():
+        fields = Py8583Spec._gen_default_spec()
+        fields[32] = Py8583Field(32, 'Acquiring institution identification code', 'n', 6, LengthType.FIXED)
+        return fields
+
+
+def test_default_spec_per_class():
+    assert AcquirerSpec()[32].data_len_max == 28
+    assert Py8583Spec()[32].data_len_max == 11
+    assert OtherSpec()[32].data_len_max == 6
+    assert AcquirerSpec()[32].data_len_max == 28
+
+
+def test_default_fields_shared():
+    assert Py8583Spec()[2] is Py8583Spec()[2]
+    assert AcquirerSpec()[2] is AcquirerSpec()[2]
+
+
+def test_load_spec_int_field_keys():
+    spec = load_spec({'base': 'default', 'fields': {'MTI': {'data_type': 'BCD'}, 32: {'data_len_max': 28}}})
+
+    assert spec[32].data_len_max == 28
+    assert spec['MTI'].data_type == DataType.BCD
+    assert load_spec({'base': 'default', 'fields': {'MTI': {'data_type': 'BCD'}, '32': {'data_len_max': 28}}}) is spec
@@ -0,0 +1,161 @@
+# coding=utf-8
+"""
+Py8583Template gives the bytes a full build of the same fields gives.
+"""
+import pytest
+
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec
+from py8583.template import Py8583Template
+
+
+SPEC = Py8583Spec()
+
+TERMINAL = {
+    3: '000000',
+    22: '051',
+    25: '00',
+    41: 'TERM0001',
+    42: 'MERCHANT0000001',
+    49: '156',
+}
+
+
+def full_build(MTI, values):
+    message = Py8583(SPEC)
+    message.MTI = MTI
+    for bit, value in values.items():
+        message.set_bit(bit, value)
+    return message.build()
+
+
+def request():
+    values = dict(TERMINAL)
+    values.update({2: '4111111111111111', 4: '000000001000', 11: '000123', 48: 'not echoed'})
+    return values
+
+
+@pytest.fixture
+def patches(monkeypatch):
+    """
+    What every Py8583Template._patch returned, None when it fell back to a full build.
+    """
+
+    results = []
+    patch = Py8583Template._patch
+
+    def spy(self):
+        result = patch(self)
+        results.append(result)
+        return result
+
+    monkeypatch.setattr(Py8583Template, '_patch', spy)
+    return results
+
+
+#### template ####
+def template_of(values):
+    template = Py8583Template(SPEC)
+    template.MTI = '0200'
+    for bit, value in values.items():
+        template.set_bit(bit, value)
+    return template
+
+
+def test_template_patches_fixed_fields(patches):
+    values = request()
+    template = template_of(values)
+    assert template.build() == full_build('0200', values)
+
+    for stan, amount in (('000124', '000000002000'), ('000125', '000000000001')):
+        template.set_bit(11, stan)
+        template.set_bit(4, amount)
+        assert template.dirty_bits() == [4, 11]
+        values.update({11: stan, 4: amount})
+        assert template.build() == full_build('0200', values)
+        assert not template.dirty_bits()
+
+    assert len(patches) == 2 and all(patches)
+
+
+def test_template_patches_same_length_variable_field(patches):
+    values = request()
+    template = template_of(values)
+    template.build()
+
+    template.set_bit(2, '5500000000000004')
+    values[2] = '5500000000000004'
+    assert template.build() == full_build('0200', values)
+    assert patches[-1] is not None
+
+
+def test_template_length_change_falls_back(patches):
+    values = request()
+    template = template_of(values)
+    template.build()
+
+    template.set_bit(2, '550000000000000')
+    values[2] = '550000000000000'
+    assert template.build() == full_build('0200', values)
+    assert patches == [None]
+
+    template.set_bit(11, '000999')  # back to patching
+    values[11] = '000999'
+    assert template.build() == full_build('0200', values)
+    assert patches[-1] is not None
+
+
+def test_template_layout_change(patches):
+    values = request()
+    template = template_of(values)
+    template.build()
+
+    template.clear_bit(48)
+    template.set_bit(37, '123456789012')
+    del values[48]
+    values[37] = '123456789012'
+    assert template.build() == full_build('0200', values)
+    assert not patches  # the layout changed, not even tried
+
+
+def test_template_unchanged_value_stays_clean():
+    template = template_of(request())
+    template.build()
+
+    template.set_bit(11, '000123')
+    assert not template.is_dirty(11)
+
+
+def test_template_mti_change(patches):
+    values = request()
+    template = template_of(values)
+    template.build()
+
+    template.MTI = '0220'
+    template.set_bit(11, '000124')
+    values[11] = '000124'
+    assert template.build() == full_build('0220', values)
+    assert patches[-1] is not None
+
+
+def test_template_from_parsed_message(patches):
+    values = request()
+    template = Py8583Template(SPEC)
+    template.parse(full_build('0200', values), lazy=True)
+
+    template.set_bit(11, '000200')
+    values[11] = '000200'
+    assert template.build() == full_build('0200', values)
+    assert patches[-1] is not None
+
+
+def test_template_from_selective_parse(patches):
+    values = request()
+    template = Py8583Template(SPEC)
+    template.parse(full_build('0200', values), only={11})
+
+    template.set_bit(11, '000200')
+    template.set_bit(49, '840')  # after the stop
+    values.update({11: '000200', 49: '840'})
+    assert template.build() == full_build('0200', values)
+    assert patches[-1] is not None
@@ -0,0 +1,91 @@
+# coding=utf-8
+import logging
+
+import pytest
+
+from py8583 import trace
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec
+from py8583.trace import Py8583TraceHook, Py8583TraceRecorder
+
+
+SPEC = Py8583Spec()
+
+
+def echo(trace_hook=None):
+    message = Py8583(SPEC, trace_hook=trace_hook)
+    message.MTI = '0800'
+    message.set_bit(2, '4111111111111111')
+    message.set_bit(70, '301')
+    return message
+
+
+def layout(events):
+    return [(event.stage, event.bit, event.offset, event.length) for event in events]
+
+
+def test_build_events():
+    recorder = Py8583TraceRecorder()
+    msg = echo(recorder).build()
+
+    assert msg == echo().build()
+    assert layout(recorder.events) == [
+        (trace.STAGE_BUILD_MTI, None, 0, 4),
+        (trace.STAGE_BUILD_BITMAP, None, 4, 16),
+        (trace.STAGE_BUILD_FIELD, 2, 20, 18),
+        (trace.STAGE_BUILD_FIELD, 70, 38, 3),
+        (trace.STAGE_BUILD_ALL_FIELD, None, 20, 21),
+    ]
+    assert all(event.elapsed >= 0 for event in recorder.events)
+
+
+def test_parse_events():
+    recorder = Py8583TraceRecorder()
+    message = Py8583(SPEC, trace_hook=recorder)
+    message.parse(echo().build())
+
+    assert layout(recorder.events) == [
+        (trace.STAGE_PARSE_MTI, None, 0, 4),
+        (trace.STAGE_PARSE_BITMAP, None, 4, 16),
+        (trace.STAGE_PARSE_FIELD, 2, 20, 18),
+        (trace.STAGE_PARSE_FIELD, 70, 38, 3),
+        (trace.STAGE_PARSE_ALL_FIELD, None, 20, 21),
+    ]
+    assert message.to_dict() == {'MTI': '0800', 2: '4111111111111111', 70: '301'}
+
+
+def test_lazy_parse_events():
+    recorder = Py8583TraceRecorder()
+    message = Py8583(SPEC, trace_hook=recorder)
+    message.parse(echo().build(), lazy=True)
+
+    assert [event.stage for event in recorder.events] == [
+        trace.STAGE_PARSE_MTI, trace.STAGE_PARSE_BITMAP, trace.STAGE_PARSE_ALL_FIELD,
+    ]
+    assert message.get_bit(70) == '301'
+
+
+def test_hook_attached_later():
+    recorder = Py8583TraceRecorder()
+    message = echo()
+    message.build()
+
+    message.trace_hook = recorder
+    message.build()
+    assert recorder.events
+
+
+def test_hook_must_implement_on_event():
+    with pytest.raises(NotImplementedError):
+        echo(Py8583TraceHook()).build()
+
+
+def test_debug_logging(caplog):
+    with caplog.at_level(logging.DEBUG):
+        msg = echo().build()
+        message = Py8583(SPEC)
+        message.parse(msg)
+
+    assert msg == echo().build()
+    assert message.to_dict() == {'MTI': '0800', 2: '4111111111111111', 70: '301'}
+    assert any('MTI' in record.getMessage() for record in caplog.records)
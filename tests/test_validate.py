@@ -0,0 +1,109 @@
+# coding=utf-8
+import pytest
+
+from py8583 import err, field55
+from py8583.constant import Validation
+from py8583.py8583 import Py8583
+from py8583.spec import Py8583Spec
+from py8583.template import Py8583Template
+
+
+ICC_DATA = field55.encode([
+    (0x9F26, b'\x12\x34\x56\x78\x9a\xbc\xde\xf0'),
+    (0x9F27, b'\x80'),
+    (0x9F10, b'\x06\x01\x0a\x03\xa0\x00\x00'),
+    (0x95, b'\x00\x00\x00\x00\x00'),
+])
+
+
+def purchase(spec):
+    message = Py8583(spec)
+    message.MTI = '0200'
+    message.set_bit(3, '000000')
+    message.set_bit(4, '000000001000')
+    message.set_bit(11, '000123')
+    message.set_bit(41, 'TERM0001')
+    message.set_bit(55, ICC_DATA)
+    return message
+
+
+def test_field55_under_build():
+    spec = Py8583Spec(validation=Validation.BUILD)
+    msg = purchase(spec).build()
+
+    parsed = Py8583(Py8583Spec())
+    parsed.parse(msg)
+    assert bytes(parsed.get_raw(55)) == ICC_DATA
+    assert field55.Py8583TLV(parsed.get_raw(55)).get(0x9F26) == b'\x12\x34\x56\x78\x9a\xbc\xde\xf0'
+
+
+def test_field55_under_build_traced():
+    class Hook(object):
+        def on_event(self, event):
+            pass
+
+    spec = Py8583Spec(validation=Validation.BUILD)
+    message = purchase(spec)
+    message.trace_hook = Hook()
+    assert message.build() == purchase(Py8583Spec()).build()
+
+
+def test_field55_under_build_template():
+    spec = Py8583Spec(validation=Validation.BUILD)
+    template = Py8583Template(spec)
+    template.MTI = '0200'
+    template.set_bit(11, '000123')
+    template.set_bit(55, ICC_DATA)
+    template.build()
+
+    template.set_bit(55, ICC_DATA[:-1] + b'\x01')  # same length, patched in place
+    msg = template.build()
+    assert msg.endswith(ICC_DATA[:-1] + b'\x01')
+
+
+def test_invalid_rejected():
+    spec = Py8583Spec(validation=Validation.BUILD)
+    message = purchase(spec)
+    message.set_bit(4, '00000000100A')
+
+    with pytest.raises(err.Py8583ValidationError) as e:
+        message.build()
+    assert [violation[0] for violation in e.value.violations] == [4]
+
+
+def test_invalid_bytes_rejected():
+    spec = Py8583Spec(validation=Validation.BUILD)
+    message = purchase(spec)
+    message.set_bit(2, b'41111X')
+
+    with pytest.raises(err.Py8583ValidationError) as e:
+        message.build()
+    assert e.value.violations == [(2, 'n', b'X')]
+
+
+def test_icc_message_parsed_and_rebuilt_under_all():
+    spec = Py8583Spec(validation=Validation.ALL)
+    msg = purchase(Py8583Spec()).build()
+
+    for kwargs in ({}, {'lazy': True}, {'only': {11}}):
+        message = Py8583(spec)
+        message.parse(msg, **kwargs)
+        assert bytes(message.get_bit(55)) == ICC_DATA
+        assert message.build() == msg
+
+        message.set_bit(55, bytes(message.get_bit(55)))  # encoded again
+        message.set_bit(11, '000124')
+        rebuilt = Py8583(spec)
+        rebuilt.parse(message.build())
+        assert bytes(rebuilt.get_bit(55)) == ICC_DATA
+
+
+def test_icc_message_echoed_under_build():
+    spec = Py8583Spec(validation=Validation.BUILD)
+    request = Py8583(spec)
+    request.parse(purchase(Py8583Spec()).build())
+
+    response = Py8583.make_response(request, {39: '00'}, echo=Py8583.RESPONSE_ECHO_BITS | {55})
+    parsed = Py8583(spec)
+    parsed.parse(response.build())
+    assert bytes(parsed.get_bit(55)) == ICC_DATA